@@ -0,0 +1,192 @@
+"""
+Нагрузочный прогон YaNews и YaNote через тестовый клиент Django.
+
+Перед запуском заполните базу проекта:
+    (cd ya_news && python manage.py generate_data)
+    (cd ya_note && python manage.py generate_notes)
+
+Запуск из корня репозитория:
+    python loadtest.py news --requests 500 --threads 4
+    python loadtest.py note --requests 500 --threads 4
+
+Для каждой страницы печатаются задержки p50/p95/p99, пропускная
+способность и среднее число SQL-запросов на запрос.
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+PROJECTS = {
+    'news': ('ya_news', 'yanews.settings'),
+    'note': ('ya_note', 'yanote.settings'),
+}
+
+
+def setup_django(project, db_path=None):
+    directory, settings_module = PROJECTS[project]
+    sys.path.insert(0, str(BASE_DIR / directory))
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    os.environ.setdefault('DJANGO_PROFILE', 'dev')
+    import django
+    from django.conf import settings
+    if db_path is not None:
+        settings.DATABASES['default']['NAME'] = str(db_path)
+    # Тестовый клиент ходит на хост testserver.
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    django.setup()
+
+
+def news_endpoints():
+    """Страницы YaNews: главная и страница новости, без входа."""
+    from django.urls import reverse
+
+    from news.models import News
+
+    news_ids = list(News.objects.values_list('pk', flat=True))
+    if not news_ids:
+        sys.exit('В базе нет новостей: запустите manage.py generate_data.')
+    return {
+        'news:home': (False, lambda rng: ('get', reverse('news:home'), None)),
+        'news:detail': (False, lambda rng: (
+            'get', reverse('news:detail', args=(rng.choice(news_ids),)), None
+        )),
+    }
+
+
+def note_endpoints():
+    """Страницы YaNote: список заметок и добавление, под пользователем."""
+    from django.urls import reverse
+
+    def add(rng):
+        title = f'Нагрузочная заметка {uuid.uuid4().hex[:12]}'
+        return 'post', reverse('notes:add'), {'title': title, 'text': title}
+
+    return {
+        'notes:list': (True, lambda rng: ('get', reverse('notes:list'), None)),
+        'notes:add': (True, add),
+    }
+
+
+ENDPOINTS = {'news': news_endpoints, 'note': note_endpoints}
+
+
+def worker(request, login, users, count, seed, results):
+    """Выполняет count запросов своим клиентом и дописывает замеры."""
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    rng = random.Random(seed)
+    client = Client()
+    if login:
+        client.force_login(rng.choice(users))
+    measurements = []
+    for _ in range(count):
+        method, url, data = request(rng)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            try:
+                response = getattr(client, method)(url, data)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - start
+        measurements.append((elapsed, len(queries), failed))
+    connection.close()
+    results.extend(measurements)
+
+
+def run_endpoint(request, login, users, total, threads, seed):
+    """Возвращает замеры и общее время прогона одной страницы."""
+    results = []
+    per_thread = [
+        total // threads + (i < total % threads) for i in range(threads)
+    ]
+    pool = [
+        threading.Thread(
+            target=worker,
+            args=(request, login, users, count, seed + i, results),
+        )
+        for i, count in enumerate(per_thread)
+    ]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def summarize(name, results, wall_time):
+    timings = sorted(elapsed * 1000 for elapsed, _, _ in results)
+    if len(timings) >= 2:
+        percentiles = statistics.quantiles(
+            timings, n=100, method='inclusive'
+        )
+        p50, p95, p99 = percentiles[49], percentiles[94], percentiles[98]
+    else:
+        # quantiles нужны хотя бы два замера; у одного все перцентили
+        # равны ему самому, а без замеров их нет.
+        p50 = p95 = p99 = timings[0] if timings else math.nan
+    queries = (
+        statistics.mean(q for _, q, _ in results) if results else math.nan
+    )
+    return (
+        name,
+        len(results),
+        f'{p50:.1f}',
+        f'{p95:.1f}',
+        f'{p99:.1f}',
+        f'{len(results) / wall_time:.0f}',
+        f'{queries:.1f}',
+        sum(failed for _, _, failed in results),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('project', choices=PROJECTS)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', help='Путь к другой базе SQLite.')
+    args = parser.parse_args()
+
+    setup_django(args.project, args.db)
+    from benchmarks.utils import print_table
+    from django.contrib.auth import get_user_model
+
+    endpoints = ENDPOINTS[args.project]()
+    users = list(get_user_model().objects.all()[:args.users])
+    if not users and any(login for login, _ in endpoints.values()):
+        sys.exit('В базе нет пользователей: сначала сгенерируйте данные.')
+    rows = []
+    for name, (login, request) in endpoints.items():
+        run_endpoint(request, login, users, args.warmup, 1, args.seed)
+        results, wall_time = run_endpoint(
+            request, login, users, args.requests, args.threads, args.seed
+        )
+        rows.append(summarize(name, results, wall_time))
+    print_table(
+        ('страница', 'запросов', 'p50, мс', 'p95, мс', 'p99, мс',
+         'в секунду', 'SQL', 'ошибок'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
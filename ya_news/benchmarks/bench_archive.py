@@ -0,0 +1,73 @@
+"""
+Сравнение OFFSET- и keyset-пагинации архива новостей.
+
+Запуск из каталога ya_news:
+    python -m benchmarks.bench_archive --rows 1000000
+"""
+import argparse
+from datetime import date, timedelta
+
+from benchmarks.utils import measure, print_table, setup_django
+
+BATCH_SIZE = 10_000
+
+
+def seed_news(rows):
+    from django.db import transaction
+
+    from news.models import News
+
+    existing = News.objects.count()
+    start_date = date(2000, 1, 1)
+    for offset in range(existing, rows, BATCH_SIZE):
+        with transaction.atomic():
+            News.objects.bulk_create(
+                News(
+                    title=f'Новость {number}',
+                    text='Текст новости',
+                    # По несколько новостей в день, чтобы pk
+                    # действительно участвовал в сортировке.
+                    date=start_date + timedelta(days=number // 5),
+                )
+                for number in range(offset, min(offset + BATCH_SIZE, rows))
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--db', help='Файл базы для повторных запусков.')
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from news.models import News
+    from news.pagination import NEXT, KeysetPaginator
+
+    seed_news(args.rows)
+    ordering = ('-date', '-pk')
+    paginator = KeysetPaginator(News.objects.all(), ordering, args.per_page)
+    last_page = args.rows // args.per_page - 1
+    results = []
+    for page_number in sorted({0, 100, 1000, 10_000, last_page}):
+        if page_number > last_page:
+            continue
+        offset = page_number * args.per_page
+        if page_number:
+            boundary = News.objects.order_by(*ordering)[offset - 1]
+            cursor = paginator.encode_cursor(NEXT, boundary)
+        else:
+            cursor = None
+        offset_ms = measure(lambda: list(
+            News.objects.order_by(*ordering)[offset:offset + args.per_page]
+        ))
+        keyset_ms = measure(lambda: paginator.get_page(cursor))
+        results.append((
+            page_number + 1, f'{offset_ms:.2f}', f'{keyset_ms:.2f}'
+        ))
+    print(f'Новостей в базе: {News.objects.count()}')
+    print_table(('страница', 'OFFSET, мс', 'keyset, мс'), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Запросы к базе на аутентификацию: стандартные middleware и сессии
+в базе против CachedAuthenticationMiddleware и cached_db.
+
+Для каждой страницы замеряются число SQL-запросов и время ответа
+при уже прогретом кэше. Кэш целых страниц сбрасывается перед каждым
+запросом, чтобы замерить работу самой страницы.
+
+Запуск из каталога ya_news:
+    python -m benchmarks.bench_auth --news 100
+"""
+import argparse
+
+from benchmarks.utils import measure, print_table, setup_django
+
+
+def stock_settings():
+    """Настройки Django по умолчанию для сравнения."""
+    from django.conf import settings
+
+    return {
+        'MIDDLEWARE': [
+            'django.contrib.auth.middleware.AuthenticationMiddleware'
+            if path == 'news.authcache.CachedAuthenticationMiddleware'
+            else path
+            for path in settings.MIDDLEWARE
+        ],
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    }
+
+
+def page_queries(client, url):
+    """Число SQL-запросов и время ответа url в мс."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from news import pagecache
+
+    def get():
+        pagecache.bump_version()
+        client.get(url)
+
+    get()
+    with CaptureQueriesContext(connection) as queries:
+        get()
+    return len(queries), measure(get, 20)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--news', type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from news.models import News
+
+    settings.ALLOWED_HOSTS = ['*']
+    News.objects.bulk_create(
+        News(title=f'Новость {number}', text='Текст новости')
+        for number in range(args.news)
+    )
+    user = get_user_model().objects.create_user('reader', password='pass')
+    pages = {
+        'news:home': reverse('news:home'),
+        'news:detail': reverse('news:detail', args=(News.objects.first().pk,)),
+    }
+    configurations = {'стандартные': stock_settings(), 'с кэшем': {}}
+    results = []
+    for name, url in pages.items():
+        for visitor in ('аноним', 'вошедший'):
+            row = [name, visitor]
+            for overrides in configurations.values():
+                with override_settings(**overrides):
+                    # Client строит цепочку middleware при первом запросе.
+                    client = Client()
+                    if visitor == 'вошедший':
+                        client.force_login(user)
+                    queries, elapsed = page_queries(client, url)
+                row += [queries, f'{elapsed:.2f}']
+            results.append(row)
+    header = ['страница', 'посетитель']
+    for name in configurations:
+        header += [f'{name}: SQL', f'{name}: мс']
+    print_table(header, results)
+
+
+if __name__ == '__main__':
+    main()
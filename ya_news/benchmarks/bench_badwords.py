@@ -0,0 +1,67 @@
+"""
+Сравнение поиска запрещённых слов циклом и одним выражением.
+
+Запуск из каталога ya_news:
+    python -m benchmarks.bench_badwords --terms 10000 --size 100000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.utils import measure, print_table, setup_django
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщъыьэюя'
+
+
+def random_word(rng, length):
+    return ''.join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def naive_search(words, text):
+    """Прежний способ: отдельный поиск подстроки на каждое слово."""
+    lowered_text = text.lower()
+    for word in words:
+        if word in lowered_text:
+            return word
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--terms', type=int, default=10_000)
+    parser.add_argument('--size', type=int, default=100_000)
+    args = parser.parse_args()
+
+    setup_django()
+    from news.badwords import BadWordsFilter
+
+    rng = random.Random(1)
+    words = [random_word(rng, rng.randint(7, 12)) for _ in range(args.terms)]
+    text_words = []
+    length = 0
+    while length < args.size:
+        word = random_word(rng, rng.randint(2, 6))
+        text_words.append(word)
+        length += len(word) + 1
+    # Худший случай: запрещённое слово в самом конце текста.
+    clean_text = ' '.join(text_words)[:args.size]
+    dirty_text = clean_text + ' ' + words[-1]
+
+    start = time.perf_counter()
+    bad_words_filter = BadWordsFilter(words)
+    build_ms = (time.perf_counter() - start) * 1000
+    results = []
+    texts = (('без слов', clean_text), ('слово в конце', dirty_text))
+    for name, text in texts:
+        naive_ms = measure(lambda: naive_search(words, text), repeat=3)
+        filter_ms = measure(lambda: bad_words_filter.search(text), repeat=3)
+        results.append((name, f'{naive_ms:.1f}', f'{filter_ms:.1f}'))
+    print(
+        f'Слов: {args.terms}, длина текста: {len(clean_text)}, '
+        f'сборка выражения: {build_ms:.1f} мс'
+    )
+    print_table(('текст', 'цикл, мс', 'выражение, мс'), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Скорость массовой загрузки комментариев из NDJSON.
+
+Запуск из каталога ya_news:
+    python -m benchmarks.bench_ingest --rows 200000
+"""
+import argparse
+import json
+import time
+
+from benchmarks.utils import print_table, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--news', type=int, default=1000)
+    parser.add_argument(
+        '--batch-sizes', type=int, nargs='+', default=[1000, 5000, 20000]
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+
+    from news.ingest import ingest_comments
+    from news.models import Comment, News
+
+    users = get_user_model().objects.bulk_create(
+        get_user_model()(username=f'user{i}') for i in range(100)
+    )
+    News.objects.bulk_create(
+        News(title=f'Новость {i}', text='Текст') for i in range(args.news)
+    )
+    news_ids = list(News.objects.values_list('pk', flat=True))
+    lines = [
+        json.dumps({
+            'news': news_ids[i % len(news_ids)],
+            'author': users[i % len(users)].username,
+            'text': f'Комментарий номер {i} к новости, без ругательств.',
+        }, ensure_ascii=False)
+        for i in range(args.rows)
+    ]
+    results = []
+    for batch_size in args.batch_sizes:
+        Comment.objects.all().delete()
+        start = time.perf_counter()
+        report = ingest_comments(lines, batch_size)
+        elapsed = time.perf_counter() - start
+        results.append((
+            batch_size, report['created'], f'{elapsed:.2f}',
+            f'{report["created"] / elapsed:.0f}',
+        ))
+    print_table(('пачка', 'строк', 'секунд', 'строк в секунду'), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Потоковая загрузка фикстур против loaddata: время и пик памяти.
+
+Запуск из каталога ya_news:
+    python -m benchmarks.bench_load --news 20000 --comments 200000
+"""
+import argparse
+import io
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.utils import print_table, setup_django
+
+
+def write_fixture(path, news_count, comments_count, author_id):
+    """Пишет фикстуру в формате dumpdata, не собирая её в памяти."""
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('[\n')
+        for pk in range(1, news_count + 1):
+            json.dump({'model': 'news.news', 'pk': pk, 'fields': {
+                'title': f'Новость {pk}', 'text': 'Текст новости. ' * 20,
+                'date': '2024-01-01',
+            }}, file, ensure_ascii=False)
+            file.write(',\n')
+        for pk in range(1, comments_count + 1):
+            json.dump({'model': 'news.comment', 'pk': pk, 'fields': {
+                'news': pk % news_count + 1, 'author': author_id,
+                'text': f'Комментарий {pk}',
+                'created': '2024-01-01T12:00:00Z',
+            }}, file, ensure_ascii=False)
+            file.write(',\n' if pk < comments_count else '\n')
+        file.write(']\n')
+
+
+def run(load):
+    """Возвращает время загрузки в секундах и пик памяти в мегабайтах."""
+    from news.models import Comment, News
+    Comment.objects.all().delete()
+    News.objects.all().delete()
+    tracemalloc.start()
+    start = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--news', type=int, default=20_000)
+    parser.add_argument('--comments', type=int, default=200_000)
+    parser.add_argument('--skip-loaddata', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    author = get_user_model().objects.create(username='author')
+    path = Path(tempfile.mkdtemp()) / 'fixture.json'
+    write_fixture(path, args.news, args.comments, author.pk)
+    rows = args.news + args.comments
+
+    loaders = {
+        'load_news': lambda: call_command(
+            'load_news', str(path), stdout=io.StringIO()
+        ),
+        'load_news --defer-indexes': lambda: call_command(
+            'load_news', str(path), defer_indexes=True,
+            stdout=io.StringIO(),
+        ),
+    }
+    if not args.skip_loaddata:
+        loaders['loaddata'] = lambda: call_command(
+            'loaddata', str(path), verbosity=0
+        )
+    results = []
+    for name, load in loaders.items():
+        elapsed, peak = run(load)
+        results.append((
+            name, rows, f'{elapsed:.2f}', f'{rows / elapsed:.0f}',
+            f'{peak:.1f}',
+        ))
+    print_table(
+        ('способ', 'записей', 'секунд', 'записей в секунду', 'пик, МБ'),
+        results,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Поиск по новостям через FTS5 против icontains и время перестройки индекса.
+
+Запуск из каталога ya_news:
+    python -m benchmarks.bench_search --news 100000
+"""
+import argparse
+import io
+import time
+from datetime import timedelta
+
+from benchmarks.utils import measure, print_table, setup_django
+
+QUERIES = ('новости', 'фест', '"новости погода"', 'библиотека концерт')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--news', type=int, default=100_000)
+    parser.add_argument('--db', help='Файл базы для повторных запусков.')
+    args = parser.parse_args()
+
+    setup_django(args.db)
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from news import search
+    from news.models import News
+
+    existing = News.objects.count()
+    if existing < args.news:
+        call_command(
+            'generate_data', users=1, news=args.news - existing,
+            comments=0, stdout=io.StringIO(),
+        )
+    start = time.perf_counter()
+    indexed = search.rebuild()
+    print(
+        f'Индекс {indexed} новостей перестроен за '
+        f'{time.perf_counter() - start:.1f} с'
+    )
+    today = timezone.localdate()
+    month = {'date_from': today - timedelta(days=30), 'date_to': today}
+    fts_index = search.has_index
+    results = []
+    for query in QUERIES:
+        for dates in ({}, month):
+            fts_ms = measure(lambda: search.search(query, **dates))
+            search.has_index = lambda: False
+            try:
+                simple_ms = measure(lambda: search.search(query, **dates))
+            finally:
+                search.has_index = fts_index
+            results.append((
+                query, 'месяц' if dates else 'все',
+                f'{fts_ms:.1f}', f'{simple_ms:.1f}',
+            ))
+    print_table(('запрос', 'даты', 'FTS5, мс', 'icontains, мс'), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Загрузчики шаблонов: прежний APP_DIRS без кэша против кэширующего
+загрузчика, без прогрева и с прогревом warm_up.
+
+Для каждого варианта движок шаблонов и таблицы URL создаются
+заново, как при старте процесса, и замеряются время warm_up, время
+первых ответов страниц и медианное время ответа в уже работающем
+процессе. Кэш целых страниц сбрасывается перед каждым запросом.
+
+Запуск из каталога ya_news:
+    python -m benchmarks.bench_templates --news 100
+"""
+import argparse
+
+from benchmarks.utils import measure, print_table, setup_django
+
+
+def configurations():
+    """Варианты настройки TEMPLATES и включён ли прогрев."""
+    from django.conf import settings
+
+    cached = settings.TEMPLATES[0]
+    uncached = {
+        **cached,
+        'APP_DIRS': True,
+        'OPTIONS': {
+            key: value for key, value in cached['OPTIONS'].items()
+            if key != 'loaders'
+        },
+    }
+    return {
+        'APP_DIRS без кэша': ([uncached], False),
+        'кэширующий': ([cached], False),
+        'кэширующий + прогрев': ([cached], True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--news', type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import Client, override_settings
+    from django.urls import clear_url_caches, reverse
+
+    from news import pagecache, warmup
+    from news.models import News
+
+    settings.ALLOWED_HOSTS = ['*']
+    News.objects.bulk_create(
+        News(title=f'Новость {number}', text='Текст новости')
+        for number in range(args.news)
+    )
+    urls = [
+        reverse('news:home'),
+        reverse('news:archive'),
+        reverse('news:detail', args=(News.objects.first().pk,)),
+    ]
+    client = Client()
+
+    def get_pages():
+        for url in urls:
+            pagecache.bump_version()
+            client.get(url)
+
+    def run(templates, warm):
+        # override_settings(TEMPLATES=...) создаёт движок заново.
+        with override_settings(TEMPLATES=templates, TEMPLATES_WARM_UP=warm):
+            clear_url_caches()
+            warm_up_ms = measure(warmup.warm_up, 1)
+            first_ms = measure(get_pages, 1)
+            render_ms = measure(get_pages, 200) / len(urls)
+        return warm_up_ms, first_ms, render_ms
+
+    # Первый прогон импортирует библиотеки тегов и модули Django,
+    # которые иначе достались бы первому варианту.
+    run(*configurations()['кэширующий + прогрев'])
+    results = []
+    for name, (templates, warm) in configurations().items():
+        warm_up_ms, first_ms, render_ms = run(templates, warm)
+        results.append((
+            name, f'{warm_up_ms:.1f}', f'{first_ms:.1f}', f'{render_ms:.2f}'
+        ))
+    print_table(
+        ('загрузчик', 'прогрев, мс', f'первые {len(urls)} ответа, мс',
+         'ответ, мс'),
+        results,
+    )
+
+
+if __name__ == '__main__':
+    main()
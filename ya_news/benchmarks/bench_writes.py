@@ -0,0 +1,127 @@
+"""
+Скорость записи комментариев несколькими процессами: прежние
+настройки против профиля prod.
+
+Каждый процесс-писатель, как обработчик запроса, на каждый
+комментарий открывает и закрывает «запрос» сигналами
+request_started/request_finished и в одной транзакции создаёт
+опубликованный комментарий и увеличивает счётчик новости. «До» —
+журнал DELETE, synchronous=FULL, соединение на каждый запрос,
+таймаут блокировки 5 с и DEBUG; «после» — SQLITE_PRAGMAS,
+CONN_MAX_AGE и таймаут из settings.py. У каждого варианта своя
+база: режим WAL сохраняется в файле.
+
+Запуск из каталога ya_news:
+    python -m benchmarks.bench_writes --comments 500 --writers 1,4,8
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.utils import print_table, setup_django
+
+BEFORE = 'до'
+AFTER = 'после'
+
+
+def configure(variant):
+    """Настройки писателя для варианта «до» или «после»."""
+    from django.conf import settings
+
+    database = settings.DATABASES['default']
+    if variant == BEFORE:
+        settings.DEBUG = True
+        settings.SQLITE_PRAGMAS = {
+            'journal_mode': 'DELETE', 'synchronous': 'FULL',
+        }
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS'] = {'timeout': 5}
+    else:
+        settings.DEBUG = False
+        database['CONN_MAX_AGE'] = 60
+
+
+def start_writer(db_path, variant):
+    setup_django(db_path)
+    configure(variant)
+
+
+def write(args):
+    """Пишет count комментариев; возвращает число неудачных записей."""
+    news_pk, author_pk, count = args
+    from django.core.signals import request_finished, request_started
+    from django.db import OperationalError, transaction
+
+    from news.models import Comment, News
+
+    failed = 0
+    for number in range(count):
+        request_started.send(sender=None)
+        try:
+            with transaction.atomic():
+                Comment.objects.create(
+                    news_id=news_pk, author_id=author_pk,
+                    text=f'Комментарий {number}',
+                    status=Comment.Status.PUBLISHED,
+                )
+                News.change_comment_count(news_pk, 1)
+        except OperationalError:
+            failed += 1
+        finally:
+            request_finished.send(sender=None)
+    return failed
+
+
+def prepare():
+    """Новая база с новостью и автором; возвращает путь и их pk."""
+    db_path = Path(tempfile.mkdtemp()) / 'bench.sqlite3'
+    setup_django(db_path)
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+
+    from news.models import News
+
+    news = News.objects.create(title='Новость', text='Текст')
+    author = get_user_model().objects.create(username='author')
+    connection.close()
+    return db_path, news.pk, author.pk
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--comments', type=int, default=500)
+    parser.add_argument('--writers', default='1,4,8')
+    args = parser.parse_args()
+
+    # Писатели запускаются чистыми процессами: соединение
+    # с базой нельзя наследовать через fork.
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for writers in map(int, args.writers.split(',')):
+        row = [writers]
+        for variant in (BEFORE, AFTER):
+            db_path, news_pk, author_pk = prepare()
+            tasks = [(news_pk, author_pk, args.comments)] * writers
+            with context.Pool(
+                writers, start_writer, (db_path, variant)
+            ) as pool:
+                # Каждый процесс берёт задачу, только настроив Django:
+                # старт процессов и django.setup не попадут в замер.
+                pool.map(time.sleep, [0.5] * writers, chunksize=1)
+                start = time.perf_counter()
+                failed = sum(pool.map(write, tasks))
+                elapsed = time.perf_counter() - start
+            written = writers * args.comments - failed
+            row += [f'{written / elapsed:.0f}', failed]
+        results.append(row)
+    print_table(
+        ('писателей', f'{BEFORE}: комм./с', f'{BEFORE}: ошибок',
+         f'{AFTER}: комм./с', f'{AFTER}: ошибок'),
+        results,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Общие помощники для бенчмарков проекта."""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+# Пакет настроек назван по каталогу проекта: ya_news — yanews.
+SETTINGS_MODULE = PROJECT_DIR.name.replace('_', '') + '.settings'
+
+
+def setup_django(db_path=None):
+    """
+    Настраивает Django на отдельную базу SQLite и применяет миграции.
+
+    Без db_path база создаётся во временном файле; с db_path
+    уже заполненную базу можно переиспользовать между запусками.
+    """
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', SETTINGS_MODULE)
+    os.environ.setdefault('DJANGO_PROFILE', 'dev')
+    if db_path is None:
+        db_path = Path(tempfile.mkdtemp()) / 'bench.sqlite3'
+    import django
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = str(db_path)
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return db_path
+
+
+def measure(func, repeat=5):
+    """Возвращает медианное время выполнения func в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def print_table(header, rows):
+    """Печатает результаты бенчмарка ровными колонками."""
+    widths = [
+        max(len(str(cell)) for cell in column)
+        for column in zip(header, *rows)
+    ]
+    for row in (header, *rows):
+        print('  '.join(
+            str(cell).rjust(width) for cell, width in zip(row, widths)
+        ))
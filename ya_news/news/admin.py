@@ -10,6 +10,19 @@ class CommentInline(admin.StackedInline):
 
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
+    list_display = ('title', 'date', 'comment_count')
+    readonly_fields = ('comment_count',)
     inlines = [
         CommentInline,
     ]
+
+    def save_formset(self, request, form, formset, change):
+        """
+        Сохраняет комментарии и поправляет счётчик у новости.
+
+        В админке меняют и статус комментариев, поэтому разницу
+        не вычисляем, а пересчитываем счётчик одним запросом.
+        """
+        super().save_formset(request, form, formset, change)
+        if formset.model is Comment and formset.has_changed():
+            News.recount_comments(form.instance.pk)
@@ -0,0 +1,149 @@
+"""
+Поиск запрещённых слов в тексте комментария.
+
+Все слова собираются в одно регулярное выражение в виде префиксного
+дерева, поэтому проверка идёт за один проход по тексту, сколько бы
+слов ни было в списке. Текст и слова приводятся к общему виду:
+регистр, «ё» как «е», латинские буквы, похожие на кириллицу.
+"""
+import os
+import re
+import threading
+
+# Латинские буквы, которыми подменяют похожие кириллические.
+HOMOGLYPHS = {
+    'a': 'а', 'b': 'в', 'c': 'с', 'e': 'е', 'h': 'н', 'k': 'к', 'm': 'м',
+    'o': 'о', 'p': 'р', 't': 'т', 'x': 'х', 'y': 'у', 'ё': 'е', '0': 'о',
+}
+NORMALIZE_TABLE = str.maketrans(HOMOGLYPHS)
+# Длиннее слова пропускаются: вложенность групп в выражении растёт
+# с длиной слова, а компилятор re рекурсивен и на сотнях уровней
+# падает с RecursionError.
+MAX_WORD_LENGTH = 100
+
+
+def normalize(text):
+    """Приводит текст к виду, в котором сравниваются слова."""
+    return text.casefold().translate(NORMALIZE_TABLE)
+
+
+def _node_pattern(node, children):
+    """Выражение узла из выражений его детей children по символам."""
+    branches = [
+        re.escape(char) + children[char] for char in sorted(children)
+    ]
+    if not branches:
+        return ''
+    pattern = (
+        branches[0] if len(branches) == 1
+        else '(?:' + '|'.join(branches) + ')'
+    )
+    if '' in node:
+        pattern = f'(?:{pattern})?'
+    return pattern
+
+
+def _trie_pattern(trie):
+    """
+    Регулярное выражение для префиксного дерева слов.
+
+    Дерево обходится явным стеком, а не рекурсией: глубина дерева —
+    длина самого длинного слова.
+    """
+    patterns = {}
+    stack = [(trie, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if not children_done:
+            stack.append((node, True))
+            stack.extend(
+                (child, False) for char, child in node.items() if char
+            )
+            continue
+        patterns[id(node)] = _node_pattern(node, {
+            char: patterns.pop(id(child))
+            for char, child in node.items() if char
+        })
+    return patterns[id(trie)]
+
+
+def build_pattern(words, whole_words=False):
+    """
+    Собирает одно регулярное выражение для всех слов.
+
+    Без слов возвращает None. С whole_words слово должно стоять
+    отдельно, иначе ищется любое вхождение, как подстрока. Слова
+    длиннее MAX_WORD_LENGTH пропускаются.
+    """
+    trie = {}
+    for word in words:
+        word = normalize(word.strip())
+        if not word or len(word) > MAX_WORD_LENGTH:
+            continue
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    if not trie:
+        return None
+    pattern = _trie_pattern(trie)
+    if whole_words:
+        pattern = rf'(?<!\w){pattern}(?!\w)'
+    return re.compile(pattern)
+
+
+class BadWordsFilter:
+    """
+    Проверка текста по списку запрещённых слов.
+
+    Слова берутся из words и, если указан path, из файла
+    по одному слову в строке. Выражение собирается при первой
+    проверке, а не при создании фильтра: на тысячах слов это
+    сотни миллисекунд, которые не нужны при импорте модуля.
+    Изменённый файл перечитывается при следующей проверке без
+    перезапуска сервера.
+    """
+
+    def __init__(self, words=(), path=None, whole_words=False):
+        self.words = tuple(words)
+        self.path = path
+        self.whole_words = whole_words
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._mtime = None
+        self._pattern = None
+
+    def _file_mtime(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_file(self):
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                return [line for line in file if not line.startswith('#')]
+        except OSError:
+            return []
+
+    def reload(self):
+        """Пересобирает выражение из слов и файла."""
+        with self._lock:
+            words = list(self.words)
+            if self.path:
+                self._mtime = self._file_mtime()
+                words.extend(self._read_file())
+            self._pattern = build_pattern(words, self.whole_words)
+            self._loaded = True
+
+    def search(self, text):
+        """Возвращает найденное запрещённое слово или None."""
+        if not self._loaded or (
+            self.path and self._file_mtime() != self._mtime
+        ):
+            self.reload()
+        if self._pattern is None:
+            return None
+        match = self._pattern.search(normalize(text))
+        return match.group() if match else None
@@ -0,0 +1,61 @@
+"""
+Общие помощники для кэша YaNews.
+
+Вместо удаления устаревших записей меняется номер версии, входящий
+в их ключи: старые записи перестают читаться и вытесняются из кэша
+по таймауту. Так инвалидация работает одинаково с locmem
+и с любым общим бэкендом.
+"""
+import time
+
+from django.core.cache import cache
+
+STATS_KEY = 'news:cache:stats:{name}'
+
+
+def get_version(key):
+    """Текущая версия, хранящаяся под ключом key."""
+    version = cache.get(key)
+    if version is None:
+        # Начальная версия берётся из часов: если счётчик вытеснят
+        # из кэша, новая версия не совпадёт ни с одной из старых.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_version(key):
+    """Делает недействительными все записи с версией из key."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def reset_versions(keys):
+    """
+    Делает недействительными записи сразу для нескольких версий.
+
+    Удалённая версия при следующем чтении начнётся заново с часов,
+    как после вытеснения, и не совпадёт с прежней — зато на все
+    ключи уходит один запрос к кэшу.
+    """
+    cache.delete_many(keys)
+
+
+def count(name):
+    """Увеличивает счётчик мониторинга name."""
+    key = STATS_KEY.format(name=name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_stats(names):
+    """Значения счётчиков мониторинга."""
+    values = cache.get_many([STATS_KEY.format(name=name) for name in names])
+    return {
+        name: values.get(STATS_KEY.format(name=name), 0) for name in names
+    }
@@ -1,6 +1,9 @@
+from django import forms
+from django.conf import settings
 from django.forms import ModelForm
 from django.core.exceptions import ValidationError
 
+from .badwords import BadWordsFilter
 from .models import Comment
 
 BAD_WORDS = (
@@ -10,6 +13,12 @@ BAD_WORDS = (
 )
 WARNING = 'Не ругайтесь!'
 
+bad_words_filter = BadWordsFilter(
+    BAD_WORDS,
+    path=settings.BAD_WORDS_FILE,
+    whole_words=settings.BAD_WORDS_WHOLE_WORDS,
+)
+
 
 class CommentForm(ModelForm):
 
@@ -19,9 +28,33 @@ class CommentForm(ModelForm):
 
     def clean_text(self):
         """Не позволяем ругаться в комментариях."""
-        text = self.cleaned_data['text']
-        lowered_text = text.lower()
-        for word in BAD_WORDS:
-            if word in lowered_text:
-                raise ValidationError(WARNING)
-        return text
+        return check_bad_words(self.cleaned_data['text'])
+
+
+def check_bad_words(text):
+    """Проверка текста, общая для формы и массовой загрузки."""
+    if bad_words_filter.search(text):
+        raise ValidationError(WARNING)
+    return text
+
+
+def clean_comment_text(value):
+    """Проверяет текст комментария по тем же правилам, что и форма."""
+    return check_bad_words(CommentForm.base_fields['text'].clean(value))
+
+
+class NewsSearchForm(forms.Form):
+    q = forms.CharField(label='Запрос', max_length=200, required=False)
+    date_from = forms.DateField(
+        label='С даты',
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date'}),
+    )
+    date_to = forms.DateField(
+        label='По дату',
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date'}),
+    )
+    page = forms.IntegerField(
+        min_value=1, max_value=settings.NEWS_SEARCH_MAX_PAGE, required=False
+    )
@@ -0,0 +1,77 @@
+"""
+Кэш отрендеренных фрагментов страницы новости.
+
+Ключ фрагмента содержит pk новости и номер её версии. Сигналы
+увеличивают версию при любом изменении новости или её комментариев.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+
+from . import cache as news_cache, replicas
+from .models import News
+
+VERSION_KEY = 'news:detail:{pk}:version'
+FRAGMENT_KEY = 'news:detail:{pk}:v{version}:{name}'
+
+
+def bump_version(pk):
+    """Делает недействительными все фрагменты новости."""
+    news_cache.bump_version(VERSION_KEY.format(pk=pk))
+
+
+def bump_versions(pks):
+    """Делает недействительными фрагменты нескольких новостей разом."""
+    news_cache.reset_versions([VERSION_KEY.format(pk=pk) for pk in pks])
+
+
+def get_or_render(pk, name, render):
+    """
+    Возвращает фрагмент из кэша, а при промахе строит его через render.
+
+    Версия читается до построения фрагмента: если новость изменится
+    во время рендеринга, результат ляжет под старую версию
+    и никогда не будет прочитан. Фрагмент строится из основной базы,
+    а не с реплики.
+    """
+    key = FRAGMENT_KEY.format(
+        pk=pk,
+        version=news_cache.get_version(VERSION_KEY.format(pk=pk)),
+        name=name,
+    )
+    value = cache.get(key)
+    if value is None:
+        with replicas.primary_reads():
+            value = render()
+        cache.set(key, value, settings.NEWS_FRAGMENT_CACHE_TIMEOUT)
+    return value
+
+
+def get_article(pk):
+    """Новость с отрендеренным текстом статьи в атрибуте fragment."""
+    def render():
+        news = get_object_or_404(News, pk=pk)
+        news.fragment = render_to_string(
+            'includes/article.html', {'news': news}
+        )
+        return news
+    return get_or_render(pk, 'article', render)
+
+
+def get_comments_page(pk, paginator, cursor):
+    """
+    Страница комментариев к новости.
+
+    У каждого комментария в атрибуте fragment лежит общая для всех
+    пользователей часть разметки; ссылки на редактирование
+    и удаление добавляет шаблон уже после кэша.
+    """
+    def render():
+        page = paginator.get_page(cursor)
+        for comment in page:
+            comment.fragment = render_to_string(
+                'includes/comment.html', {'comment': comment}
+            )
+        return page
+    return get_or_render(pk, f'comments:{cursor or ""}', render)
@@ -0,0 +1,132 @@
+"""
+Массовая загрузка комментариев из NDJSON.
+
+Каждая строка — объект вида
+{"news": 1, "author": "username", "text": "..."}.
+Строки обрабатываются пачками: новости и авторы пачки находятся
+двумя запросами, тексты проверяются по правилам CommentForm,
+а комментарии вставляются через bulk_create в своей транзакции.
+Ошибочные строки попадают в отчёт и не прерывают загрузку.
+"""
+import json
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .forms import clean_comment_text
+from .models import Comment, News
+from .signals import invalidate_news_pages
+
+DEFAULT_BATCH_SIZE = 5000
+
+INVALID_JSON = 'Строка не является объектом JSON.'
+UNKNOWN_NEWS = 'Новость не найдена.'
+UNKNOWN_AUTHOR = 'Автор не найден.'
+
+User = get_user_model()
+
+
+def _parse(line):
+    """Разбирает строку; для всего, кроме объекта JSON, возвращает None."""
+    try:
+        row = json.loads(line)
+    except ValueError:
+        return None
+    return row if isinstance(row, dict) else None
+
+
+def _news_id(row):
+    """Первичный ключ новости из строки или None, если это не целое."""
+    value = row.get('news')
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return None
+
+
+def _username(row):
+    """Имя автора из строки или None, если это не строка."""
+    value = row.get('author')
+    return value if isinstance(value, str) else None
+
+
+def _lookup(rows):
+    """Находит новости и авторов всей пачки двумя запросами."""
+    news_ids = set(
+        News.objects.filter(
+            pk__in={_news_id(row) for _, row in rows} - {None}
+        ).values_list('pk', flat=True)
+    )
+    authors = dict(
+        User.objects.filter(
+            username__in={_username(row) for _, row in rows} - {None}
+        ).values_list('username', 'pk')
+    )
+    return news_ids, authors
+
+
+def _build_comment(row, news_ids, authors):
+    """Возвращает комментарий из строки и список ошибок в ней."""
+    errors = []
+    news_id = _news_id(row)
+    if news_id not in news_ids:
+        errors.append(UNKNOWN_NEWS)
+    author_id = authors.get(_username(row))
+    if author_id is None:
+        errors.append(UNKNOWN_AUTHOR)
+    try:
+        text = clean_comment_text(row.get('text'))
+    except ValidationError as error:
+        errors.extend(error.messages)
+    if errors:
+        return None, errors
+    return Comment(news_id=news_id, author_id=author_id, text=text), []
+
+
+def _ingest_batch(numbered_lines, report):
+    rows = []
+    for number, line in numbered_lines:
+        row = _parse(line)
+        if row is None:
+            report['errors'].append({'line': number, 'errors': [INVALID_JSON]})
+        else:
+            rows.append((number, row))
+    news_ids, authors = _lookup(rows)
+    comments = []
+    for number, row in rows:
+        comment, errors = _build_comment(row, news_ids, authors)
+        if errors:
+            report['errors'].append({'line': number, 'errors': errors})
+        else:
+            comments.append(comment)
+    if not comments:
+        return
+    per_news = Counter(comment.news_id for comment in comments)
+    with transaction.atomic():
+        Comment.objects.bulk_create(comments)
+        News.change_comment_counts(per_news)
+    invalidate_news_pages(*per_news)
+    report['created'] += len(comments)
+
+
+def ingest_comments(lines, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Загружает комментарии из итератора строк NDJSON.
+
+    Возвращает отчёт: число созданных комментариев и ошибки
+    с номерами строк. Пустые строки пропускаются.
+    """
+    report = {'created': 0, 'errors': []}
+    numbered = (
+        (number, line)
+        for number, line in enumerate(lines, start=1)
+        if line.strip()
+    )
+    while True:
+        batch = list(islice(numbered, batch_size))
+        if not batch:
+            break
+        _ingest_batch(batch, report)
+    return report
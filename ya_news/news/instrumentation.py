@@ -0,0 +1,220 @@
+"""
+Замеры производительности каждого запроса.
+
+PerfMiddleware включается настройкой PERF_INSTRUMENTATION и должна
+стоять первой в MIDDLEWARE. Для каждого запроса она считает общее
+время, число и время SQL-запросов, время рендеринга шаблона,
+попадания и промахи кэша, а с PERF_TRACE_MEMORY — и пик памяти,
+выделенной за запрос, по tracemalloc. Итоги уходят в заголовок
+Server-Timing, в строку лога JSON и в скользящую историю по имени
+URL, которую показывает страница perf_stats.
+
+tracemalloc замедляет каждое выделение памяти и считает память всего
+процесса: пик честен при одном потоке, например под runserver
+--nothreading, а время ответа с ним завышено.
+
+Время шаблона включает и запросы, выполненные при его рендеринге:
+ленивые QuerySet обычно вычисляются именно там.
+"""
+import json
+import logging
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы времени ответа, мс.
+BUCKETS = (10, 25, 50, 100, 250, 500, 1000)
+BUCKET_LABELS = (
+    *(f'≤ {bound}' for bound in BUCKETS), f'> {BUCKETS[-1]}'
+)
+# Под этим именем копятся запросы к адресам, которых нет в urls:
+# иначе история росла бы с каждым новым неизвестным путём.
+UNRESOLVED = '<unresolved>'
+
+_local = threading.local()
+_history = defaultdict(lambda: deque(maxlen=settings.PERF_HISTORY_SIZE))
+_history_lock = threading.Lock()
+
+
+class RequestStats:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0
+        self.template_start = None
+        self.template_time = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.memory_start = None
+        if tracemalloc.is_tracing():
+            self.memory_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка execute_wrapper: считает запросы и их время."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.sql_count += 1
+
+    def as_dict(self):
+        return {
+            'total_ms': round((time.perf_counter() - self.start) * 1000, 2),
+            'sql_count': self.sql_count,
+            'sql_ms': round(self.sql_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'memory_peak_kb': self.memory_peak_kb(),
+        }
+
+    def memory_peak_kb(self):
+        """Пик памяти сверх занятой до запроса или None без tracemalloc."""
+        if self.memory_start is None or not tracemalloc.is_tracing():
+            return None
+        peak = tracemalloc.get_traced_memory()[1]
+        return round((peak - self.memory_start) / 1024)
+
+
+def current():
+    """Замеры запроса, который обрабатывается в этом потоке."""
+    return getattr(_local, 'stats', None)
+
+
+class CountingCache:
+    """
+    Обёртка экземпляра кэша, которая считает попадания и промахи.
+
+    Кэш подменяется только в потоке запроса и только на время замера,
+    остальные вызовы доходят до экземпляра без изменений.
+    """
+    _missing = object()
+
+    def __init__(self, cache, stats):
+        self._cache = cache
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def get(self, key, default=None, version=None):
+        value = self._cache.get(key, self._missing, version)
+        if value is self._missing:
+            self._stats.cache_misses += 1
+            return default
+        self._stats.cache_hits += 1
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self._cache.get_many(keys, version)
+        self._stats.cache_hits += len(values)
+        self._stats.cache_misses += len(keys) - len(values)
+        return values
+
+
+def record(url_name, data):
+    with _history_lock:
+        _history[url_name].append((data['total_ms'], data['sql_count']))
+
+
+def get_report():
+    """Сводка по истории: перцентили и гистограмма для каждого URL."""
+    with _history_lock:
+        history = {name: list(items) for name, items in _history.items()}
+    report = []
+    for name, items in sorted(history.items()):
+        timings = sorted(total for total, _ in items)
+        counts = [0] * (len(BUCKETS) + 1)
+        for total in timings:
+            counts[sum(total > bound for bound in BUCKETS)] += 1
+        report.append({
+            'url_name': name,
+            'requests': len(timings),
+            'p50': timings[len(timings) // 2],
+            'p95': timings[int(len(timings) * 0.95)],
+            'max': timings[-1],
+            'sql': round(statistics.mean(sql for _, sql in items), 1),
+            'histogram': counts,
+        })
+    return report
+
+
+def clear_history():
+    with _history_lock:
+        _history.clear()
+
+
+def server_timing(data):
+    return ', '.join((
+        f'total;dur={data["total_ms"]}',
+        f'sql;dur={data["sql_ms"]};desc="{data["sql_count"]} queries"',
+        f'tpl;dur={data["template_ms"]}',
+        f'cache;desc="{data["cache_hits"]} hits, '
+        f'{data["cache_misses"]} misses"',
+    ))
+
+
+class PerfMiddleware:
+    def __init__(self, get_response):
+        if not settings.PERF_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if settings.PERF_TRACE_MEMORY and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __call__(self, request):
+        _local.stats = stats = RequestStats()
+        originals = {alias: caches[alias] for alias in settings.CACHES}
+        try:
+            for alias, cache in originals.items():
+                caches[alias] = CountingCache(cache, stats)
+            with ExitStack() as wrappers:
+                for connection in connections.all():
+                    wrappers.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            for alias, cache in originals.items():
+                caches[alias] = cache
+            _local.stats = None
+        data = stats.as_dict()
+        match = request.resolver_match
+        url_name = match.view_name if match else None
+        record(url_name or UNRESOLVED, data)
+        response['Server-Timing'] = server_timing(data)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'url_name': url_name,
+            'status': response.status_code,
+            **data,
+        }))
+        return response
+
+    def process_template_response(self, request, response):
+        # Шаблон рендерится сразу после этого метода, а колбэки
+        # вызываются сразу после рендеринга.
+        stats = current()
+        stats.template_start = time.perf_counter()
+
+        def rendered(response):
+            stats.template_time += time.perf_counter() - stats.template_start
+        response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,125 @@
+import random
+from collections import Counter
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from news import search
+from news.models import Comment, News
+from news.signals import invalidate_news_pages
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 2000
+
+WORDS = (
+    'город', 'новости', 'погода', 'выборы', 'спорт', 'музыка', 'кино',
+    'наука', 'школа', 'дорога', 'праздник', 'выставка', 'экономика',
+    'технологии', 'здоровье', 'транспорт', 'парк', 'театр', 'футбол',
+    'мост', 'рынок', 'библиотека', 'концерт', 'фестиваль', 'ремонт',
+)
+
+
+def sentence(rng, words_count):
+    return ' '.join(rng.choices(WORDS, k=words_count)).capitalize() + '.'
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетических пользователей, новости и комментарии '
+        'для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--news', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.0,
+            help=(
+                'Показатель закона Ципфа для распределения комментариев '
+                'по новостям; 0 — равномерно.'
+            ),
+        )
+        parser.add_argument(
+            '--password',
+            default='password',
+            help='Общий пароль созданных пользователей.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        password = make_password(options['password'])
+        start = User.objects.count()
+        User.objects.bulk_create(
+            (
+                User(username=f'user{start + i}', password=password)
+                for i in range(options['users'])
+            ),
+            batch_size=batch_size,
+        )
+        today = timezone.localdate()
+        News.objects.bulk_create(
+            (
+                News(
+                    title=sentence(rng, 3)[:50],
+                    text=' '.join(
+                        sentence(rng, rng.randint(5, 15)) for _ in range(5)
+                    ),
+                    date=today - timedelta(days=rng.randrange(365)),
+                )
+                for _ in range(options['news'])
+            ),
+            batch_size=batch_size,
+        )
+        # bulk_create не отправляет сигналы: индекс строим заново.
+        if search.has_index():
+            search.rebuild(batch_size)
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        # Несколько новостей собирают большую часть комментариев,
+        # как популярные материалы на настоящем сайте.
+        news_ids = list(News.objects.order_by('pk').values_list(
+            'pk', flat=True
+        ))
+        rng.shuffle(news_ids)
+        cum_weights = list(accumulate(
+            1 / rank ** options['skew']
+            for rank in range(1, len(news_ids) + 1)
+        ))
+        remaining = options['comments'] if news_ids and user_ids else 0
+        created = 0
+        while remaining:
+            size = min(batch_size, remaining)
+            remaining -= size
+            comments = [
+                Comment(
+                    news_id=news_id,
+                    author_id=rng.choice(user_ids),
+                    text=sentence(rng, rng.randint(3, 20)),
+                )
+                for news_id in rng.choices(
+                    news_ids, cum_weights=cum_weights, k=size
+                )
+            ]
+            per_news = Counter(comment.news_id for comment in comments)
+            with transaction.atomic():
+                Comment.objects.bulk_create(comments)
+                News.change_comment_counts(per_news)
+            invalidate_news_pages(*per_news)
+            created += size
+        self.stdout.write(
+            f'Создано пользователей: {options["users"]}, '
+            f'новостей: {options["news"]}, комментариев: {created}.'
+        )
@@ -0,0 +1,40 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from news.ingest import DEFAULT_BATCH_SIZE, ingest_comments
+
+
+class Command(BaseCommand):
+    help = 'Загружает комментарии из файла NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Путь к файлу NDJSON; «-» — читать из stdin.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Сколько строк проверять и вставлять за раз.',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options['path'] == '-':
+            report = ingest_comments(sys.stdin, options['batch_size'])
+        else:
+            with open(options['path'], encoding='utf-8') as file:
+                report = ingest_comments(file, options['batch_size'])
+        elapsed = time.perf_counter() - start
+        for error in report['errors']:
+            self.stderr.write(
+                f'Строка {error["line"]}: {" ".join(error["errors"])}'
+            )
+        self.stdout.write(
+            f'Загружено комментариев: {report["created"]}, '
+            f'ошибок: {len(report["errors"])}, '
+            f'{report["created"] / elapsed:.0f} в секунду.'
+        )
@@ -0,0 +1,72 @@
+import sys
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news.loader import DEFAULT_BATCH_SIZE, FixtureLoader, deferred_indexes
+from news.models import Comment, News
+from news.streaming import FORMATS, guess_format, iter_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает новости и комментарии из фикстуры JSON '
+        'или NDJSON, не читая файл в память целиком.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Путь к фикстуре; «-» — читать из stdin.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла; по умолчанию — по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Сколько записей вставлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--defer-indexes',
+            action='store_true',
+            help='Удалить индексы на время загрузки и создать их в конце.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or guess_format(path)
+        loader = FixtureLoader(options['batch_size'], self.report_progress)
+        defer = (
+            deferred_indexes((News, Comment)) if options['defer_indexes']
+            else nullcontext(False)
+        )
+        # stdin не закрываем: он принадлежит процессу, а не команде.
+        file = (
+            nullcontext(sys.stdin) if path == '-'
+            else open(path, encoding='utf-8')
+        )
+        try:
+            with file as stream, defer as deferred:
+                if options['defer_indexes'] and not deferred:
+                    self.stderr.write(
+                        'Бэкенд не позволяет удалить индексы, '
+                        'загружаем с ними.'
+                    )
+                loaded = loader.load(iter_records(stream, file_format))
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(
+            f'Загружено новостей: {loaded["news.news"]}, '
+            f'комментариев: {loaded["news.comment"]}.'
+        )
+
+    def report_progress(self, loaded, elapsed):
+        total = sum(loaded.values())
+        self.stdout.write(
+            f'Загружено записей: {total}, '
+            f'{total / elapsed:.0f} в секунду.'
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from news import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает поисковый индекс новостей, читая таблицу '
+        'порциями.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=search.DEFAULT_CHUNK_SIZE,
+            help='Сколько новостей читать и индексировать за раз.',
+        )
+
+    def handle(self, *args, **options):
+        if not search.has_index():
+            raise CommandError(
+                'В базе нет таблицы FTS5: примените миграции '
+                'или используйте SQLite с поддержкой FTS5.'
+            )
+
+        def progress(indexed):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Проиндексировано: {indexed}')
+
+        indexed = search.rebuild(options['chunk_size'], progress)
+        self.stdout.write(f'Проиндексировано новостей: {indexed}.')
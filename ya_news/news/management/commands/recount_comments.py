@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news.models import News
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает и исправляет счётчики опубликованных комментариев '
+        'у новостей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Сколько новостей проверять за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        actual_count = News.actual_comment_count()
+        checked = fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                News.objects.filter(pk__gt=last_pk).order_by('pk').annotate(
+                    actual_count=actual_count
+                ).values_list('pk', 'comment_count', 'actual_count')[
+                    :batch_size
+                ]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            checked += len(batch)
+            drifted = [pk for pk, stored, actual in batch if stored != actual]
+            if drifted:
+                # Пересчитываем прямо в UPDATE, чтобы не затереть
+                # комментарии, добавленные после чтения пачки.
+                with transaction.atomic():
+                    fixed += News.objects.filter(pk__in=drifted).update(
+                        comment_count=actual_count
+                    )
+        self.stdout.write(
+            f'Проверено новостей: {checked}, исправлено счётчиков: {fixed}.'
+        )
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from news.moderation import resubmit_pending
+
+DEFAULT_OLDER_THAN = 60
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново ставит в очередь модерации комментарии, задачи которых '
+        'потерялись, например при перезапуске процесса.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=DEFAULT_OLDER_THAN,
+            help='Сколько секунд комментарий должен ждать модерации.',
+        )
+
+    def handle(self, *args, **options):
+        count = resubmit_pending(timedelta(seconds=options['older_than']))
+        self.stdout.write(f'Отправлено на модерацию: {count}.')
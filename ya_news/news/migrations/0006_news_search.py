@@ -0,0 +1,42 @@
+from django.db import OperationalError, migrations
+
+# Схема зафиксирована здесь, а не берётся из news.search: миграция
+# должна создавать ту же таблицу, как бы ни менялся код поиска.
+FTS_TABLE = 'news_news_search'
+FTS_SCHEMA = (
+    f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+    "title, text, tokenize='unicode61 remove_diacritics 2', "
+    "prefix='2 3')"
+)
+
+
+def create_index(apps, schema_editor):
+    """Создаёт таблицу FTS5 и заполняет её уже опубликованными новостями."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(FTS_SCHEMA)
+    except OperationalError:
+        # SQLite собран без FTS5: поиск обойдётся icontains.
+        return
+    table = apps.get_model('news', 'News')._meta.db_table
+    schema_editor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, title, text) '
+        f'SELECT id, title, text FROM {table}'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_comment_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
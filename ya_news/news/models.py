@@ -1,24 +1,86 @@
+from collections import defaultdict
 from datetime import datetime
 
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('-date',)
+        indexes = (
+            models.Index(fields=('date', 'id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def change_comment_count(cls, news_id, delta):
+        """
+        Атомарно изменяет счётчик комментариев новости на delta.
+
+        Вызывается в той же транзакции, что и запись комментария.
+        """
+        cls.change_comment_counts({news_id: delta})
+
+    @classmethod
+    def change_comment_counts(cls, deltas):
+        """
+        Изменяет счётчики нескольких новостей: {pk новости: delta}.
+
+        Новости с одинаковой разницей обновляются одним запросом.
+        """
+        by_delta = defaultdict(list)
+        for news_id, delta in deltas.items():
+            by_delta[delta].append(news_id)
+        for delta, news_ids in by_delta.items():
+            cls.objects.filter(pk__in=news_ids).update(
+                comment_count=Greatest(models.F('comment_count') + delta, 0)
+            )
+
+    @staticmethod
+    def actual_comment_count():
+        """Выражение с настоящим числом опубликованных комментариев."""
+        return Coalesce(
+            models.Subquery(
+                Comment.objects.filter(
+                    news=models.OuterRef('pk'),
+                    status=Comment.Status.PUBLISHED,
+                ).order_by().values('news').annotate(
+                    count=models.Count('pk')
+                ).values('count')[:1]
+            ),
+            0,
+        )
+
+    @classmethod
+    def recount_comments(cls, news_id):
+        """Пересчитывает счётчик новости одним запросом UPDATE."""
+        cls.objects.filter(pk=news_id).update(
+            comment_count=cls.actual_comment_count()
+        )
+
 
 class Comment(models.Model):
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'На модерации'
+        PUBLISHED = 'published', 'Опубликован'
+        REJECTED = 'rejected', 'Отклонён'
+
     news = models.ForeignKey(
         News,
         on_delete=models.CASCADE
@@ -29,9 +91,21 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(
+        'Статус',
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PUBLISHED,
+    )
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
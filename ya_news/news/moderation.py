@@ -0,0 +1,176 @@
+"""
+Модерация новых комментариев.
+
+Быстрая проверка на запрещённые слова выполняется в форме, в потоке
+запроса. Новый комментарий сохраняется со статусом «на модерации»,
+а более тяжёлые проверки выполняет очередь: комментарий публикуется,
+только если прошёл их все.
+
+Очередь получает задачу как путь к функции и её аргументы, поэтому
+вместо локального пула потоков можно подключить настоящий брокер,
+реализовав класс с методом enqueue и указав его
+в MODERATION_QUEUE_BACKEND. Задачи пула потоков теряются вместе
+с процессом: оставшиеся на модерации комментарии заново ставит
+в очередь команда resubmit_pending, её стоит запускать при старте.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Comment, News
+from .signals import invalidate_news_pages
+
+MODERATE_TASK = 'news.moderation.moderate_comment'
+
+LINK_RE = re.compile(r'https?://|www\.', re.IGNORECASE)
+REPEATED_CHAR_RE = re.compile(r'(.)\1{9,}')
+
+SPAM = 'Похоже на спам'
+DUPLICATE = 'Повтор уже отправленного комментария'
+TOO_FAST = 'Слишком много комментариев подряд'
+
+
+class ImmediateQueue:
+    """Выполняет задачу сразу, в том же потоке."""
+
+    def enqueue(self, task, *args):
+        import_string(task)(*args)
+
+
+class ThreadPoolQueue:
+    """
+    Выполняет задачи в пуле потоков текущего процесса.
+
+    Задача ставится в пул после коммита транзакции, чтобы поток
+    увидел сохранённый комментарий.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.MODERATION_WORKERS,
+            thread_name_prefix='moderation',
+        )
+
+    def enqueue(self, task, *args):
+        transaction.on_commit(
+            lambda: self.executor.submit(self._run, task, *args)
+        )
+
+    @staticmethod
+    def _run(task, *args):
+        try:
+            import_string(task)(*args)
+        finally:
+            close_old_connections()
+
+
+@lru_cache(maxsize=None)
+def _get_queue(backend):
+    return import_string(backend)()
+
+
+def get_queue():
+    """Очередь, заданная в MODERATION_QUEUE_BACKEND."""
+    return _get_queue(settings.MODERATION_QUEUE_BACKEND)
+
+
+def submit(comment):
+    """Отправляет новый комментарий на модерацию."""
+    get_queue().enqueue(MODERATE_TASK, comment.pk)
+
+
+def resubmit_pending(older_than):
+    """
+    Заново ставит в очередь комментарии, которые ждут модерации
+    дольше older_than (timedelta); возвращает их число.
+
+    Повторная задача для уже проверенного комментария ничего
+    не меняет, поэтому лишний запуск безопасен.
+    """
+    queue = get_queue()
+    pks = list(Comment.objects.filter(
+        status=Comment.Status.PENDING,
+        created__lt=timezone.now() - older_than,
+    ).order_by('pk').values_list('pk', flat=True))
+    for pk in pks:
+        queue.enqueue(MODERATE_TASK, pk)
+    return len(pks)
+
+
+def check_spam(comment):
+    """Много ссылок или длинные повторы одного символа."""
+    links = len(LINK_RE.findall(comment.text))
+    if links > settings.MODERATION_MAX_LINKS:
+        return SPAM
+    if REPEATED_CHAR_RE.search(comment.text):
+        return SPAM
+    return None
+
+
+def check_duplicate(comment):
+    """
+    Тот же автор уже оставил такой же комментарий к этой новости.
+
+    Сравниваем с опубликованными и с более ранними комментариями:
+    два одинаковых, отправленных одновременно, иначе отклонили бы
+    друг друга, и не прошёл бы ни один.
+    """
+    duplicates = Comment.objects.filter(
+        Q(status=Comment.Status.PUBLISHED)
+        | Q(status=Comment.Status.PENDING, pk__lt=comment.pk),
+        news_id=comment.news_id,
+        author_id=comment.author_id,
+        text=comment.text,
+    )
+    return DUPLICATE if duplicates.exists() else None
+
+
+def check_rate(comment):
+    """Автор оставляет комментарии чаще, чем позволено."""
+    since = comment.created - timedelta(
+        seconds=settings.MODERATION_RATE_PERIOD
+    )
+    recent = Comment.objects.filter(
+        author_id=comment.author_id,
+        created__gt=since,
+        created__lte=comment.created,
+    ).exclude(pk=comment.pk).count()
+    return TOO_FAST if recent >= settings.MODERATION_RATE_LIMIT else None
+
+
+def moderate_comment(comment_id):
+    """
+    Проверяет комментарий и публикует или отклоняет его.
+
+    Статус меняется, только если комментарий всё ещё ждёт
+    модерации и его текст не изменился после проверки, поэтому
+    повторный запуск задачи безопасен, а отредактированный во время
+    проверки текст проверит задача, поставленная после правки.
+    """
+    comment = Comment.objects.filter(
+        pk=comment_id, status=Comment.Status.PENDING
+    ).first()
+    if comment is None:
+        return None
+    reason = None
+    for check in settings.MODERATION_CHECKS:
+        reason = import_string(check)(comment)
+        if reason:
+            break
+    status = Comment.Status.REJECTED if reason else Comment.Status.PUBLISHED
+    with transaction.atomic():
+        updated = Comment.objects.filter(
+            pk=comment_id, status=Comment.Status.PENDING, text=comment.text
+        ).update(status=status)
+        if updated and status == Comment.Status.PUBLISHED:
+            News.change_comment_count(comment.news_id, 1)
+    if updated:
+        invalidate_news_pages(comment.news_id)
+    return reason
@@ -0,0 +1,114 @@
+"""
+Кэш целых страниц для анонимных посетителей.
+
+Запись живёт дольше своего срока свежести: после него один запрос
+берёт блокировку и пересчитывает страницу, а остальные в это время
+получают устаревшую копию. Так истечение срока под нагрузкой
+не превращается в сотни одинаковых запросов к базе.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from . import cache as news_cache, replicas
+
+VERSION_KEY = 'news:page:version'
+PAGE_KEY = 'news:page:v{version}:{path}'
+LOCK_SUFFIX = ':lock'
+WAIT_STEP = 0.05
+
+HIT = 'page_hit'
+STALE = 'page_stale'
+MISS = 'page_miss'
+STATS = (HIT, STALE, MISS)
+
+
+def bump_version():
+    """Делает недействительными все закэшированные страницы."""
+    news_cache.bump_version(VERSION_KEY)
+
+
+def get_page_key(path):
+    digest = hashlib.md5(path.encode()).hexdigest()
+    return PAGE_KEY.format(
+        version=news_cache.get_version(VERSION_KEY), path=digest
+    )
+
+
+def get_stats():
+    """Счётчики попаданий, устаревших ответов и промахов."""
+    return news_cache.get_stats(STATS)
+
+
+def _response_from_entry(entry):
+    response = HttpResponse(
+        entry['content'], content_type=entry['content_type']
+    )
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def _render(view, request, *args, **kwargs):
+    """
+    Вызывает view и сохраняет страницу, если ответ удачный.
+
+    Страница для кэша читается из основной базы, а не с реплики.
+    """
+    with replicas.primary_reads():
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    if response.status_code == 200:
+        entry = {
+            'content': response.content,
+            'content_type': response['Content-Type'],
+            'fresh_until': time.time() + settings.NEWS_PAGE_CACHE_TIMEOUT,
+        }
+        cache.set(
+            get_page_key(request.get_full_path()),
+            entry,
+            settings.NEWS_PAGE_CACHE_TIMEOUT
+            + settings.NEWS_PAGE_CACHE_STALE_TIMEOUT,
+        )
+    return response
+
+
+def cache_anonymous_page(view):
+    """Кэширует ответы view на GET-запросы анонимных посетителей."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        key = get_page_key(request.get_full_path())
+        entry = cache.get(key)
+        if entry is not None and entry['fresh_until'] > time.time():
+            news_cache.count(HIT)
+            return _response_from_entry(entry)
+        lock_key = key + LOCK_SUFFIX
+        if cache.add(lock_key, True, settings.NEWS_PAGE_CACHE_LOCK_TIMEOUT):
+            news_cache.count(MISS)
+            try:
+                return _render(view, request, *args, **kwargs)
+            finally:
+                cache.delete(lock_key)
+        if entry is not None:
+            news_cache.count(STALE)
+            return _response_from_entry(entry)
+        # Копии ещё нет, а страницу уже строит другой запрос:
+        # недолго ждём его результата, чтобы не строить её дважды.
+        deadline = time.monotonic() + settings.NEWS_PAGE_CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_STEP)
+            entry = cache.get(key)
+            if entry is not None:
+                news_cache.count(HIT)
+                return _response_from_entry(entry)
+            if cache.get(lock_key) is None:
+                break
+        news_cache.count(MISS)
+        return _render(view, request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,11 @@
+import pytest
+
+from news.perf_tests.perf import Baseline
+
+
+@pytest.fixture(scope='session')
+def baseline():
+    """Базовая линия замеров; в режиме обновления сохраняется в конце."""
+    baseline = Baseline()
+    yield baseline
+    baseline.save()
@@ -0,0 +1,112 @@
+import json
+from http import HTTPStatus
+from itertools import islice
+from urllib.parse import urlencode
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from news import search
+from news.models import Comment, News
+from news.perf_tests.perf import SIZES, measure
+
+pytestmark = pytest.mark.django_db
+
+INSERT_BATCH_SIZE = 10_000
+# Сколько комментариев в одной массовой загрузке.
+IMPORT_ROWS = 100
+
+# Страница: адрес по новости и допустимый показатель роста времени.
+# Страницы YaNews выводят данные порциями, поэтому время ответа
+# не должно заметно зависеть от числа новостей и комментариев.
+# Исключение — поиск: чтобы отдать первую страницу по рангу, FTS5
+# ранжирует все совпадения, а запрос совпадает с каждой новостью.
+VIEWS = {
+    'news:home': (lambda news: reverse('news:home'), 0.5),
+    'news:archive': (lambda news: reverse('news:archive'), 0.5),
+    'news:detail': (
+        lambda news: reverse('news:detail', args=(news.pk,)), 0.5
+    ),
+    'news:comments': (
+        lambda news: reverse('news:comments', args=(news.pk,)), 0.5
+    ),
+    'news:search': (
+        lambda news: (
+            f'{reverse("news:search")}?{urlencode({"q": "Новость"})}'
+        ),
+        1,
+    ),
+}
+
+
+def bulk_insert(model, objects):
+    objects = iter(objects)
+    while batch := list(islice(objects, INSERT_BATCH_SIZE)):
+        model.objects.bulk_create(batch)
+
+
+def grow(news, author, size):
+    """Доводит число новостей и комментариев к news до size."""
+    bulk_insert(News, (
+        News(title=f'Новость {i}', text='Текст новости.')
+        for i in range(News.objects.count(), size)
+    ))
+    bulk_insert(Comment, (
+        Comment(news=news, author=author, text=f'Комментарий {i}')
+        for i in range(news.comment_set.count(), size)
+    ))
+    News.objects.filter(pk=news.pk).update(comment_count=size)
+    # bulk_create не вызывает сигналы, которые обновляют индекс поиска.
+    search.rebuild()
+
+
+@pytest.mark.parametrize('name', VIEWS)
+def test_view_stays_within_budget(name, client, django_user_model, baseline):
+    """Проверяет время, память и число запросов страницы на росте данных."""
+    url, max_growth = VIEWS[name]
+    author = django_user_model.objects.create(username='author')
+    news = News.objects.create(title='Новость', text='Текст новости.')
+
+    def get():
+        assert client.get(url(news)).status_code == HTTPStatus.OK
+
+    results = {}
+    for size in SIZES:
+        grow(news, author, size)
+        results[size] = measure(get, before=cache.clear)
+    errors = baseline.check(name, results, max_growth)
+    assert not errors, '\n'.join(errors)
+
+
+def test_import_comments_stays_within_budget(
+    admin_client, django_user_model, baseline
+):
+    """
+    Проверяет, что загрузка пачки комментариев не дорожает
+    с ростом базы.
+    """
+    author = django_user_model.objects.create(username='author')
+    news = News.objects.create(title='Новость', text='Текст новости.')
+    body = '\n'.join(
+        json.dumps({
+            'news': news.pk, 'author': author.username,
+            'text': f'Загруженный комментарий {i}',
+        })
+        for i in range(IMPORT_ROWS)
+    )
+
+    def post():
+        response = admin_client.post(
+            reverse('news:import_comments'),
+            data=body,
+            content_type='application/x-ndjson',
+        )
+        assert response.status_code == HTTPStatus.OK
+
+    results = {}
+    for size in SIZES:
+        grow(news, author, size)
+        results[size] = measure(post)
+    errors = baseline.check('news:import_comments', results, 0.5)
+    assert not errors, '\n'.join(errors)
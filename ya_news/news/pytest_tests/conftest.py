@@ -1,14 +1,76 @@
 import pytest
+from collections import Counter
+from contextlib import ExitStack
 from datetime import timedelta
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
 from django.urls import reverse
 
+from news import instrumentation, querycheck
 from news.models import News, Comment
 
 User = get_user_model()
 
+MANY_COMMENTS_COUNT = 200
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Очищает кэш, чтобы тесты не видели фрагменты друг друга."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def immediate_moderation(settings):
+    """Модерирует комментарии сразу, в потоке теста."""
+    settings.MODERATION_QUEUE_BACKEND = 'news.moderation.ImmediateQueue'
+
+
+@pytest.fixture(autouse=True)
+def fail_on_duplicate_queries(settings):
+    """Роняет тест, если страница повторяет одну форму запроса (N+1)."""
+    settings.QUERY_PATTERN_CHECK = querycheck.RAISE
+
+
+@pytest.fixture
+def perf_instrumentation(settings):
+    """Включает PerfMiddleware с пустой историей замеров."""
+    settings.PERF_INSTRUMENTATION = True
+    instrumentation.clear_history()
+    yield
+    instrumentation.clear_history()
+
+
+@pytest.fixture
+def replica_aliases(settings):
+    """Включает чтение с реплик — зеркал тестовой базы."""
+    settings.DATABASE_REPLICAS = ['replica1', 'replica2']
+    return settings.DATABASE_REPLICAS
+
+
+@pytest.fixture
+def queries_by_alias():
+    """Считает запросы к каждой базе: {alias: число запросов}."""
+    counts = Counter()
+
+    def counter(alias):
+        def wrapper(execute, sql, params, many, context):
+            counts[alias] += 1
+            return execute(sql, params, many, context)
+        return wrapper
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(counter(connection.alias))
+            )
+        yield counts
+
 
 @pytest.fixture
 def user(db):
@@ -54,11 +116,13 @@ def news(db):
 @pytest.fixture
 def comment(db, user, news):
     """Создаёт комментарий от 'testuser' к новости."""
-    return Comment.objects.create(
+    comment = Comment.objects.create(
         news=news,
         author=user,
         text='This is a test comment.'
     )
+    News.change_comment_count(news.pk, 1)
+    return comment
 
 
 @pytest.fixture
@@ -80,6 +144,29 @@ def news_list(db):
     News.objects.bulk_create(news_list)
 
 
+@pytest.fixture
+def search_news(db):
+    """Новости для поиска: по ключу — новость с известным текстом."""
+    today = timezone.now().date()
+    return {
+        'rocket': News.objects.create(
+            title='Запуск ракеты',
+            text='Ракета стартовала с космодрома утром.',
+            date=today,
+        ),
+        'weather': News.objects.create(
+            title='Погода',
+            text='Утром старт дождей, ракета не полетит.',
+            date=today - timedelta(days=10),
+        ),
+        'phrase': News.objects.create(
+            title='Космодром',
+            text='На космодроме ракета стартовала вчера <b>вечером</b>.',
+            date=today - timedelta(days=20),
+        ),
+    }
+
+
 @pytest.fixture
 def comment_list(user, news):
     """Создаёт список комментариев к новости с разными датами."""
@@ -96,6 +183,26 @@ def comment_list(user, news):
     Comment.objects.bulk_create(comments)
 
 
+@pytest.fixture
+def news_with_many_comments(user, news_list):
+    """
+    Добавляет к каждой новости на главной большое число комментариев.
+
+    Возвращает количество комментариев у каждой новости.
+    """
+    news_on_home_page = News.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE]
+    comments = [
+        Comment(news=news, author=user, text='Comment ' * 50)
+        for news in news_on_home_page
+        for _ in range(MANY_COMMENTS_COUNT)
+    ]
+    Comment.objects.bulk_create(comments, batch_size=500)
+    News.objects.filter(
+        pk__in=[news.pk for news in news_on_home_page]
+    ).update(comment_count=MANY_COMMENTS_COUNT)
+    return MANY_COMMENTS_COUNT
+
+
 # Фикстуры для URL-адресов
 @pytest.fixture
 def news_home_url():
@@ -103,12 +210,30 @@ def news_home_url():
     return reverse('news:home')
 
 
+@pytest.fixture
+def news_archive_url():
+    """Возвращает URL архива новостей."""
+    return reverse('news:archive')
+
+
+@pytest.fixture
+def news_search_url():
+    """Возвращает URL поиска по новостям."""
+    return reverse('news:search')
+
+
 @pytest.fixture
 def news_detail_url(news):
     """Возвращает URL страницы детали новости."""
     return reverse('news:detail', kwargs={'pk': news.pk})
 
 
+@pytest.fixture
+def news_comments_url(news):
+    """Возвращает URL подгрузки комментариев к новости."""
+    return reverse('news:comments', kwargs={'pk': news.pk})
+
+
 @pytest.fixture
 def news_edit_url(comment):
     """Возвращает URL страницы редактирования комментария."""
@@ -1,7 +1,21 @@
+import json
+import tracemalloc
+from datetime import timedelta
+from http import HTTPStatus
+from unittest import mock
+
 import pytest
 from django.conf import settings
+from django.core.cache import cache, caches
+from django.template import engines
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
 
+from news import authcache, instrumentation, pagecache, search, warmup
 from news.forms import CommentForm
+from news.models import Comment, News
 
 pytestmark = pytest.mark.django_db
 
@@ -33,14 +47,377 @@ def test_news_order_on_homepage(client, news_list, news_home_url):
     )
 
 
+def test_homepage_counts_comments_without_loading_them(
+    client,
+    news_with_many_comments,
+    news_home_url,
+    django_assert_num_queries
+):
+    """
+    Проверяет, что главная страница делает фиксированное число запросов
+    и не загружает сами комментарии, сколько бы их ни было.
+    """
+    with django_assert_num_queries(1):
+        response = client.get(news_home_url)
+    object_list = response.context['object_list']
+    for news in object_list:
+        assert news.comment_count == news_with_many_comments
+        assert not getattr(news, '_prefetched_objects_cache', None), (
+            'Комментарии не должны загружаться на главной странице'
+        )
+    expected_text = f'Комментариев: {news_with_many_comments}'
+    assert expected_text in response.content.decode()
+
+
+def test_homepage_memory_does_not_grow_with_comments(
+    client,
+    news_with_many_comments,
+    news_home_url
+):
+    """
+    Проверяет, что пик памяти на главной меньше даже половины текста
+    комментариев к её новостям: сами комментарии не загружаются.
+    """
+    comments_size = sum(
+        len(text.encode()) for text in Comment.objects.filter(
+            news__in=News.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        ).values_list('text', flat=True)
+    )
+    # Первый запрос разбирает шаблоны и загружает модули; второй
+    # после сброса кэша страниц строит главную заново.
+    client.get(news_home_url)
+    cache.clear()
+    tracemalloc.start()
+    try:
+        client.get(news_home_url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < comments_size / 2
+
+
+def test_homepage_cached_for_anonymous_users(
+    client,
+    news_list,
+    news_home_url,
+    django_assert_num_queries
+):
+    """
+    Проверяет, что повторный запрос главной анонимом
+    отдаётся из кэша без обращений к базе.
+    """
+    first = client.get(news_home_url)
+    with django_assert_num_queries(0):
+        second = client.get(news_home_url)
+    assert second['X-Page-Cache'] == 'hit'
+    assert second.content == first.content
+    assert pagecache.get_stats() == {
+        pagecache.HIT: 1, pagecache.STALE: 0, pagecache.MISS: 1
+    }
+
+
+def test_homepage_not_cached_for_logged_in_users(
+    author_client,
+    user,
+    news_list,
+    news_home_url
+):
+    """Проверяет, что авторизованный пользователь не получает копию."""
+    Client().get(news_home_url)
+    response = author_client.get(news_home_url)
+    assert not response.has_header('X-Page-Cache')
+    assert user.username in response.content.decode()
+
+
+def test_anonymous_request_skips_session(client, news_home_url):
+    """Проверяет, что анонимный GET не загружает сессию."""
+    response = client.get(news_home_url)
+    assert not response.wsgi_request.user.is_authenticated
+    assert not response.wsgi_request.session.accessed
+
+
+def test_logged_in_user_read_from_cache(
+    author_client,
+    user,
+    news_list,
+    news_home_url,
+    django_assert_num_queries
+):
+    """
+    Проверяет, что после первого запроса сессия и пользователь
+    берутся из кэша: остаётся только запрос новостей.
+    """
+    author_client.get(news_home_url)
+    with django_assert_num_queries(1):
+        response = author_client.get(news_home_url)
+    assert response.wsgi_request.user == user
+
+
+def test_password_change_ends_cached_sessions(
+    author_client,
+    user,
+    news_home_url
+):
+    """Проверяет, что смена пароля сбрасывает пользователя из кэша."""
+    author_client.get(news_home_url)
+    user.set_password('new-password')
+    user.save()
+    response = author_client.get(news_home_url)
+    assert not response.wsgi_request.user.is_authenticated
+
+
+def test_password_hash_not_cached(author_client, user, news_home_url):
+    """Проверяет, что в кэше нет хеша пароля, а save() его сохраняет."""
+    author_client.get(news_home_url)
+    cached_user, _ = cache.get(authcache.USER_KEY.format(pk=user.pk))
+    assert 'password' in cached_user.get_deferred_fields()
+    cached_user.first_name = 'Имя'
+    cached_user.save()
+    user.refresh_from_db()
+    assert user.check_password('password')
+
+
+def test_homepage_cache_invalidated_by_new_news(
+    client,
+    news_list,
+    news_home_url
+):
+    """Проверяет, что новая новость сразу появляется на главной."""
+    client.get(news_home_url)
+    News.objects.create(title='Breaking news', text='Some text')
+    assert 'Breaking news' in client.get(news_home_url).content.decode()
+
+
+def test_homepage_serves_stale_copy_while_recomputing(
+    client,
+    news_list,
+    news_home_url,
+    django_assert_num_queries
+):
+    """
+    Проверяет, что после истечения срока свежести страницу
+    пересчитывает один запрос, а остальные получают старую копию.
+    """
+    client.get(news_home_url)
+    key = pagecache.get_page_key(news_home_url)
+    entry = cache.get(key)
+    entry['fresh_until'] = 0
+    cache.set(key, entry)
+    cache.add(key + pagecache.LOCK_SUFFIX, True)
+    with django_assert_num_queries(0):
+        response = client.get(news_home_url)
+    assert response['X-Page-Cache'] == 'hit'
+    assert pagecache.get_stats()[pagecache.STALE] == 1
+
+    cache.delete(key + pagecache.LOCK_SUFFIX)
+    with django_assert_num_queries(1):
+        response = client.get(news_home_url)
+    assert not response.has_header('X-Page-Cache')
+    assert cache.get(key)['fresh_until'] > 0
+
+
+def test_cache_stats_available_only_to_staff(
+    client,
+    admin_client,
+    news_home_url
+):
+    """Проверяет, что счётчики кэша видны только персоналу."""
+    url = reverse('news:cache_stats')
+    assert client.get(url).status_code == HTTPStatus.FOUND
+    response = admin_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert set(response.json()) == set(pagecache.STATS)
+
+
+def test_archive_pages_cover_all_news_in_order(
+    client,
+    settings,
+    news_list,
+    news_archive_url,
+    django_assert_num_queries
+):
+    """
+    Проверяет, что архив по курсорам выдаёт все новости
+    от новых к старым без повторов, по одному запросу на страницу.
+    """
+    settings.NEWS_COUNT_ON_ARCHIVE_PAGE = 4
+    expected = list(
+        News.objects.order_by('-date', '-pk').values_list('pk', flat=True)
+    )
+    seen = []
+    pages = []
+    url = news_archive_url
+    while url:
+        with django_assert_num_queries(1):
+            response = client.get(url)
+        page = response.context['page']
+        pages.append(url)
+        seen.extend(news.pk for news in page)
+        url = (
+            f'{news_archive_url}?cursor={page.next_cursor}'
+            if page.has_next else None
+        )
+    assert seen == expected
+    assert len(pages) == 4
+
+    response = client.get(pages[-1])
+    previous_url = (
+        f'{news_archive_url}?cursor={response.context["page"].previous_cursor}'
+    )
+    response = client.get(previous_url)
+    previous_page = [news.pk for news in response.context['page']]
+    assert previous_page == expected[8:12]
+
+
+def test_archive_orders_news_with_same_date_by_pk(
+    client,
+    settings,
+    news_list,
+    news_archive_url
+):
+    """
+    Проверяет, что новости за один день идут по убыванию pk
+    без повторов и пропусков на границах страниц.
+    """
+    settings.NEWS_COUNT_ON_ARCHIVE_PAGE = 4
+    same_date = News.objects.order_by('-date')[2].date
+    News.objects.bulk_create(
+        News(title=f'Same day {i}', text='Some text', date=same_date)
+        for i in range(6)
+    )
+    expected = list(
+        News.objects.order_by('-date', '-pk').values_list('pk', flat=True)
+    )
+    same_day_pks = list(
+        News.objects.filter(date=same_date).order_by('-pk').values_list(
+            'pk', flat=True
+        )
+    )
+    assert expected[2:2 + len(same_day_pks)] == same_day_pks
+    seen = []
+    url = news_archive_url
+    while url:
+        page = client.get(url).context['page']
+        seen.extend(news.pk for news in page)
+        assert len(seen) <= len(expected), (
+            'Архив повторяет уже выведенные новости'
+        )
+        url = (
+            f'{news_archive_url}?cursor={page.next_cursor}'
+            if page.has_next else None
+        )
+    assert seen == expected
+
+
+def test_archive_rejects_broken_cursor(client, news_archive_url):
+    """Проверяет, что испорченный курсор приводит к ошибке 404."""
+    response = client.get(f'{news_archive_url}?cursor=broken')
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def found(client, url, **params):
+    response = client.get(url, params)
+    return [news.pk for news in response.context['page']]
+
+
+def test_search_ranks_title_matches_first(
+    client, search_news, news_search_url
+):
+    """Проверяет, что совпадение в заголовке выше, чем в тексте."""
+    assert found(client, news_search_url, q='ракет') == [
+        search_news['rocket'].pk,
+        search_news['weather'].pk,
+        search_news['phrase'].pk,
+    ]
+
+
+def test_search_phrase_and_all_words(client, search_news, news_search_url):
+    """Проверяет поиск фразы целиком и обязательность всех слов."""
+    assert found(client, news_search_url, q='"ракета стартовала"') == [
+        search_news['rocket'].pk, search_news['phrase'].pk,
+    ]
+    assert found(client, news_search_url, q='старт дожд') == [
+        search_news['weather'].pk,
+    ]
+
+
+def test_search_date_range(client, search_news, news_search_url):
+    """Проверяет фильтр по датам."""
+    today = timezone.now().date()
+    assert found(
+        client, news_search_url, q='ракета',
+        date_from=today - timedelta(days=15),
+        date_to=today - timedelta(days=5),
+    ) == [search_news['weather'].pk]
+
+
+def test_search_pages(client, settings, search_news, news_search_url):
+    """Проверяет, что страницы выдачи идут подряд без повторов."""
+    settings.NEWS_COUNT_ON_SEARCH_PAGE = 2
+    response = client.get(news_search_url, {'q': 'ракета'})
+    page = response.context['page']
+    assert len(page) == 2
+    assert page.has_next and not page.has_previous
+    response = client.get(
+        f'{news_search_url}?{response.context["query"]}'
+        f'&page={page.next_cursor}'
+    )
+    last = response.context['page']
+    assert [news.pk for news in last] == [search_news['phrase'].pk]
+    assert last.has_previous and not last.has_next
+
+
+@pytest.mark.parametrize('page', ['0', '51', '999999999999999999'])
+def test_search_rejects_page_out_of_range(
+    client, search_news, news_search_url, page
+):
+    """Проверяет, что номер страницы вне диапазона даёт пустую выдачу."""
+    response = client.get(news_search_url, {'q': 'ракета', 'page': page})
+    assert response.status_code == HTTPStatus.OK
+    assert list(response.context['page']) == []
+
+
+def test_search_has_no_page_after_last(
+    client, settings, search_news, news_search_url
+):
+    """Проверяет, что с последней страницы нет ссылки дальше."""
+    settings.NEWS_COUNT_ON_SEARCH_PAGE = 1
+    settings.NEWS_SEARCH_MAX_PAGE = 2
+    response = client.get(news_search_url, {'q': 'ракета', 'page': 2})
+    assert len(response.context['page']) == 1
+    assert response.context['page'].next_cursor is None
+
+
+def test_search_highlights_escaped_snippet(
+    client, search_news, news_search_url
+):
+    """Проверяет подсветку найденного и экранирование текста."""
+    content = client.get(news_search_url, {'q': 'космодроме'}).content
+    content = content.decode()
+    assert '<mark>Космодром</mark>' not in content
+    assert '<mark>космодроме</mark>' in content
+    assert '&lt;b&gt;вечером&lt;/b&gt;' in content
+
+
+def test_search_without_fts_falls_back_to_icontains(
+    client, monkeypatch, search_news, news_search_url
+):
+    """Проверяет поиск без таблицы FTS5."""
+    monkeypatch.setattr(search, 'has_index', lambda: False)
+    assert found(client, news_search_url, q='ракет') == [
+        search_news['rocket'].pk,
+        search_news['weather'].pk,
+        search_news['phrase'].pk,
+    ]
+
+
 def test_comments_order_on_news_detail(client, news_detail_url, comment_list):
     """Проверяет, что комментарии отображаются в порядке от старых к новым."""
     response = client.get(news_detail_url)
-    news_in_context = response.context.get('object')
-    assert news_in_context is not None, (
-        'В контексте отсутствует объект новости'
+    comments_in_context = response.context.get('comments')
+    assert comments_in_context is not None, (
+        'В контексте отсутствуют комментарии'
     )
-    comments_in_context = news_in_context.comment_set.all()
     comments_dates = [comment.created for comment in comments_in_context]
     sorted_dates = sorted(comments_dates)
     assert comments_dates == sorted_dates, (
@@ -48,6 +425,189 @@ def test_comments_order_on_news_detail(client, news_detail_url, comment_list):
     )
 
 
+def test_news_detail_shows_first_page_of_comments(
+    client,
+    settings,
+    news_detail_url,
+    comment_list,
+    django_assert_num_queries
+):
+    """
+    Проверяет, что на странице новости выводится только
+    первая порция комментариев за фиксированное число запросов.
+    """
+    settings.COMMENTS_COUNT_ON_NEWS_PAGE = 4
+    with django_assert_num_queries(2):
+        response = client.get(news_detail_url)
+    comments = response.context['comments']
+    expected = list(
+        Comment.objects.order_by('created', 'pk').values_list('pk', flat=True)
+    )
+    assert [comment.pk for comment in comments] == expected[:4]
+    assert comments.has_next
+
+
+def test_load_more_returns_remaining_comments(
+    client,
+    settings,
+    news_detail_url,
+    news_comments_url,
+    comment_list
+):
+    """
+    Проверяет, что подгрузка продолжает список комментариев
+    с места, где закончилась страница новости.
+    """
+    settings.COMMENTS_COUNT_ON_NEWS_PAGE = 4
+    response = client.get(news_detail_url)
+    cursor = response.context['comments'].next_cursor
+    loaded = [comment.pk for comment in response.context['comments']]
+    data = None
+    while cursor:
+        response = client.get(news_comments_url, {'cursor': cursor})
+        data = response.json()
+        comments = list(response.context['comments'])
+        assert comments
+        for comment in comments:
+            assert comment.text in data['html']
+        loaded.extend(comment.pk for comment in comments)
+        cursor = data['next_cursor']
+    assert data is not None and data['next_cursor'] is None
+    expected = list(
+        Comment.objects.order_by('created', 'pk').values_list('pk', flat=True)
+    )
+    assert loaded == expected
+
+
+def test_comments_with_same_created_are_paginated_by_pk(
+    client,
+    settings,
+    user,
+    news,
+    news_detail_url,
+    news_comments_url
+):
+    """
+    Проверяет, что комментарии с одинаковым временем создания
+    выводятся по pk без повторов и пропусков на границах страниц.
+    """
+    settings.COMMENTS_COUNT_ON_NEWS_PAGE = 3
+    Comment.objects.bulk_create(
+        Comment(news=news, author=user, text=f'Same time {i}')
+        for i in range(7)
+    )
+    same_time = timezone.now().replace(microsecond=123456)
+    Comment.objects.update(created=same_time)
+    earlier = Comment.objects.create(
+        news=news, author=user, text='Earlier'
+    )
+    Comment.objects.filter(pk=earlier.pk).update(
+        created=same_time - timedelta(microseconds=1)
+    )
+    response = client.get(news_detail_url)
+    page = response.context['comments']
+    loaded = [comment.pk for comment in page]
+    cursor = page.next_cursor
+    while cursor:
+        response = client.get(news_comments_url, {'cursor': cursor})
+        loaded.extend(comment.pk for comment in response.context['comments'])
+        assert len(loaded) <= Comment.objects.count(), (
+            'Подгрузка повторяет уже выведенные комментарии'
+        )
+        cursor = response.json()['next_cursor']
+    same_time_pks = list(
+        Comment.objects.exclude(pk=earlier.pk).order_by('pk').values_list(
+            'pk', flat=True
+        )
+    )
+    assert loaded == [earlier.pk] + same_time_pks
+
+
+@pytest.mark.parametrize('backend', [
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+])
+def test_news_detail_served_from_fragment_cache(
+    client,
+    settings,
+    tmp_path,
+    backend,
+    comment,
+    news_detail_url,
+    django_assert_num_queries
+):
+    """
+    Проверяет, что повторный просмотр новости анонимом
+    не обращается к базе и выдаёт ту же разметку.
+    """
+    settings.CACHES = {
+        'default': {'BACKEND': backend, 'LOCATION': str(tmp_path)}
+    }
+    first = client.get(news_detail_url).content.decode()
+    with django_assert_num_queries(0):
+        second = client.get(news_detail_url).content.decode()
+    assert second == first
+    assert f'<p class="mb-0">{comment.text}</p>' in second
+
+
+@pytest.mark.parametrize('change', [
+    'add_comment', 'edit_comment', 'delete_comment', 'save_news'
+])
+def test_fragment_cache_invalidated_on_changes(
+    author_client,
+    news,
+    comment,
+    news_detail_url,
+    news_edit_url,
+    news_delete_url,
+    change
+):
+    """
+    Проверяет, что изменение комментариев или самой новости
+    сразу видно на странице новости.
+    """
+    author_client.get(news_detail_url)
+    if change == 'add_comment':
+        author_client.post(news_detail_url, data={'text': 'Fresh comment'})
+        expected, unexpected = 'Fresh comment', None
+    elif change == 'edit_comment':
+        author_client.post(news_edit_url, data={'text': 'Edited comment'})
+        expected, unexpected = 'Edited comment', comment.text
+    elif change == 'delete_comment':
+        author_client.post(news_delete_url)
+        expected, unexpected = 'Здесь никто ничего не написал', comment.text
+    else:
+        news.title = 'Updated title'
+        news.save()
+        expected, unexpected = 'Updated title', None
+    content = author_client.get(news_detail_url).content.decode()
+    assert expected in content
+    if unexpected:
+        assert unexpected not in content
+
+
+def test_cached_comments_keep_per_user_links(
+    another_user,
+    author_client,
+    comment,
+    news_detail_url,
+    news_edit_url
+):
+    """
+    Проверяет, что ссылки на редактирование не попадают в кэш
+    и показываются только автору комментария.
+    """
+    anonymous_content = Client().get(news_detail_url).content.decode()
+    assert news_edit_url not in anonymous_content
+    author_content = author_client.get(news_detail_url).content.decode()
+    assert news_edit_url in author_content
+    assert 'csrfmiddlewaretoken' in author_content
+    reader_client = Client()
+    reader_client.force_login(another_user)
+    reader_content = reader_client.get(news_detail_url).content.decode()
+    assert news_edit_url not in reader_content
+
+
 @pytest.mark.parametrize('client_fixture, form_expected', [
     (pytest.lazy_fixture('client'), False),
     (pytest.lazy_fixture('author_client'), True),
@@ -63,3 +623,107 @@ def test_comment_form_visibility(
     assert has_form == form_expected
     if has_form:
         assert isinstance(response.context['form'], CommentForm)
+
+
+def test_perf_middleware_reports_request_timings(
+    client,
+    caplog,
+    perf_instrumentation,
+    comment,
+    news_detail_url
+):
+    """
+    Проверяет, что замеры запроса попадают в Server-Timing,
+    в лог и в историю страницы.
+    """
+    with caplog.at_level('INFO', logger=instrumentation.__name__):
+        response = client.get(news_detail_url)
+    timing = response['Server-Timing']
+    for metric in ('total;dur=', 'sql;dur=', 'tpl;dur=', 'cache;desc='):
+        assert metric in timing
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record['url_name'] == 'news:detail'
+    assert record['sql_count'] > 0
+    assert record['cache_misses'] > 0
+    assert record['template_ms'] > 0
+    assert record['memory_peak_kb'] is None
+    client.get(news_detail_url)
+    report = {row['url_name']: row for row in instrumentation.get_report()}
+    assert report['news:detail']['requests'] == 2
+    assert sum(report['news:detail']['histogram']) == 2
+
+
+def test_perf_middleware_does_not_patch_cache_backends(
+    client,
+    perf_instrumentation,
+    news_detail_url
+):
+    """Проверяет, что счётчик кэша не подменяет методы классов кэша."""
+    backend = type(caches['default'])
+    get = backend.get
+    client.get(news_detail_url)
+    assert backend.get is get
+    assert type(caches['default']) is backend
+
+
+def test_perf_middleware_traces_memory(
+    client,
+    caplog,
+    settings,
+    perf_instrumentation,
+    news_detail_url
+):
+    """Проверяет, что с PERF_TRACE_MEMORY в лог идёт пик памяти."""
+    settings.PERF_TRACE_MEMORY = True
+    try:
+        with caplog.at_level('INFO', logger=instrumentation.__name__):
+            client.get(news_detail_url)
+    finally:
+        tracemalloc.stop()
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record['memory_peak_kb'] > 0
+
+
+def test_perf_middleware_disabled_by_default(client, news_detail_url):
+    """Проверяет, что без настройки замеры не ведутся."""
+    assert 'Server-Timing' not in client.get(news_detail_url)
+
+
+def test_perf_stats_available_only_to_staff(
+    client,
+    admin_client,
+    perf_instrumentation,
+    news_home_url
+):
+    """Проверяет страницу с историей замеров для персонала."""
+    url = reverse('news:perf_stats')
+    assert client.get(url).status_code == HTTPStatus.FOUND
+    admin_client.get(news_home_url)
+    response = admin_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert 'news:home' in response.content.decode()
+
+
+def test_warm_up_precompiles_templates(
+    settings,
+    client,
+    news_home_url,
+    news_detail_url
+):
+    """
+    Проверяет, что после прогрева все шаблоны проекта лежат в кэше
+    загрузчика и страницы рендерятся без чтения файлов.
+    """
+    settings.TEMPLATES_WARM_UP = True
+    engine = engines['django'].engine
+    loader = engine.template_loaders[0]
+    loader.reset()
+    warmup.warm_up()
+    names = set(warmup.template_names(engine))
+    assert {'base.html', 'news/detail.html'} <= names
+    assert names <= set(loader.get_template_cache)
+    with mock.patch.object(
+        FilesystemLoader, 'get_contents', side_effect=AssertionError
+    ):
+        for url in (news_home_url, news_detail_url):
+            assert client.get(url).status_code == HTTPStatus.OK
@@ -1,16 +1,37 @@
+import io
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
 from http import HTTPStatus
+from pathlib import Path
 
 import pytest
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory
 from django.urls import reverse
 from pytest_django.asserts import assertRedirects, assertFormError
 
-from news.models import Comment
+from news import fragments, moderation, querycheck, replicas, search, views
+from news.badwords import MAX_WORD_LENGTH, BadWordsFilter
+from news.models import Comment, News
 from news.forms import BAD_WORDS, WARNING
+from news.streaming import iter_json_array
 
 pytestmark = pytest.mark.django_db
 
 COMMENT_DATA = {'text': 'Test comment'}
 
+NEWS_FIXTURE = Path(__file__).resolve().parent.parent / 'fixtures/news.json'
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+
 
 def test_anonymous_user_cannot_add_comment(
     client,
@@ -65,6 +86,62 @@ def test_comment_with_bad_words_not_published(author_client, news_detail_url):
     )
 
 
+@pytest.mark.parametrize('text', [
+    'РЕДИСКА',
+    'Ну ты и рeдиcкa',  # латинские «е», «с» и «а»
+    'негодяй!',
+    'НЕГОДЯЙ',
+])
+def test_bad_words_found_in_disguise(author_client, news_detail_url, text):
+    """
+    Проверяет, что запрещённые слова находятся
+    в любом регистре и с латинскими буквами вместо кириллицы.
+    """
+    response = author_client.post(news_detail_url, data={'text': text})
+    assert Comment.objects.count() == 0
+    assertFormError(response, form='form', field='text', errors=WARNING)
+
+
+def test_bad_words_filter_matches_whole_words_when_asked():
+    """Проверяет поиск слов целиком и как подстрок."""
+    text = 'Это ёлкапалка, а не ёлка'
+    assert BadWordsFilter(['палка']).search(text) == 'палка'
+    assert BadWordsFilter(['палка'], whole_words=True).search(text) is None
+    assert BadWordsFilter(['елка'], whole_words=True).search(text) == 'елка'
+
+
+def test_bad_words_filter_handles_long_and_nested_words():
+    """
+    Проверяет слова, вложенные друг в друга на всю допустимую длину,
+    и пропуск слов длиннее MAX_WORD_LENGTH.
+    """
+    nested = ['б' * length for length in range(1, MAX_WORD_LENGTH + 1)]
+    too_long = 'а' * 2000
+    bad_words_filter = BadWordsFilter(nested + [too_long])
+    assert bad_words_filter.search('ааа ' + 'б' * 5) == 'б' * 5
+    assert bad_words_filter.search(too_long) is None
+
+
+def test_bad_words_filter_builds_pattern_on_first_search():
+    """Проверяет, что выражение собирается при первой проверке."""
+    bad_words_filter = BadWordsFilter(['редиска'])
+    assert bad_words_filter._pattern is None
+    assert bad_words_filter.search('Ах ты редиска') == 'редиска'
+
+
+def test_bad_words_filter_reloads_changed_file(tmp_path):
+    """Проверяет, что изменённый файл со словами перечитывается."""
+    path = tmp_path / 'bad_words.txt'
+    path.write_text('# Список слов\nсвинтус\n', encoding='utf-8')
+    bad_words_filter = BadWordsFilter(['редиска'], path=path)
+    assert bad_words_filter.search('Ах ты свинтус') == 'свинтус'
+    assert bad_words_filter.search('Ах ты бармалей') is None
+    path.write_text('бармалей\n', encoding='utf-8')
+    assert bad_words_filter.search('Ах ты бармалей') == 'бармалей'
+    assert bad_words_filter.search('Ах ты свинтус') is None
+    assert bad_words_filter.search('Ах ты редиска') == 'редиска'
+
+
 def test_author_can_edit_comment(author_client, comment):
     """Проверяет, что автор комментария может его редактировать."""
     url = reverse('news:edit', kwargs={'pk': comment.pk})
@@ -98,3 +175,689 @@ def test_non_author_cannot_delete_comment(reader_client, comment):
     response = reader_client.post(url)
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert Comment.objects.count() == 1
+
+
+def test_comment_count_increases_after_adding_comment(
+    author_client,
+    news,
+    news_detail_url
+):
+    """Проверяет, что добавление комментария увеличивает счётчик."""
+    author_client.post(news_detail_url, data=COMMENT_DATA)
+    news.refresh_from_db()
+    assert news.comment_count == 1
+
+
+def test_comment_count_decreases_after_deleting_comment(
+    author_client,
+    news,
+    news_delete_url
+):
+    """Проверяет, что удаление комментария уменьшает счётчик."""
+    author_client.post(news_delete_url)
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+
+def test_comment_count_follows_admin_inline(admin_client, user, news, comment):
+    """
+    Проверяет, что счётчик учитывает комментарии,
+    добавленные и удалённые через админку.
+    """
+    url = reverse('admin:news_news_change', args=(news.pk,))
+    data = {
+        'title': news.title,
+        'text': news.text,
+        'date': f'{news.date:%d.%m.%Y}',
+        'comment_set-TOTAL_FORMS': '3',
+        'comment_set-INITIAL_FORMS': '1',
+        'comment_set-MIN_NUM_FORMS': '0',
+        'comment_set-MAX_NUM_FORMS': '1000',
+        'comment_set-0-id': comment.pk,
+        'comment_set-0-news': news.pk,
+        'comment_set-0-author': user.pk,
+        'comment_set-0-text': comment.text,
+        'comment_set-0-status': comment.status,
+        'comment_set-0-DELETE': 'on',
+    }
+    for index in (1, 2):
+        data.update({
+            f'comment_set-{index}-news': news.pk,
+            f'comment_set-{index}-author': user.pk,
+            f'comment_set-{index}-text': f'Admin comment {index}',
+            f'comment_set-{index}-status': Comment.Status.PUBLISHED,
+        })
+    response = admin_client.post(url, data=data)
+    assert response.status_code == HTTPStatus.FOUND
+    news.refresh_from_db()
+    assert news.comment_count == news.comment_set.count() == 2
+
+
+def test_search_index_follows_admin_changes(admin_client, news):
+    """Проверяет, что правка и удаление в админке обновляют индекс."""
+    url = reverse('admin:news_news_change', args=(news.pk,))
+    response = admin_client.post(url, data={
+        'title': 'Обновлённый заголовок',
+        'text': news.text,
+        'date': f'{news.date:%d.%m.%Y}',
+        'comment_set-TOTAL_FORMS': '0',
+        'comment_set-INITIAL_FORMS': '0',
+        'comment_set-MIN_NUM_FORMS': '0',
+        'comment_set-MAX_NUM_FORMS': '1000',
+    })
+    assert response.status_code == HTTPStatus.FOUND
+    assert [item.pk for item in search.search('обновлённый')] == [news.pk]
+    admin_client.post(
+        reverse('admin:news_news_delete', args=(news.pk,)), {'post': 'yes'}
+    )
+    assert list(search.search('обновлённый')) == []
+
+
+def test_rebuild_news_index_command(news_list):
+    """Проверяет, что команда индексирует новости, минуя сигналы."""
+    assert list(search.search('News')) == []
+    out = io.StringIO()
+    call_command('rebuild_news_index', chunk_size=4, stdout=out)
+    assert f'Проиндексировано новостей: {News.objects.count()}.' in (
+        out.getvalue()
+    )
+    assert len(search.search('News', per_page=100)) == News.objects.count()
+
+
+def test_recount_comments_repairs_drifted_counters(news_list, user):
+    """Проверяет, что команда исправляет расходящиеся счётчики."""
+    all_news = list(News.objects.order_by('pk'))
+    Comment.objects.bulk_create(
+        Comment(news=news, author=user, text='Comment')
+        for news in all_news[:3]
+        for _ in range(2)
+    )
+    News.objects.filter(pk=all_news[-1].pk).update(comment_count=5)
+    call_command('recount_comments', batch_size=4)
+    counts = dict(News.objects.values_list('pk', 'comment_count'))
+    for news in all_news:
+        assert counts[news.pk] == news.comment_set.count()
+
+
+@pytest.mark.parametrize('name, method, data, expected_queries', [
+    # Сессия берётся из кэша. Пользователь (в кэше его ещё нет),
+    # новость и вставка; модерация идёт в очереди.
+    ('news:detail', 'post', COMMENT_DATA, 3),
+    # Пользователь, новость и первая страница комментариев.
+    ('news:detail', 'post', {'text': BAD_WORDS[0]}, 3),
+    # Пользователь, комментарий вместе с новостью, а в транзакции —
+    # снятие с публикации, счётчик и обновление; изменённый текст
+    # снова идёт в очередь модерации.
+    ('news:edit', 'post', COMMENT_DATA, 7),
+    ('news:edit', 'get', None, 2),
+    # Пользователь, комментарий, а в транзакции — выборка
+    # опубликованного, удаление и счётчик.
+    ('news:delete', 'post', None, 7),
+    ('news:delete', 'get', None, 2),
+])
+def test_comment_views_query_budget(
+    settings,
+    author_client,
+    news,
+    comment,
+    name,
+    method,
+    data,
+    expected_queries,
+    django_assert_num_queries
+):
+    """Проверяет, что комментарий и новость читаются не больше раза."""
+    settings.MODERATION_QUEUE_BACKEND = 'news.moderation.ThreadPoolQueue'
+    pk = news.pk if name == 'news:detail' else comment.pk
+    url = reverse(name, kwargs={'pk': pk})
+    with django_assert_num_queries(expected_queries):
+        getattr(author_client, method)(url, data=data)
+
+
+def test_new_comment_waits_for_moderation(
+    settings,
+    author_client,
+    news,
+    news_detail_url,
+    django_capture_on_commit_callbacks
+):
+    """
+    Проверяет, что новый комментарий не виден до модерации,
+    а после неё публикуется и попадает в счётчик.
+    """
+    settings.MODERATION_QUEUE_BACKEND = 'news.moderation.ThreadPoolQueue'
+    with django_capture_on_commit_callbacks(execute=False):
+        response = author_client.post(news_detail_url, data=COMMENT_DATA)
+    assert response.status_code == HTTPStatus.FOUND
+    comment = Comment.objects.get()
+    assert comment.status == Comment.Status.PENDING
+    content = author_client.get(news_detail_url).content.decode()
+    assert COMMENT_DATA['text'] not in content
+
+    assert moderation.moderate_comment(comment.pk) is None
+    comment.refresh_from_db()
+    news.refresh_from_db()
+    assert comment.status == Comment.Status.PUBLISHED
+    assert news.comment_count == 1
+    content = author_client.get(news_detail_url).content.decode()
+    assert COMMENT_DATA['text'] in content
+
+
+@pytest.mark.parametrize('texts, reason', [
+    (['Смотрите http://a.ru http://b.ru http://c.ru'], moderation.SPAM),
+    (['Ура' + '!' * 20], moderation.SPAM),
+    (['Одно и то же', 'Одно и то же'], moderation.DUPLICATE),
+    ([f'Комментарий {i}' for i in range(6)], moderation.TOO_FAST),
+])
+def test_moderation_rejects_suspicious_comments(
+    author_client,
+    news,
+    news_detail_url,
+    texts,
+    reason
+):
+    """Проверяет, что спам, повторы и частые комментарии отклоняются."""
+    for text in texts:
+        author_client.post(news_detail_url, data={'text': text})
+    last = Comment.objects.order_by('created', 'pk').last()
+    assert last.status == Comment.Status.REJECTED
+    last.status = Comment.Status.PENDING
+    last.save()
+    assert moderation.moderate_comment(last.pk) == reason
+    news.refresh_from_db()
+    assert news.comment_count == len(texts) - 1
+
+
+def test_edited_comment_is_moderated_again(
+    settings, author_client, news, comment, django_capture_on_commit_callbacks
+):
+    """Проверяет, что изменённый текст снова проходит модерацию."""
+    settings.MODERATION_QUEUE_BACKEND = 'news.moderation.ThreadPoolQueue'
+    url = reverse('news:edit', kwargs={'pk': comment.pk})
+    spam = 'Смотрите http://a.ru http://b.ru http://c.ru'
+    with django_capture_on_commit_callbacks(execute=False):
+        author_client.post(url, data={'text': spam})
+    comment.refresh_from_db()
+    news.refresh_from_db()
+    assert comment.status == Comment.Status.PENDING
+    assert news.comment_count == 0
+    assert moderation.moderate_comment(comment.pk) == moderation.SPAM
+
+
+def test_moderation_skips_text_edited_during_check(
+    monkeypatch, news, user
+):
+    """Проверяет, что текст, изменённый во время проверки, не публикуется."""
+    comment = Comment.objects.create(
+        news=news, author=user, text='Безобидно',
+        status=Comment.Status.PENDING,
+    )
+
+    def edit_during_check(checked):
+        Comment.objects.filter(pk=checked.pk).update(text='Другое')
+
+    monkeypatch.setattr(moderation, 'check_spam', edit_during_check)
+    moderation.moderate_comment(comment.pk)
+    comment.refresh_from_db()
+    assert comment.status == Comment.Status.PENDING
+
+
+def test_simultaneous_duplicates_publish_one(news, user):
+    """Проверяет, что из двух одинаковых ожидающих публикуется первый."""
+    first, second = [
+        Comment.objects.create(
+            news=news, author=user, text='Одно и то же',
+            status=Comment.Status.PENDING,
+        )
+        for _ in range(2)
+    ]
+    assert moderation.moderate_comment(second.pk) == moderation.DUPLICATE
+    assert moderation.moderate_comment(first.pk) is None
+
+
+def test_delete_counts_comment_published_meanwhile(
+    monkeypatch, author_client, news, user
+):
+    """
+    Проверяет счётчик, когда комментарий опубликовали между чтением
+    во view и удалением.
+    """
+    comment = Comment.objects.create(
+        news=news, author=user, text='Текст', status=Comment.Status.PENDING
+    )
+    get_object = views.CommentDelete.get_object
+
+    def get_object_then_publish(self, queryset=None):
+        obj = get_object(self, queryset)
+        moderation.moderate_comment(obj.pk)
+        return obj
+
+    monkeypatch.setattr(
+        views.CommentDelete, 'get_object', get_object_then_publish
+    )
+    author_client.post(reverse('news:delete', kwargs={'pk': comment.pk}))
+    news.refresh_from_db()
+    assert not Comment.objects.exists()
+    assert news.comment_count == 0
+
+
+def test_resubmit_pending_command(news, user):
+    """Проверяет, что давно ждущие модерации снова идут в очередь."""
+    old, fresh = [
+        Comment.objects.create(
+            news=news, author=user, text=f'Комментарий {i}',
+            status=Comment.Status.PENDING,
+        )
+        for i in range(2)
+    ]
+    Comment.objects.filter(pk=old.pk).update(
+        created=old.created - timedelta(minutes=5)
+    )
+    out = io.StringIO()
+    call_command('resubmit_pending', older_than=60, stdout=out)
+    assert 'Отправлено на модерацию: 1.' in out.getvalue()
+    old.refresh_from_db()
+    fresh.refresh_from_db()
+    assert old.status == Comment.Status.PUBLISHED
+    assert fresh.status == Comment.Status.PENDING
+
+
+def test_staff_can_import_comments(admin_client, user, news):
+    """
+    Проверяет массовую загрузку: правильные строки вставляются,
+    ошибочные попадают в отчёт и не мешают остальным.
+    """
+    lines = [
+        json.dumps({'news': news.pk, 'author': user.username, 'text': 'One'}),
+        json.dumps({'news': news.pk, 'author': user.username, 'text': 'Two'}),
+        'not json',
+        json.dumps({'news': news.pk, 'author': user.username,
+                    'text': BAD_WORDS[0]}),
+        '',
+        json.dumps({'news': 0, 'author': 'nobody', 'text': ' '}),
+    ]
+    response = admin_client.post(
+        reverse('news:import_comments'),
+        data='\n'.join(lines),
+        content_type='application/x-ndjson',
+    )
+    assert response.status_code == HTTPStatus.OK
+    report = response.json()
+    assert report['created'] == 2
+    assert [error['line'] for error in report['errors']] == [3, 4, 6]
+    assert report['errors'][1]['errors'] == [WARNING]
+    assert len(report['errors'][2]['errors']) == 3
+    assert set(Comment.objects.values_list('text', flat=True)) == {
+        'One', 'Two'
+    }
+    news.refresh_from_db()
+    assert news.comment_count == 2
+
+
+def test_only_staff_can_import_comments(author_client):
+    """Проверяет, что обычный пользователь не может загружать комментарии."""
+    response = author_client.post(
+        reverse('news:import_comments'),
+        data='{}',
+        content_type='application/x-ndjson',
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    assert Comment.objects.count() == 0
+
+
+@pytest.mark.parametrize('field, value', [
+    ('news', [1]),
+    ('news', {'pk': 1}),
+    ('news', True),
+    ('author', ['testuser']),
+    ('author', {'username': 'testuser'}),
+])
+def test_import_reports_rows_with_wrong_types(
+        admin_client, user, news, field, value
+):
+    """Проверяет, что строка с нецелым pk или не строкой автора — ошибка."""
+    good = {'news': news.pk, 'author': user.username, 'text': 'One'}
+    lines = [json.dumps({**good, field: value}), json.dumps(good)]
+    response = admin_client.post(
+        reverse('news:import_comments'),
+        data='\n'.join(lines),
+        content_type='application/x-ndjson',
+    )
+    assert response.status_code == HTTPStatus.OK
+    report = response.json()
+    assert report['created'] == 1
+    assert [error['line'] for error in report['errors']] == [1]
+
+
+def test_import_comments_command(tmp_path, user, news_list):
+    """Проверяет загрузку комментариев командой пачками."""
+    all_news = list(News.objects.all())
+    path = tmp_path / 'comments.ndjson'
+    path.write_text('\n'.join(
+        json.dumps({
+            'news': news.pk, 'author': user.username, 'text': f'Comment {i}'
+        })
+        for i, news in enumerate(all_news)
+    ), encoding='utf-8')
+    call_command('import_comments', str(path), batch_size=4)
+    assert Comment.objects.count() == len(all_news)
+    assert set(
+        News.objects.values_list('comment_count', flat=True)
+    ) == {1}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096])
+def test_json_array_is_read_in_chunks(chunk_size):
+    """Проверяет, что потоковый разбор совпадает с json.load."""
+    text = NEWS_FIXTURE.read_text(encoding='utf-8')
+    items = list(iter_json_array(io.StringIO(text), chunk_size))
+    assert items == json.loads(text)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 4096])
+@pytest.mark.parametrize('text', [
+    '[1.5]',
+    '[1e5, 2.25E-3]',
+    '[ 12 , -0.5 ,{"a": 1e+2} ]',
+    '[123456789, 10]',
+])
+def test_json_array_numbers_split_between_chunks(chunk_size, text):
+    """Проверяет числа, разрезанные границей куска."""
+    items = list(iter_json_array(io.StringIO(text), chunk_size))
+    assert items == json.loads(text)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 4096])
+def test_json_array_without_end_is_an_error(chunk_size):
+    """Проверяет, что оборванный массив — ошибка."""
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[1, 2.5'), chunk_size))
+
+
+def test_load_news_command_reads_json_fixture():
+    """Проверяет загрузку фикстуры news.json потоковой командой."""
+    call_command(
+        'load_news', str(NEWS_FIXTURE), batch_size=5, stdout=io.StringIO()
+    )
+    expected = json.loads(NEWS_FIXTURE.read_text(encoding='utf-8'))
+    assert News.objects.count() == len(expected)
+    assert len(search.search('Yatube')) == sum(
+        'Yatube' in record['fields']['title'] + record['fields']['text']
+        for record in expected
+    )
+
+
+def test_load_news_command_reads_ndjson(tmp_path, user):
+    """
+    Проверяет загрузку новостей и комментариев из NDJSON: ключи и даты
+    берутся из файла, счётчик учитывает только опубликованные.
+    """
+    created = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    records = [
+        {'model': 'news.news', 'pk': 10, 'fields': {
+            'title': 'Новость', 'text': 'Текст', 'date': '2020-01-01',
+            'comment_count': 100,
+        }},
+        *({'model': 'news.comment', 'pk': 20 + i, 'fields': {
+            'news': 10, 'author': user.pk, 'text': f'Comment {i}',
+            'created': created.isoformat(), 'status': status,
+        }} for i, status in enumerate(
+            (Comment.Status.PUBLISHED, Comment.Status.PUBLISHED,
+             Comment.Status.PENDING)
+        )),
+    ]
+    path = tmp_path / 'data.ndjson'
+    path.write_text(
+        '\n'.join(json.dumps(record) for record in records),
+        encoding='utf-8',
+    )
+    call_command('load_news', str(path), batch_size=2, stdout=io.StringIO())
+    news = News.objects.get(pk=10)
+    assert news.comment_count == 2
+    assert [item.pk for item in search.search('новость')] == [10]
+    assert set(
+        news.comment_set.values_list('pk', flat=True)
+    ) == {20, 21, 22}
+    assert set(news.comment_set.values_list('created', flat=True)) == {
+        created
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load_news_command_restores_deferred_indexes():
+    """Проверяет, что после загрузки без индексов они созданы заново."""
+    call_command(
+        'load_news', str(NEWS_FIXTURE), defer_indexes=True,
+        stdout=io.StringIO(),
+    )
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(
+            cursor, News._meta.db_table
+        )
+    assert 'news_date_id_idx' in constraints
+    assert News.objects.count() > 0
+
+
+def test_generate_data_command():
+    """Проверяет генератор данных: объёмы и согласованные счётчики."""
+    call_command(
+        'generate_data', users=3, news=10, comments=50, batch_size=7,
+        stdout=io.StringIO(),
+    )
+    assert News.objects.count() == 10
+    assert Comment.objects.count() == 50
+    assert not News.objects.exclude(
+        comment_count=News.actual_comment_count()
+    ).exists()
+
+
+def test_query_shapes_ignore_parameters():
+    """Проверяет, что запросы с разными значениями дают одну форму."""
+    assert querycheck.normalize(
+        "SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"
+    ) == querycheck.normalize(
+        "SELECT  *  FROM t WHERE id IN (%s) AND name = 'y' LIMIT 1"
+    )
+
+
+def test_duplicate_queries_traced_to_template_line(news_list):
+    """Проверяет, что N+1 из шаблона указывает на его строку."""
+    template = Template(
+        '{% for news in object_list %}\n'
+        '{{ news.comment_set.count }}\n'
+        '{% endfor %}'
+    )
+    with querycheck.QueryPatterns() as patterns:
+        template.render(Context({'object_list': News.objects.all()}))
+    duplicates = patterns.duplicates(3)
+    assert len(duplicates) == 1
+    (origins,) = duplicates.values()
+    assert sum(origins.values()) == News.objects.count()
+    assert [origin for origin in origins] == [
+        '<unknown source>, строка 2'
+    ]
+
+
+@pytest.mark.parametrize('mode', [querycheck.WARN, querycheck.RAISE])
+def test_query_pattern_middleware(settings, caplog, news_list, mode):
+    """Проверяет предупреждение и ошибку при повторе запросов в view."""
+    settings.QUERY_PATTERN_CHECK = mode
+
+    def view(request):
+        titles = [
+            News.objects.get(pk=pk).title
+            for pk in News.objects.values_list('pk', flat=True)
+        ]
+        return HttpResponse(', '.join(titles))
+
+    middleware = querycheck.QueryPatternMiddleware(view)
+    request = RequestFactory().get('/')
+    if mode == querycheck.RAISE:
+        with pytest.raises(
+            querycheck.DuplicateQueriesError, match='test_logic.py'
+        ):
+            middleware(request)
+    else:
+        middleware(request)
+        assert 'test_logic.py' in caplog.text
+
+
+def profile_settings(profile, argv=('-c',), **environ):
+    """
+    Настройки проекта в отдельном процессе с профилем profile;
+    с profile=None переменная DJANGO_PROFILE не задаётся.
+    """
+    environ = {**os.environ, **environ}
+    environ.pop('DJANGO_PROFILE', None)
+    if profile is not None:
+        environ['DJANGO_PROFILE'] = profile
+    script = (
+        f'import json, sys; sys.argv = {list(argv)!r}; '
+        'from yanews import settings as s; '
+        'print(json.dumps([s.DEBUG, s.DATABASES["default"]["CONN_MAX_AGE"], '
+        's.CACHES["default"]["BACKEND"]]))'
+    )
+    return subprocess.run(
+        [sys.executable, '-c', script],
+        cwd=PROJECT_DIR,
+        env=environ,
+        capture_output=True,
+        text=True,
+    )
+
+
+def test_tests_run_with_test_profile():
+    """Проверяет, что под pytest выбирается профиль test."""
+    assert settings.PROFILE == 'test'
+    assert not settings.DEBUG
+
+
+def test_prod_profile():
+    """Проверяет постоянные соединения и обязательный ключ в prod."""
+    result = profile_settings('prod')
+    assert 'DJANGO_SECRET_KEY' in result.stderr
+    result = profile_settings(
+        'prod', DJANGO_SECRET_KEY='secret',
+        DJANGO_CACHE_BACKEND='django.core.cache.backends.dummy.DummyCache',
+    )
+    assert json.loads(result.stdout) == [
+        False, 60, 'django.core.cache.backends.dummy.DummyCache'
+    ]
+    assert json.loads(profile_settings('dev').stdout)[:2] == [True, 0]
+
+
+def test_default_profile_fails_closed():
+    """
+    Проверяет, что без DJANGO_PROFILE выбирается prod, а dev — только
+    под manage.py runserver.
+    """
+    assert 'DJANGO_SECRET_KEY' in profile_settings(None).stderr
+    result = profile_settings(None, argv=('manage.py', 'migrate'))
+    assert 'DJANGO_SECRET_KEY' in result.stderr
+    result = profile_settings(None, argv=('manage.py', 'runserver'))
+    assert json.loads(result.stdout)[0] is True
+
+
+def test_sqlite_pragmas_applied():
+    """
+    Проверяет, что сигнал выполняет SQLITE_PRAGMAS на соединении;
+    WAL и mmap у тестовой базы в памяти не действуют.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        # 1 — NORMAL.
+        assert cursor.fetchone()[0] == 1
+
+
+@pytest.mark.django_db(transaction=True, databases='__all__')
+def test_home_page_read_from_one_replica(
+        reader_client, replica_aliases, queries_by_alias, news, news_home_url
+):
+    """Проверяет, что главная без кэша страниц читается с реплики."""
+    # Первый запрос кладёт пользователя в кэш.
+    reader_client.get(news_home_url)
+    queries_by_alias.clear()
+    assert reader_client.get(news_home_url).status_code == HTTPStatus.OK
+    (alias,) = queries_by_alias
+    assert alias in replica_aliases
+    assert replicas.PIN_COOKIE not in reader_client.cookies
+
+
+@pytest.mark.django_db(transaction=True, databases='__all__')
+def test_caches_filled_from_primary(
+        client, replica_aliases, queries_by_alias, news, news_home_url
+):
+    """
+    Проверяет, что кэш страниц и фрагментов заполняется из default,
+    даже когда запрос читает с реплики.
+    """
+    assert client.get(news_home_url).status_code == HTTPStatus.OK
+    assert set(queries_by_alias) == {'default'}
+
+    def view(request):
+        replicas.read_from_replica()
+        fragments.get_article(news.pk)
+        return HttpResponse()
+
+    queries_by_alias.clear()
+    replicas.ReplicaMiddleware(view)(RequestFactory().get('/'))
+    assert set(queries_by_alias) == {'default'}
+
+
+@pytest.mark.django_db(transaction=True, databases='__all__')
+def test_reads_pinned_to_primary_after_comment(
+        author_client, replica_aliases, queries_by_alias, news_home_url,
+        news_detail_url
+):
+    """Проверяет, что после комментария страницы читаются из default."""
+    response = author_client.post(news_detail_url, data=COMMENT_DATA)
+    cookie = response.cookies[replicas.PIN_COOKIE]
+    assert cookie['max-age'] == settings.REPLICA_PIN_SECONDS
+    queries_by_alias.clear()
+    response = author_client.get(news_detail_url)
+    assert [comment.text for comment in response.context['comments']] == [
+        COMMENT_DATA['text']
+    ]
+    author_client.get(news_home_url)
+    assert set(queries_by_alias) == {'default'}
+    del author_client.cookies[replicas.PIN_COOKIE]
+    queries_by_alias.clear()
+    author_client.get(news_home_url)
+    (alias,) = queries_by_alias
+    assert alias in replica_aliases
+
+
+def test_reads_return_to_primary_after_write(replica_aliases):
+    """Проверяет, что после записи в запросе чтения идут в default."""
+    aliases = []
+
+    def view(request):
+        replicas.read_from_replica()
+        aliases.append(News.objects.all().db)
+        News.objects.create(title='Новость', text='Текст')
+        aliases.append(News.objects.all().db)
+        return HttpResponse()
+
+    response = replicas.ReplicaMiddleware(view)(RequestFactory().get('/'))
+    assert aliases[0] in replica_aliases
+    assert aliases[1] == 'default'
+    assert replicas.PIN_COOKIE in response.cookies
+    assert News.objects.all().db == 'default'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sync_replicas_command(monkeypatch, tmp_path, news, settings):
+    """Проверяет, что команда копирует основную базу в файл реплики."""
+    settings.DATABASE_REPLICAS = []
+    with pytest.raises(CommandError):
+        call_command('sync_replicas', stdout=io.StringIO())
+    replica_path = tmp_path / 'replica.sqlite3'
+    monkeypatch.setitem(
+        connections['replica1'].settings_dict, 'NAME', str(replica_path)
+    )
+    settings.DATABASE_REPLICAS = ['replica1']
+    call_command('sync_replicas', stdout=io.StringIO())
+    with closing(sqlite3.connect(replica_path)) as replica:
+        assert replica.execute('SELECT title FROM news_news').fetchall() == [
+            (news.title,)
+        ]
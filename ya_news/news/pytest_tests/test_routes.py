@@ -8,7 +8,10 @@ pytestmark = pytest.mark.django_db
 
 @pytest.mark.parametrize('url', [
     pytest.lazy_fixture('news_home_url'),
+    pytest.lazy_fixture('news_archive_url'),
+    pytest.lazy_fixture('news_search_url'),
     pytest.lazy_fixture('news_detail_url'),
+    pytest.lazy_fixture('news_comments_url'),
 ])
 def test_pages_accessible_to_anonymous_user(client, url):
     """Проверяет доступность страниц для анонимного пользователя."""
@@ -0,0 +1,166 @@
+"""
+Поиск повторяющихся запросов (N+1).
+
+Запросы приводятся к «форме»: литералы и параметры заменяются на ?,
+списки IN (...) сворачиваются. Если одна форма выполнилась за запрос
+больше QUERY_PATTERN_THRESHOLD раз, QueryPatternMiddleware пишет
+предупреждение (QUERY_PATTERN_CHECK = 'warn') или выбрасывает
+DuplicateQueriesError ('raise', так делают тесты). Для каждой формы
+указывается место, откуда пришли запросы: строка шаблона или кадр
+кода проекта.
+"""
+import logging
+import re
+import sys
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+WARN = 'warn'
+RAISE = 'raise'
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\?, )*\?\)')
+_SPACES = re.compile(r'\s+')
+
+_TEMPLATE_BASE = str(Path('django', 'template', 'base.py'))
+_DJANGO_DB = str(Path('django', 'db')) + '/'
+_THIS_FILE = __file__
+
+
+class DuplicateQueriesError(Exception):
+    """Страница выполнила одну форму запроса слишком много раз."""
+
+
+def normalize(sql):
+    """Форма запроса: SQL без конкретных значений."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql).replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def _is_project_file(filename):
+    return (
+        filename.startswith(str(settings.BASE_DIR))
+        and 'site-packages' not in filename
+        and filename != _THIS_FILE
+    )
+
+
+def _describe(frame):
+    filename = Path(frame.f_code.co_filename)
+    if _is_project_file(str(filename)):
+        filename = filename.relative_to(settings.BASE_DIR)
+    return f'{filename}:{frame.f_lineno} в {frame.f_code.co_name}'
+
+
+def find_origin(frame):
+    """
+    Место, откуда выполнен запрос.
+
+    Предпочитаем строку шаблона: самый вложенный узел, который
+    рендерился в момент запроса. Иначе — ближайший кадр кода проекта,
+    а если ORM вызвала библиотека (формы, админка), то и её кадр.
+    """
+    caller = project = None
+    while frame is not None:
+        code = frame.f_code
+        if (
+            code.co_name == 'render_annotated'
+            and code.co_filename.endswith(_TEMPLATE_BASE)
+        ):
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                name = origin.template_name or origin.name
+                return f'{name}, строка {token.lineno}'
+        if caller is None and _DJANGO_DB not in code.co_filename:
+            caller = frame
+        if project is None and _is_project_file(code.co_filename):
+            project = frame
+        frame = frame.f_back
+    if project is None:
+        return _describe(caller) if caller is not None else 'неизвестно'
+    if caller is project:
+        return _describe(project)
+    return f'{_describe(project)} через {_describe(caller)}'
+
+
+class QueryPatterns:
+    """
+    Собирает формы запросов ко всем базам внутри блока with.
+
+        with QueryPatterns() as patterns:
+            ...
+        patterns.duplicates(threshold)
+    """
+
+    def __init__(self):
+        # Форма запроса -> Counter мест, откуда она выполнялась.
+        self.shapes = defaultdict(Counter)
+        self._wrappers = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.shapes[normalize(sql)][find_origin(sys._getframe(1))] += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrappers = ExitStack()
+        for connection in connections.all():
+            self._wrappers.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrappers.__exit__(*exc_info)
+
+    def duplicates(self, threshold):
+        """Формы, выполненные больше threshold раз, с их местами."""
+        return {
+            shape: origins for shape, origins in self.shapes.items()
+            if sum(origins.values()) > threshold
+        }
+
+    def report(self, threshold):
+        lines = []
+        for shape, origins in self.duplicates(threshold).items():
+            lines.append(f'{sum(origins.values())} раз: {shape}')
+            lines.extend(
+                f'    {count} из {origin}'
+                for origin, count in origins.most_common()
+            )
+        return '\n'.join(lines)
+
+
+class QueryPatternMiddleware:
+    def __init__(self, get_response):
+        if not settings.QUERY_PATTERN_CHECK:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryPatterns() as patterns:
+            response = self.get_response(request)
+        threshold = settings.QUERY_PATTERN_THRESHOLD
+        match = request.resolver_match
+        if match and set(match.namespaces) & set(
+            settings.QUERY_PATTERN_IGNORED_NAMESPACES
+        ):
+            return response
+        if patterns.duplicates(threshold):
+            message = (
+                f'{request.method} {request.path} повторяет запросы:\n'
+                f'{patterns.report(threshold)}'
+            )
+            if settings.QUERY_PATTERN_CHECK == RAISE:
+                raise DuplicateQueriesError(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,125 @@
+"""
+Чтение страниц с реплик базы.
+
+Все записи идут в основную базу default. Чтения уходят на одну
+из баз DATABASE_REPLICAS, только когда страница сама разрешила это
+миксином ReplicaReadMixin, и только для GET и HEAD; остальные
+чтения тоже идут в default. Реплика выбирается одна на запрос,
+чтобы все данные страницы были из одного снимка.
+
+Реплика может отставать, поэтому после POST или любой другой
+записи посетитель получает cookie и REPLICA_PIN_SECONDS секунд
+читает только из default — так после редиректа он увидит то, что
+сам только что записал. Внутри запроса после первой записи чтения
+тоже идут в default.
+
+То, что ложится в общий кэш, читается внутри primary_reads из
+default: иначе после сброса версии кэша отстающая реплика могла бы
+снова положить туда старые данные на весь срок жизни записи.
+
+Локально реплики — отдельные файлы SQLite из DJANGO_DB_REPLICAS,
+их заполняет копией основной базы команда sync_replicas.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PRIMARY = DEFAULT_DB_ALIAS
+PIN_COOKIE = 'replica_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+class RequestState:
+    """Что известно о базах в текущем запросе."""
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.replica = None
+        self.wrote = False
+        # Глубина вложенных блоков primary_reads.
+        self.primary_depth = 0
+
+
+def read_from_replica():
+    """Разрешает текущему запросу читать с реплики."""
+    state = _request_state.get()
+    if state is None or state.pinned or not settings.DATABASE_REPLICAS:
+        return
+    if state.replica is None:
+        state.replica = random.choice(settings.DATABASE_REPLICAS)
+
+
+@contextmanager
+def primary_reads():
+    """Внутри блока все чтения идут в default."""
+    state = _request_state.get()
+    if state is None:
+        yield
+        return
+    state.primary_depth += 1
+    try:
+        yield
+    finally:
+        state.primary_depth -= 1
+
+
+class ReplicaReadMixin:
+    """Страница, которая на GET и HEAD читает с реплики."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            read_from_replica()
+        return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    """Записи — в default, чтения — на реплику, выбранную запросом."""
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if (state is None or state.wrote or state.primary_depth
+                or state.replica is None):
+            return PRIMARY
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, объекты из них связаны.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема приходит на реплики вместе с данными.
+        return db == PRIMARY
+
+
+class ReplicaMiddleware:
+    """Состояние баз на время запроса и cookie после записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RequestState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if request.method not in SAFE_METHODS or state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
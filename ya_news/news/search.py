@@ -0,0 +1,248 @@
+"""
+Полнотекстовый поиск по новостям.
+
+На SQLite заголовки и тексты новостей лежат в таблице FTS5
+news_news_search, rowid строки — pk новости. Таблицу создаёт миграция,
+строки обновляют сигналы при каждом сохранении новости, в том числе
+в NewsAdmin, и загрузчик фикстур; всю таблицу перестраивает команда
+rebuild_news_index.
+
+Слова запроса ищутся по началу, фраза в кавычках — целиком, подряд.
+Если FTS5 нет, поиск идёт через icontains и без ранжирования.
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import News
+from .pagination import KeysetPage
+
+FTS_TABLE = 'news_news_search'
+FTS_SCHEMA = (
+    f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+    "title, text, tokenize='unicode61 remove_diacritics 2', "
+    "prefix='2 3')"
+)
+
+TITLE_WEIGHT = 10
+TEXT_WEIGHT = 1
+MAX_QUERY_TERMS = 10
+SNIPPET_TOKENS = 30
+DEFAULT_CHUNK_SIZE = 2000
+
+_TERM = re.compile(r'"([^"]*)"|(\w+)')
+_WORD = re.compile(r'\w+')
+# Маркеры подсветки от FTS5: в тексте новостей их не бывает,
+# и их можно заменить на <mark> уже после экранирования.
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+
+def parse_query(query):
+    """
+    Термы запроса: кортежи (слова, фраза ли это).
+
+    Кавычки без пары отбрасываются, а слова внутри термов содержат
+    только буквы и цифры, так что синтаксис FTS5 в запрос не попадёт.
+    """
+    terms = []
+    for match in _TERM.finditer(query or ''):
+        phrase, word = match.groups()
+        words = tuple(
+            word.lower() for word in _WORD.findall(phrase or word or '')
+        )
+        if words:
+            terms.append((words, phrase is not None))
+    return terms[:MAX_QUERY_TERMS]
+
+
+def match_expression(terms):
+    """Выражение MATCH для FTS5: все термы, слова — по началу."""
+    return ' AND '.join(
+        '"{}"'.format(' '.join(words)) if phrase else f'"{words[0]}"*'
+        for words, phrase in terms
+    )
+
+
+def mark(text):
+    """Экранирует текст и превращает маркеры FTS5 в <mark>."""
+    return mark_safe(
+        escape(text or '')
+        .replace(_MARK_START, '<mark>')
+        .replace(_MARK_END, '</mark>')
+    )
+
+
+def _highlight_words(text, terms):
+    """Подсветка для поиска без FTS5: вхождения слов запроса."""
+    words = sorted(
+        {' '.join(words) for words, _ in terms}, key=len, reverse=True
+    )
+    pattern = re.compile(
+        '|'.join(re.escape(word) for word in words), re.IGNORECASE
+    )
+    return mark(pattern.sub(
+        lambda match: f'{_MARK_START}{match.group()}{_MARK_END}', text
+    ))
+
+
+@lru_cache(maxsize=None)
+def _has_fts_table(database):
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def has_index():
+    """Есть ли в базе таблица FTS5; её нет, если SQLite собран без FTS5."""
+    return _has_fts_table(connection.settings_dict['NAME'])
+
+
+def _rows(news):
+    return [(item.pk, item.title, item.text) for item in news]
+
+
+def index(news):
+    """Добавляет или обновляет строки индекса для новостей."""
+    if not has_index():
+        return
+    rows = _rows(news)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(pk,) for pk, _, _ in rows],
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, text) '
+            'VALUES (%s, %s, %s)',
+            rows,
+        )
+
+
+def remove(pks):
+    if not has_index():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(pk,) for pk in pks],
+        )
+
+
+def rebuild(chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Перестраивает индекс, читая таблицу новостей порциями по pk.
+
+    Всё делается в одной транзакции: пока она идёт, поиск работает
+    по старому индексу. После каждой порции вызывается
+    progress(сколько проиндексировано).
+    """
+    indexed = 0
+    last_pk = 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        while True:
+            chunk = list(
+                News.objects.filter(pk__gt=last_pk).order_by('pk').only(
+                    'title', 'text'
+                )[:chunk_size]
+            )
+            if not chunk:
+                break
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, title, text) '
+                    'VALUES (%s, %s, %s)',
+                    _rows(chunk),
+                )
+            last_pk = chunk[-1].pk
+            indexed += len(chunk)
+            if progress is not None:
+                progress(indexed)
+    return indexed
+
+
+def _fts_search(terms, date_from, date_to, limit, offset):
+    table = News._meta.db_table
+    conditions = [f'{FTS_TABLE} MATCH %s']
+    params = [_MARK_START, _MARK_END, SNIPPET_TOKENS,
+              _MARK_START, _MARK_END, match_expression(terms)]
+    # Границы дат сужают выборку по индексу (date, id) новостей.
+    if date_from is not None:
+        conditions.append('n.date >= %s')
+        params.append(date_from.isoformat())
+    if date_to is not None:
+        conditions.append('n.date <= %s')
+        params.append(date_to.isoformat())
+    params += [TITLE_WEIGHT, TEXT_WEIGHT, limit, offset]
+    results = list(News.objects.raw(
+        f'SELECT n.id, n.title, n.date, '
+        f"snippet({FTS_TABLE}, 1, %s, %s, '…', %s) AS snippet_marked, "
+        f'highlight({FTS_TABLE}, 0, %s, %s) AS title_marked '
+        f'FROM {FTS_TABLE} JOIN {table} n ON n.id = {FTS_TABLE}.rowid '
+        f'WHERE {" AND ".join(conditions)} '
+        f'ORDER BY bm25({FTS_TABLE}, %s, %s), n.date DESC, n.id DESC '
+        f'LIMIT %s OFFSET %s',
+        params,
+    ))
+    for item in results:
+        item.title_html = mark(item.title_marked)
+        item.snippet = mark(item.snippet_marked)
+    return results
+
+
+def _simple_search(terms, date_from, date_to, limit, offset):
+    condition = Q()
+    for words, _ in terms:
+        text = ' '.join(words)
+        condition &= Q(title__icontains=text) | Q(text__icontains=text)
+    if date_from is not None:
+        condition &= Q(date__gte=date_from)
+    if date_to is not None:
+        condition &= Q(date__lte=date_to)
+    results = list(
+        News.objects.filter(condition).order_by('-date', '-pk')[
+            offset:offset + limit
+        ]
+    )
+    for item in results:
+        item.title_html = _highlight_words(item.title, terms)
+        words = item.text.split()
+        item.snippet = _highlight_words(
+            ' '.join(words[:SNIPPET_TOKENS])
+            + (' …' if len(words) > SNIPPET_TOKENS else ''),
+            terms,
+        )
+    return results
+
+
+def search(query, date_from=None, date_to=None, page=1, per_page=None):
+    """
+    Страница найденных новостей, от самых подходящих.
+
+    Курсор страницы — её номер. Ранжирование всё равно оценивает
+    все совпадения, поэтому OFFSET здесь почти ничего не добавляет,
+    а курсор по значению bm25 был бы неустойчив. У каждой новости
+    есть title_html и snippet с подсветкой.
+    """
+    per_page = per_page or settings.NEWS_COUNT_ON_SEARCH_PAGE
+    terms = parse_query(query)
+    if not terms:
+        return KeysetPage([])
+    find = _fts_search if has_index() else _simple_search
+    results = find(
+        terms, date_from, date_to, per_page + 1, (page - 1) * per_page
+    )
+    return KeysetPage(
+        results[:per_page],
+        next_cursor=(
+            page + 1
+            if len(results) > per_page and page < settings.NEWS_SEARCH_MAX_PAGE
+            else None
+        ),
+        previous_cursor=page - 1 if page > 1 else None,
+    )
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import authcache, fragments, pagecache, search
+from .models import Comment, News
+
+
+def invalidate_news_pages(*pks):
+    """
+    Сбрасывает кэш страниц новостей pks и страниц со списками новостей.
+
+    Версии увеличиваем сразу и ещё раз после коммита: иначе читатель
+    мог бы закэшировать под новой версией данные до коммита.
+    """
+    def bump():
+        if pks:
+            fragments.bump_versions(pks)
+        pagecache.bump_version()
+    bump()
+    transaction.on_commit(bump)
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    invalidate_news_pages(instance.news_id)
+
+
+@receiver((post_save, post_delete), sender=News)
+def news_changed(sender, instance, **kwargs):
+    invalidate_news_pages(instance.pk)
+
+
+@receiver(post_save, sender=News)
+def index_news(sender, instance, **kwargs):
+    """Обновляет строку поискового индекса, в том числе из NewsAdmin."""
+    search.index([instance])
+
+
+@receiver(post_delete, sender=News)
+def unindex_news(sender, instance, **kwargs):
+    search.remove([instance.pk])
+
+
+@receiver((post_save, post_delete), sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    """Сбрасывает пользователя из кэша, в том числе после входа."""
+    authcache.forget_user(instance.pk)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Выполняет SQLITE_PRAGMAS на каждом новом соединении SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
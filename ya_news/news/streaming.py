@@ -0,0 +1,81 @@
+"""
+Потоковое чтение больших фикстур.
+
+Файл читается кусками по CHUNK_SIZE символов, и в памяти держится
+только текущий кусок и разбираемая запись, поэтому потребление памяти
+не зависит от размера файла. Поддерживаются формат dumpdata
+(JSON-массив объектов) и NDJSON — по объекту на строку.
+"""
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+JSON = 'json'
+NDJSON = 'ndjson'
+FORMATS = (JSON, NDJSON)
+
+_WHITESPACE = ' \t\r\n'
+_SEPARATORS = _WHITESPACE + ','
+
+
+def _decode_item(decoder, buffer, position):
+    """
+    Запись массива с position и позиция после неё или None, если
+    в буфере записи ещё нет целиком.
+
+    Запись принимается, только если за ней в буфере уже видны «,»
+    или «]»: на границе куска могла оборваться не только строка или
+    объект, но и число, и тогда из 1.5 разобралось бы 1.
+    """
+    try:
+        item, end = decoder.raw_decode(buffer, position)
+    except json.JSONDecodeError:
+        return None
+    following = end
+    while following < len(buffer) and buffer[following] in _WHITESPACE:
+        following += 1
+    if following == len(buffer) or buffer[following] not in ',]':
+        return None
+    return item, end
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """Возвращает элементы JSON-массива из файла по одному."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Файл не начинается с JSON-массива.')
+    position = 1
+    while True:
+        while position < len(buffer) and buffer[position] in _SEPARATORS:
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        decoded = _decode_item(decoder, buffer, position)
+        if decoded is None:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise ValueError('JSON-массив с ошибкой или оборван.')
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        item, position = decoded
+        yield item
+
+
+def iter_ndjson(file):
+    """Возвращает объекты из файла NDJSON, пропуская пустые строки."""
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_records(file, file_format=JSON, chunk_size=CHUNK_SIZE):
+    if file_format == NDJSON:
+        return iter_ndjson(file)
+    return iter_json_array(file, chunk_size)
+
+
+def guess_format(path):
+    """Определяет формат по расширению: .ndjson и .jsonl — это NDJSON."""
+    return NDJSON if path.endswith(('.ndjson', '.jsonl')) else JSON
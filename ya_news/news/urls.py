@@ -6,11 +6,21 @@ app_name = 'news'
 
 urlpatterns = [
     path('', views.NewsList.as_view(), name='home'),
+    path('archive/', views.NewsArchive.as_view(), name='archive'),
+    path('search/', views.NewsSearch.as_view(), name='search'),
     path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    path(
+        'news/<int:pk>/comments/',
+        views.NewsComments.as_view(),
+        name='comments'
+    ),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
         name='delete'
     ),
     path('edit_comment/<int:pk>/', views.CommentUpdate.as_view(), name='edit'),
+    path('cache-stats/', views.cache_stats, name='cache_stats'),
+    path('comments/import/', views.import_comments, name='import_comments'),
+    path('admin/perf/', views.PerfStats.as_view(), name='perf_stats'),
 ]
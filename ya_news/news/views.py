@@ -1,14 +1,25 @@
 from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.http import HttpResponseRedirect, JsonResponse
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_POST
 from django.views import generic
 
-from .forms import CommentForm
+from . import fragments, instrumentation, moderation, pagecache, search
+from .ingest import ingest_comments
+from .forms import CommentForm, NewsSearchForm
 from .models import Comment, News
+from .pagination import KeysetPage, KeysetPaginator
+from .replicas import ReplicaReadMixin
 
 
-class NewsList(generic.ListView):
+@method_decorator(pagecache.cache_anonymous_page, name='dispatch')
+class NewsList(ReplicaReadMixin, generic.ListView):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
@@ -18,22 +29,106 @@ class NewsList(generic.ListView):
         Выводим только несколько последних новостей.
 
         Их количество определяется в настройках проекта.
+        Количество комментариев хранится в самой новости,
+        поэтому комментарии не загружаем и не считаем.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return self.model.objects.all()[:settings.NEWS_COUNT_ON_HOME_PAGE]
 
 
-class NewsDetail(generic.DetailView):
+class NewsArchive(generic.ListView):
+    """
+    Архив всех новостей с постраничным выводом по курсору.
+
+    Порядок тот же, что на главной, с pk для однозначности.
+    """
+    model = News
+    template_name = 'news/archive.html'
+    ordering = ('-date', '-pk')
+
+    def get_queryset(self):
+        paginator = KeysetPaginator(
+            self.model.objects.all(),
+            self.ordering,
+            settings.NEWS_COUNT_ON_ARCHIVE_PAGE,
+        )
+        self.page = paginator.get_page(self.request.GET.get('cursor'))
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page'] = self.page
+        return context
+
+
+class NewsSearch(generic.ListView):
+    """
+    Поиск по заголовкам и текстам новостей.
+
+    Результаты ранжированы, слова ищутся по началу, фразы в кавычках —
+    целиком; даты ограничивают выдачу по индексу (date, id).
+    """
+    template_name = 'news/search.html'
+
+    def get_queryset(self):
+        self.form = NewsSearchForm(self.request.GET or None)
+        if not self.form.is_valid():
+            self.page = KeysetPage([])
+            return self.page.object_list
+        data = self.form.cleaned_data
+        self.page = search.search(
+            data['q'],
+            date_from=data['date_from'],
+            date_to=data['date_to'],
+            page=data['page'] or 1,
+        )
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        context['form'] = self.form
+        context['page'] = self.page
+        context['query'] = query.urlencode()
+        return context
+
+
+class NewsCommentsMixin:
+    """
+    Страница комментариев к новости.
+
+    Комментарии выводятся порциями по курсору, чтобы время
+    и память на запрос не зависели от длины обсуждения.
+    Порции вместе с разметкой комментариев берутся из кэша.
+    """
+    comments_ordering = ('created', 'pk')
+
+    def get_comments_page(self, news):
+        paginator = KeysetPaginator(
+            news.comment_set.filter(
+                status=Comment.Status.PUBLISHED
+            ).select_related('author').only(
+                'text', 'created', 'news_id', 'author__username'
+            ),
+            self.comments_ordering,
+            settings.COMMENTS_COUNT_ON_NEWS_PAGE,
+        )
+        return fragments.get_comments_page(
+            news.pk, paginator, self.request.GET.get('cursor')
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments'] = self.get_comments_page(self.object)
+        return context
+
+
+class NewsDetail(NewsCommentsMixin, generic.DetailView):
     model = News
     template_name = 'news/detail.html'
 
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
-        return obj
+        return fragments.get_article(self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -42,8 +137,26 @@ class NewsDetail(generic.DetailView):
         return context
 
 
+class NewsComments(NewsCommentsMixin, generic.View):
+    """Следующая порция комментариев к новости в виде фрагмента HTML."""
+
+    def get(self, request, *args, **kwargs):
+        self.object = fragments.get_article(self.kwargs['pk'])
+        comments = self.get_comments_page(self.object)
+        html = render_to_string(
+            'includes/comments.html',
+            {'comments': comments},
+            request=request,
+        )
+        return JsonResponse({
+            'html': html,
+            'next_cursor': comments.next_cursor,
+        })
+
+
 class NewsComment(
         LoginRequiredMixin,
+        NewsCommentsMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -51,20 +164,31 @@ class NewsComment(
     form_class = CommentForm
     template_name = 'news/detail.html'
 
+    def get_object(self, queryset=None):
+        return fragments.get_article(self.kwargs['pk'])
+
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
         return super().post(request, *args, **kwargs)
 
     def form_valid(self, form):
+        """
+        Сохраняет комментарий на модерацию и сразу отвечает.
+
+        Счётчик у новости увеличится, когда комментарий опубликуют.
+        """
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
+        comment.status = Comment.Status.PENDING
         comment.save()
+        moderation.submit(comment)
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
@@ -83,22 +207,102 @@ class CommentBase(LoginRequiredMixin):
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
+        """Комментарий уже загружен во view, повторно его не читаем."""
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
-        """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        """
+        Пользователь может работать только со своими комментариями.
+
+        Заголовок новости для шаблонов подтягиваем тем же запросом.
+        """
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news').only(
+            'text', 'created', 'status', 'author_id', 'news__title'
+        )
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
-    """Редактирование комментария."""
+    """
+    Редактирование комментария.
+
+    Изменённый текст снова уходит на модерацию: иначе можно было бы
+    опубликовать безобидный текст и потом заменить его.
+    """
     template_name = 'news/edit.html'
     form_class = CommentForm
 
+    def form_valid(self, form):
+        if 'text' not in form.changed_data:
+            return HttpResponseRedirect(self.get_success_url())
+        comment = form.instance
+        with transaction.atomic():
+            # Статус читаем в момент записи: модерация могла
+            # опубликовать комментарий после того, как view его прочла.
+            unpublished = Comment.objects.filter(
+                pk=comment.pk, status=Comment.Status.PUBLISHED
+            ).update(status=Comment.Status.PENDING)
+            if unpublished:
+                News.change_comment_count(comment.news_id, -1)
+            comment.status = Comment.Status.PENDING
+            self.object = form.save()
+            moderation.submit(comment)
+        return HttpResponseRedirect(self.get_success_url())
+
 
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        comments = Comment.objects.filter(pk=self.object.pk)
+        with transaction.atomic():
+            # Статус проверяем тем же запросом, что удаляет: модерация
+            # могла опубликовать комментарий после того, как view его
+            # прочла, и тогда счётчик уже увеличен.
+            published, _ = comments.filter(
+                status=Comment.Status.PUBLISHED
+            ).delete()
+            if published:
+                News.change_comment_count(self.object.news_id, -1)
+            else:
+                comments.delete()
+        return HttpResponseRedirect(self.get_success_url())
+
+
+@staff_member_required
+def cache_stats(request):
+    """Счётчики кэша страниц для мониторинга."""
+    return JsonResponse(pagecache.get_stats())
+
+
+@require_POST
+@staff_member_required
+def import_comments(request):
+    """
+    Массовая загрузка комментариев.
+
+    Тело запроса — NDJSON, в ответ приходит отчёт о загрузке.
+    """
+    lines = (line.decode('utf-8', errors='replace') for line in request)
+    return JsonResponse(ingest_comments(lines))
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class PerfStats(generic.TemplateView):
+    """Время ответа по страницам, собранное PerfMiddleware."""
+    template_name = 'admin/perf_stats.html'
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(
+            **admin.site.each_context(self.request),
+            title='Производительность страниц',
+            enabled=settings.PERF_INSTRUMENTATION,
+            buckets=instrumentation.BUCKET_LABELS,
+            report=instrumentation.get_report(),
+            **kwargs,
+        )
@@ -0,0 +1,68 @@
+"""
+Прогрев процесса перед первым запросом.
+
+Кэширующий загрузчик разбирает шаблон при первом обращении к нему,
+а резолвер URL строит таблицы для reverse при первом {% url %}
+в каждом пространстве имён. warm_up делает и то и другое при старте
+процесса из wsgi.py и asgi.py, так что первые запросы нового
+процесса не платят за разбор шаблонов.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import URLResolver, get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(engine):
+    """Имена всех шаблонов из каталогов DIRS движка."""
+    for directory in engine.dirs:
+        directory = Path(directory)
+        for path in sorted(directory.rglob('*.html')):
+            yield path.relative_to(directory).as_posix()
+
+
+def precompile_templates():
+    """
+    Разбирает все шаблоны проекта в кэш загрузчика.
+
+    Возвращает число разобранных шаблонов. Без кэширующего
+    загрузчика разобранный шаблон никуда не сохраняется, и прогрев
+    ничего не даёт, но и не мешает.
+    """
+    count = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine):
+            backend.engine.get_template(name)
+            count += 1
+    return count
+
+
+def warm_url_resolvers(resolver=None):
+    """Строит таблицы reverse у всех резолверов URL, в том числе вложенных."""
+    resolver = resolver or get_resolver()
+    # Обращение к reverse_dict заполняет таблицы для текущего языка.
+    resolver.reverse_dict
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            warm_url_resolvers(pattern)
+
+
+def warm_up():
+    """Прогревает шаблоны и URL, если включён TEMPLATES_WARM_UP."""
+    if not settings.TEMPLATES_WARM_UP:
+        return
+    start = time.perf_counter()
+    count = precompile_templates()
+    warm_url_resolvers()
+    logger.info(
+        'Прогрев: %d шаблонов и URL за %.1f мс',
+        count, (time.perf_counter() - start) * 1000,
+    )
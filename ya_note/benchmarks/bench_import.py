@@ -0,0 +1,113 @@
+"""
+Выгрузка и загрузка заметок: notes.transfer против Note.objects.create.
+
+Заметки генерируются как в generate_notes, часть заголовков
+повторяется, чтобы загрузка подбирала суффиксы slug. Замеряются
+загрузка пачками через import_notes, загрузка по одной заметке
+через Note.objects.create (с сигналами и индексом поиска) и
+выгрузка обратно в NDJSON и zip.
+
+Запуск из каталога ya_note:
+    python -m benchmarks.bench_import --notes 100000 --create-notes 5000
+"""
+import argparse
+import json
+import random
+import tracemalloc
+
+from benchmarks.utils import measure, print_table, setup_django
+
+
+def counted(func):
+    """Время func в мс и число её запросов к базе."""
+    from django.db import connection
+
+    # CaptureQueriesContext хранит не больше 9000 запросов.
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        elapsed = measure(func, 1)
+    return elapsed, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--notes', type=int, default=100_000)
+    parser.add_argument('--create-notes', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+
+    from notes import search, transfer
+    from notes.management.commands import generate_notes
+    from notes.models import Note
+
+    rng = random.Random(0)
+    titles = [
+        generate_notes.sentence(rng, rng.randint(1, 4))
+        for _ in range(args.notes // 2)
+    ]
+    lines = [
+        json.dumps({
+            'title': rng.choice(titles),
+            'text': generate_notes.sentence(rng, rng.randint(10, 40)),
+        }, ensure_ascii=False)
+        for _ in range(args.notes)
+    ]
+    author = get_user_model().objects.create(username='author')
+
+    def reset():
+        Note.objects.all()._raw_delete(Note.objects.db)
+        search.get_backend().clear()
+
+    def bulk_import():
+        return transfer.import_notes(
+            author, transfer.iter_ndjson(lines), args.batch_size
+        )
+
+    def create_notes():
+        for line in lines[:args.create_notes]:
+            Note.objects.create(author=author, **json.loads(line))
+
+    def export(export_format):
+        def consume():
+            for _ in transfer.EXPORTERS[export_format](
+                Note.objects.filter(author=author)
+            ):
+                pass
+        return consume
+
+    results = []
+    reset()
+    import_ms, queries = counted(bulk_import)
+    results.append((
+        f'import_notes, {args.notes}', f'{import_ms:.0f}',
+        f'{args.notes / import_ms * 1000:.0f}', queries,
+    ))
+    for export_format in transfer.FORMATS:
+        tracemalloc.start()
+        export_ms = measure(export(export_format), 1)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append((
+            f'выгрузка {export_format}, {args.notes} '
+            f'(пик {peak / 2 ** 20:.1f} МиБ)',
+            f'{export_ms:.0f}', f'{args.notes / export_ms * 1000:.0f}', '',
+        ))
+    reset()
+    create_ms, queries = counted(create_notes)
+    results.append((
+        f'Note.objects.create, {args.create_notes}', f'{create_ms:.0f}',
+        f'{args.create_notes / create_ms * 1000:.0f}', queries,
+    ))
+    print_table(('способ', 'мс', 'заметок/с', 'запросов'), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Время и память страницы списка заметок при росте числа заметок.
+
+Для сравнения замеряется и прежний способ — выборка всех заметок
+пользователя вместе с текстом.
+
+Запуск из каталога ya_note:
+    python -m benchmarks.bench_list --sizes 1000 10000 50000
+"""
+import argparse
+import tracemalloc
+
+from benchmarks.utils import measure, print_table, setup_django
+
+
+def peak_kb(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return f'{peak / 1024:.0f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[1000, 10000, 50000]
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.urls import reverse
+
+    from notes.models import Note
+    from notes.pagination import NEXT, KeysetPaginator
+
+    settings.ALLOWED_HOSTS = ['testserver']
+    author = get_user_model().objects.create(username='author')
+    client = Client()
+    client.force_login(author)
+    url = reverse('notes:list')
+
+    def first_page():
+        client.get(url)
+
+    def deep_page():
+        client.get(url, {'cursor': cursor})
+
+    def all_notes():
+        list(Note.objects.filter(author=author))
+
+    results = []
+    created = 0
+    for size in args.sizes:
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {i}', text='Текст заметки. ' * 50,
+                slug=f'note-{i}', author=author,
+            )
+            for i in range(created, size)
+        )
+        created = size
+        # Курсор на последнюю страницу: после заметки, за которой
+        # остаётся ровно одна страница.
+        before_last = Note.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        )[settings.NOTES_COUNT_ON_LIST_PAGE]
+        cursor = KeysetPaginator(Note.objects.all(), ('pk',), 1).encode_cursor(
+            NEXT, Note(pk=before_last)
+        )
+        results.append((
+            size,
+            f'{measure(first_page):.1f}',
+            f'{measure(deep_page):.1f}',
+            peak_kb(first_page),
+            f'{measure(all_notes):.1f}',
+            peak_kb(all_notes),
+        ))
+    print_table(
+        ('заметок', 'первая, мс', 'последняя, мс', 'память, КБ',
+         'все сразу, мс', 'все сразу, КБ'),
+        results,
+    )
+
+
+if __name__ == '__main__':
+    main()
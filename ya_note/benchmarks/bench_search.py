@@ -0,0 +1,77 @@
+"""
+Время поиска по заметкам одного пользователя при росте их числа.
+
+Для сравнения замеряется и поиск через icontains по заголовку и тексту.
+Бэкенд выбирается флагом --backend; по умолчанию — FTS5.
+
+Запуск из каталога ya_note:
+    python -m benchmarks.bench_search --sizes 10000 100000 1000000
+    python -m benchmarks.bench_search --backend notes.search.TermsBackend
+"""
+import argparse
+import random
+
+from benchmarks.utils import measure, print_table, setup_django
+
+QUERIES = ('рецепт', 'пир', 'ремонт кухни', 'zametki')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[10000, 100000]
+    )
+    parser.add_argument('--backend')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db.models import Max, Q
+
+    from notes import search
+    from notes.management.commands.generate_notes import sentence
+    from notes.models import Note
+
+    settings.NOTES_SEARCH_BACKEND = args.backend
+    rng = random.Random(args.seed)
+    author = get_user_model().objects.create(username='author')
+
+    def naive(query):
+        condition = Q()
+        for word in query.split():
+            condition &= Q(title__icontains=word) | Q(text__icontains=word)
+        list(Note.objects.filter(condition, author=author)[:50])
+
+    results = []
+    created = 0
+    for size in args.sizes:
+        last_pk = Note.objects.aggregate(last=Max('pk'))['last'] or 0
+        Note.objects.bulk_create(
+            (
+                Note(
+                    title=sentence(rng, rng.randint(2, 6)),
+                    text=' '.join(
+                        sentence(rng, rng.randint(5, 15)) for _ in range(3)
+                    ),
+                    slug=f'note-{i}', author=author,
+                )
+                for i in range(created, size)
+            ),
+            batch_size=2000,
+        )
+        search.reindex(Note.objects.filter(pk__gt=last_pk), 5000)
+        created = size
+        for query in QUERIES:
+            results.append((
+                size,
+                query,
+                f'{measure(lambda: search.search(author.pk, query)):.1f}',
+                f'{measure(lambda: naive(query)):.1f}',
+            ))
+    print_table(('заметок', 'запрос', 'поиск, мс', 'icontains, мс'), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Скорость notes.translit.slugify по сравнению с pytils.
+
+Замеряются сам slugify на заголовках из generate_notes (без кэша
+и с кэшем), создание заметок через Note.objects.create и массовая
+загрузка командой generate_notes с каждой из реализаций.
+
+Запуск из каталога ya_note:
+    python -m benchmarks.bench_slugify --titles 100000 --notes 2000
+"""
+import argparse
+import io
+import random
+from unittest import mock
+
+from benchmarks.utils import measure, print_table, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=100_000)
+    parser.add_argument('--notes', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from pytils.translit import slugify as pytils_slugify
+
+    from notes import search, translit
+    from notes.management.commands import generate_notes
+    from notes.models import Note
+
+    rng = random.Random(0)
+    titles = [
+        generate_notes.sentence(rng, rng.randint(2, 6))
+        for _ in range(args.titles)
+    ]
+    author = get_user_model().objects.create(username='author')
+    implementations = {
+        'pytils': pytils_slugify,
+        'translate': translit._slugify.__wrapped__,
+        'translate + кэш': translit.slugify,
+    }
+
+    def create_notes():
+        for title in titles[:args.notes]:
+            Note.objects.create(title=title, text=title, author=author)
+
+    def bulk_import():
+        call_command(
+            'generate_notes', users=0, notes=args.notes * 10,
+            stdout=io.StringIO(),
+        )
+
+    def reset():
+        # Заметки прошлого прогона заняли бы slug и добавили подбор
+        # суффиксов, поэтому каждая реализация начинает с пустой базы.
+        Note.objects.all()._raw_delete(Note.objects.db)
+        search.get_backend().clear()
+        translit.cache_clear()
+
+    results = []
+    for name, slugify in implementations.items():
+        with mock.patch('notes.models.slugify', slugify), mock.patch.object(
+            generate_notes, 'slugify', slugify
+        ):
+            slugs_ms = measure(lambda: list(map(slugify, titles)), 3)
+            reset()
+            create_ms = measure(create_notes, 1)
+            reset()
+            import_ms = measure(bulk_import, 1)
+            reset()
+        results.append((
+            name, f'{slugs_ms:.0f}', f'{create_ms:.0f}', f'{import_ms:.0f}'
+        ))
+    print_table(
+        ('реализация', f'{args.titles} slug, мс',
+         f'{args.notes} create, мс', f'{args.notes * 10} загрузка, мс'),
+        results,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Аутентификация без обращений к базе на чтении страниц.
+
+Посетитель без cookie сессии сразу получает AnonymousUser: сессия
+не загружается, и анонимный GET не трогает ни таблицу сессий, ни
+таблицу пользователей. Вошедшему пользователю объект User хранится
+в кэше по pk, так что request.user стоит одно чтение кэша; запись
+сбрасывают сигналы при сохранении и удалении пользователя. Сессии
+читает бэкенд cached_db, и страница для вошедшего пользователя
+тоже не делает запросов ради аутентификации.
+
+Хеш пароля в кэш не попадает: рядом с пользователем хранится
+только хеш для проверки сессии, а поле password становится
+отложенным и при обращении дочитывается из базы.
+
+С locmem кэш у каждого процесса свой, и другой процесс увидит
+смену пароля или блокировку пользователя только через
+USER_CACHE_TIMEOUT, поэтому с locmem этот срок — секунды; с общим
+кэшем запись сбрасывается сразу.
+"""
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+USER_KEY = __package__ + ':user:{pk}'
+
+
+def forget_user(pk):
+    """
+    Убирает пользователя из кэша.
+
+    Удаляем сразу и ещё раз после коммита: иначе параллельный запрос
+    мог бы закэшировать пользователя таким, каким он был до коммита.
+    """
+    key = USER_KEY.format(pk=pk)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def _load_user(pk, backend_path):
+    """Пользователь и хеш для проверки его сессий или (None, None)."""
+    key = USER_KEY.format(pk=pk)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    user = auth.load_backend(backend_path).get_user(pk)
+    if user is None:
+        return None, None
+    session_hash = user.get_session_auth_hash()
+    # Без значения в __dict__ поле отложено: Django дочитает его
+    # при обращении, а save() его не перезапишет.
+    vars(user).pop('password', None)
+    cache.set(key, (user, session_hash), settings.USER_CACHE_TIMEOUT)
+    return user, session_hash
+
+
+def get_user(request):
+    """
+    Пользователь запроса, как django.contrib.auth.get_user, но
+    с объектом User из кэша и без сессии для посетителя без cookie.
+    """
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return AnonymousUser()
+    try:
+        pk = auth.get_user_model()._meta.pk.to_python(
+            request.session[auth.SESSION_KEY]
+        )
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+    user, user_hash = _load_user(pk, backend_path)
+    if user is None:
+        return AnonymousUser()
+    # Та же проверка, что в get_user: после смены пароля
+    # старые сессии пользователя перестают действовать.
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(session_hash, user_hash)):
+        request.session.flush()
+        return AnonymousUser()
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware, берущий пользователя из get_user."""
+
+    def process_request(self, request):
+        request.user = SimpleLazyObject(lambda: get_user(request))
@@ -1,7 +1,4 @@
-from pytils.translit import slugify
-
 from django import forms
-from django.core.exceptions import ValidationError
 
 from .models import Note
 
@@ -15,15 +12,25 @@ class NoteForm(forms.ModelForm):
         model = Note
         fields = ('title', 'text', 'slug')
 
-    def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
-        if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
-            raise ValidationError(slug + WARNING)
-        return slug
+    def validate_unique(self):
+        """
+        Уникальность slug заранее не проверяем.
+
+        Занятый slug обнаружит ограничение в базе при сохранении,
+        а NoteFormBase покажет ошибку add_slug_error: так на обычное
+        сохранение уходит на один запрос меньше, и параллельные
+        запросы с одинаковым slug не проходят проверку оба.
+        """
+        self.instance.validate_unique(
+            exclude=[*self._get_validation_exclusions(), 'slug']
+        )
+
+    def add_slug_error(self):
+        self.add_error('slug', self.instance.slug + WARNING)
+
+
+class NoteImportForm(forms.Form):
+    file = forms.FileField(
+        label='Файл',
+        help_text='NDJSON или zip с файлами Markdown, как при выгрузке',
+    )
@@ -0,0 +1,88 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from notes import search
+from notes.models import Note
+from notes.translit import slugify
+
+User = get_user_model()
+
+DEFAULT_BATCH_SIZE = 2000
+
+WORDS = (
+    'список', 'покупок', 'идеи', 'для', 'отпуска', 'планы', 'на', 'неделю',
+    'рецепт', 'пирога', 'книги', 'прочитать', 'встреча', 'с', 'друзьями',
+    'дела', 'по', 'дому', 'заметки', 'лекции', 'подарки', 'ремонт',
+    'кухни', 'тренировки', 'бюджет', 'месяца', 'важное', 'письмо',
+)
+
+
+def sentence(rng, words_count):
+    return ' '.join(rng.choices(WORDS, k=words_count)).capitalize()
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетических пользователей и заметки с кириллическими '
+        'заголовками для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--notes', type=int, default=10000)
+        parser.add_argument(
+            '--password',
+            default='password',
+            help='Общий пароль созданных пользователей.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        password = make_password(options['password'])
+        start = User.objects.count()
+        User.objects.bulk_create(
+            (
+                User(username=f'user{start + i}', password=password)
+                for i in range(options['users'])
+            ),
+            batch_size=batch_size,
+        )
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        max_slug_length = Note._meta.get_field('slug').max_length
+        offset = Note.objects.count()
+        last_pk = Note.objects.aggregate(last=Max('pk'))['last'] or 0
+        notes = []
+        for i in range(options['notes'] if user_ids else 0):
+            title = sentence(rng, rng.randint(2, 6))
+            # bulk_create не вызывает Note.save, поэтому slug задаём
+            # сами; номер в конце делает его уникальным.
+            suffix = f'-{offset + i}'
+            notes.append(Note(
+                title=title,
+                text=' '.join(
+                    sentence(rng, rng.randint(5, 15)) for _ in range(3)
+                ),
+                slug=slugify(title)[:max_slug_length - len(suffix)] + suffix,
+                author_id=rng.choice(user_ids),
+            ))
+            if len(notes) == batch_size:
+                Note.objects.bulk_create(notes)
+                notes = []
+        Note.objects.bulk_create(notes)
+        # bulk_create не отправляет сигналы: индексируем новые заметки.
+        search.reindex(
+            Note.objects.filter(pk__gt=last_pk), batch_size
+        )
+        self.stdout.write(
+            f'Создано пользователей: {options["users"]}, '
+            f'заметок: {options["notes"] if user_ids else 0}.'
+        )
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import transfer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает заметки пользователя из файла NDJSON или zip-архива '
+        'Markdown пачками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.DEFAULT_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('Пользователь не найден.')
+        path = options['path']
+        if path.endswith('.zip'):
+            report = transfer.import_notes(
+                author, transfer.iter_markdown_zip(path),
+                options['batch_size'],
+            )
+        else:
+            with open(path, encoding='utf-8') as file:
+                report = transfer.import_notes(
+                    author, transfer.iter_ndjson(file),
+                    options['batch_size'],
+                )
+        for error in report['errors']:
+            self.stderr.write(
+                f'{error["record"]}: {"; ".join(error["errors"])}'
+            )
+        self.stdout.write(f'Создано заметок: {report["created"]}.')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from notes import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает поисковый индекс заметок, например после '
+        'bulk_create или loaddata.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = search.rebuild(options['batch_size'])
+        self.stdout.write(f'Проиндексировано заметок: {count}.')
@@ -0,0 +1,30 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик из DATABASE_REPLICAS: '
+        'так локально имитируется репликация.'
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплик нет: задайте пути к ним в DJANGO_DB_REPLICAS.'
+            )
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            name = connections[alias].settings_dict['NAME']
+            # Резервная копия снимается из одной транзакции чтения
+            # и не блокирует запись в основную базу.
+            target = sqlite3.connect(name)
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias}: {name}')
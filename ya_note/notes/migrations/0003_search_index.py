@@ -0,0 +1,61 @@
+# Generated by Django 3.2.15 on 2026-10-18 06:55
+
+from django.conf import settings
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+# Схема зафиксирована здесь, а не берётся из notes.search: миграция
+# должна создавать ту же таблицу, как бы ни менялся код поиска.
+FTS_TABLE = 'notes_note_search'
+FTS_SCHEMA = (
+    f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+    "author, title, text, tokenize='unicode61 remove_diacritics 0', "
+    "prefix='2 3 4')"
+)
+
+
+def create_index(apps, schema_editor):
+    """
+    Создаёт таблицу FTS5.
+
+    Уже написанные заметки индексирует команда rebuild_search_index:
+    термины строит текущий код поиска, которому в миграции не место.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(FTS_SCHEMA)
+    except OperationalError:
+        # SQLite собран без FTS5: остаётся обратный индекс.
+        pass
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0002_note_author_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField()),
+                ('author', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='notes.note')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='noteterm',
+            index=models.Index(fields=['author', 'term'], name='noteterm_author_term_idx'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
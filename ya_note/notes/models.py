@@ -1,7 +1,18 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
 
-from pytils.translit import slugify
+from .translit import slugify
+
+
+# Сколько раз пробовать новый суффикс, если параллельные запросы
+# занимают slug одновременно с нами.
+SLUG_ATTEMPTS = 10
+# Запас длины под суффикс -N при поиске занятых slug.
+SLUG_SUFFIX_LENGTH = 8
+# Основа slug для заголовка, из которого slugify ничего не оставил:
+# пустая основа искала бы занятые slug запросом LIKE '%' по всей
+# таблице.
+EMPTY_SLUG_BASE = 'note'
 
 
 class Note(models.Model):
@@ -28,11 +39,106 @@ class Note(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('author', 'id'), name='note_author_id_idx'
+            ),
+        )
+
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """
+        Сохраняет заметку; пустой slug строится из заголовка.
+
+        Свободен ли slug, заранее не проверяем: сразу пишем в базу,
+        а если ограничение уникальности сработало, одним запросом
+        LIKE находим занятые суффиксы и пробуем следующий свободный.
+        Если его успел занять параллельный запрос, повторяем.
+        """
+        if self.slug:
+            super().save(*args, **kwargs)
+            return
+        base = self.slug_base(self.title)
+        self.slug = base
+        for _ in range(SLUG_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                if not self.slug_taken():
+                    raise
+                self.slug = self.free_slug(base)
+        raise IntegrityError(f'Не удалось подобрать свободный slug: {base}.')
+
+    def slug_taken(self):
+        """Занят ли slug заметки другой заметкой."""
+        return Note.objects.filter(slug=self.slug).exclude(
+            pk=self.pk
+        ).exists()
+
+    def free_slug(self, base):
+        """
+        Первый свободный slug вида base-N.
+
+        Все занятые варианты читаются одним запросом LIKE 'base%';
+        base укорачивается так, чтобы суффикс поместился в поле.
+        """
+        taken = set(
+            Note.objects.filter(
+                slug__startswith=self.slug_prefix(base)
+            ).exclude(pk=self.pk).values_list('slug', flat=True)
+        )
+        return self.numbered_slug(base, taken)
+
+    @classmethod
+    def slug_base(cls, title):
+        """Slug из заголовка, а для пустого результата — EMPTY_SLUG_BASE."""
+        max_slug_length = cls._meta.get_field('slug').max_length
+        return slugify(title)[:max_slug_length] or EMPTY_SLUG_BASE
+
+    @classmethod
+    def slug_prefix(cls, base):
+        """Общее начало base и всех slug вида base-N."""
+        max_slug_length = cls._meta.get_field('slug').max_length
+        return base[:max_slug_length - SLUG_SUFFIX_LENGTH]
+
+    @classmethod
+    def numbered_slug(cls, base, taken):
+        """Первый slug вида base-N, которого нет в taken."""
+        max_slug_length = cls._meta.get_field('slug').max_length
+        number = 2
+        while True:
+            suffix = f'-{number}'
+            slug = base[:max_slug_length - len(suffix)] + suffix
+            if slug not in taken:
+                return slug
+            number += 1
+
+
+class NoteTerm(models.Model):
+    """
+    Строка обратного индекса для поиска на базах без FTS5.
+
+    Вес — сумма весов вхождений термина в заголовок и текст.
+    """
+    TERM_LENGTH = 64
+
+    note = models.ForeignKey(Note, on_delete=models.CASCADE)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        db_index=False,
+    )
+    term = models.CharField(max_length=TERM_LENGTH)
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('author', 'term'), name='noteterm_author_term_idx'
+            ),
+        )
@@ -0,0 +1,166 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """
+    Кодировщик значений курсора.
+
+    DjangoJSONEncoder обрезает время до миллисекунд, и курсор
+    по DateTimeField перестал бы быть точным, поэтому время
+    кодируем полностью, а остальные типы оставляем как есть.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage:
+    """Страница выборки с курсорами на соседние страницы."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Постраничный вывод по ключу сортировки вместо OFFSET.
+
+    Курсор хранит значения полей сортировки крайней записи страницы,
+    поэтому любая страница выбирается одним запросом по индексу
+    и стоит столько же, сколько первая. Последним полем сортировки
+    должно быть уникальное поле, обычно pk.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-')) for name in self.ordering
+        ]
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу по курсору; без курсора — первую."""
+        if not cursor:
+            return self._page_after(None)
+        direction, values = self.decode_cursor(cursor)
+        if direction == PREVIOUS:
+            return self._page_before(values)
+        return self._page_after(values)
+
+    def _page_after(self, values):
+        queryset = self.queryset.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse=False))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return KeysetPage(
+            rows,
+            next_cursor=(
+                self.encode_cursor(NEXT, rows[-1]) if has_more else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(PREVIOUS, rows[0])
+                if values is not None and rows else None
+            ),
+        )
+
+    def _page_before(self, values):
+        reversed_ordering = [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+        queryset = self.queryset.order_by(*reversed_ordering).filter(
+            self._seek(values, reverse=True)
+        )
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(NEXT, rows[-1]) if rows else None,
+            previous_cursor=(
+                self.encode_cursor(PREVIOUS, rows[0]) if has_more else None
+            ),
+        )
+
+    def _seek(self, values, reverse):
+        """
+        Условие «строго после курсора» в порядке сортировки.
+
+        Первое поле дополнительно ограничено нестрогим неравенством,
+        чтобы база могла сразу начать просмотр индекса с нужного места.
+        """
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.fields, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        first_name, first_descending = self.fields[0]
+        first_lookup = 'lte' if first_descending != reverse else 'gte'
+        return Q(**{f'{first_name}__{first_lookup}': values[0]}) & condition
+
+    def _model_field(self, name):
+        meta = self.queryset.model._meta
+        return meta.pk if name == 'pk' else meta.get_field(name)
+
+    def encode_cursor(self, direction, obj):
+        """Кодирует курсор на запись obj в непрозрачную строку."""
+        values = [
+            self._model_field(name).to_python(getattr(obj, name))
+            for name, _ in self.fields
+        ]
+        payload = json.dumps([direction, values], cls=CursorJSONEncoder)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Разбирает курсор; на испорченный курсор отвечает 404."""
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            direction, raw_values = json.loads(
+                base64.urlsafe_b64decode(cursor + padding)
+            )
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if len(raw_values) != len(self.fields):
+                raise ValueError(raw_values)
+            values = [
+                self._model_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, raw_values)
+            ]
+        except (
+            ValueError, TypeError, binascii.Error, ValidationError
+        ) as error:
+            raise Http404('Неверный курсор страницы.') from error
+        return direction, values
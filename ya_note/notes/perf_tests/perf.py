@@ -0,0 +1,157 @@
+"""
+Замеры производительности страниц для набора perf_tests.
+
+Каждая страница прогоняется на данных нескольких размеров. Для каждого
+размера фиксируются медианное время ответа, пик выделенной памяти
+(tracemalloc) и число SQL-запросов, а результаты сравниваются
+с базовой линией в baseline.json рядом с тестами.
+
+Переменные окружения:
+    PERF_SIZES — размеры данных через запятую, по умолчанию
+        100,1000,10000; для полного прогона добавьте 100000,1000000;
+    PERF_UPDATE_BASELINE=1 — записать замеры в baseline.json вместо
+        проверки;
+    PERF_TOLERANCE — во сколько раз время и память могут превысить
+        базовую линию, по умолчанию 3.
+"""
+import json
+import math
+import os
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+SIZES = tuple(
+    int(size) for size in os.environ.get(
+        'PERF_SIZES', '100,1000,10000'
+    ).split(',')
+)
+UPDATE_BASELINE = os.environ.get('PERF_UPDATE_BASELINE') == '1'
+TOLERANCE = float(os.environ.get('PERF_TOLERANCE', '3'))
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+
+REPEAT = 5
+# Показатель степени роста времени может превысить ожидаемый
+# на столько из-за шума замеров.
+GROWTH_TOLERANCE = 0.3
+# На быстрых страницах шум больше самого времени ответа, поэтому
+# превышение меньше этих порогов не считается регрессией.
+MIN_TIME_SLACK_MS = 5
+MIN_MEMORY_SLACK_KB = 256
+
+
+def measure(request, before=None, repeat=REPEAT):
+    """
+    Замеряет запрос request() и возвращает время, память и число SQL.
+
+    before() вызывается перед каждым запросом, например чтобы
+    очистить кэш и замерить настоящую работу страницы.
+    """
+    timings = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        request()
+        timings.append((time.perf_counter() - start) * 1000)
+    if before is not None:
+        before()
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.start()
+        try:
+            request()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {
+        'time_ms': round(statistics.median(timings), 3),
+        'memory_kb': round(peak / 1024, 1),
+        'queries': len(queries),
+    }
+
+
+def growth(results):
+    """
+    Показатель степени роста времени между крайними размерами.
+
+    0 — время не зависит от объёма данных, 1 — растёт линейно.
+    """
+    smallest, largest = min(results), max(results)
+    if smallest == largest:
+        return 0
+    return math.log(
+        results[largest]['time_ms'] / results[smallest]['time_ms']
+    ) / math.log(largest / smallest)
+
+
+class Baseline:
+    """Базовая линия замеров: {страница: {'max_growth', 'sizes'}}."""
+
+    def __init__(self, path=BASELINE_PATH):
+        self.path = path
+        self.data = (
+            json.loads(path.read_text(encoding='utf-8'))
+            if path.exists() else {}
+        )
+
+    def check(self, name, results, max_growth):
+        """Возвращает список нарушений бюджета страницей name."""
+        if UPDATE_BASELINE:
+            sizes = self.data.setdefault(name, {}).setdefault('sizes', {})
+            sizes.update(
+                {str(size): result for size, result in results.items()}
+            )
+            self.data[name]['max_growth'] = max_growth
+            return []
+        errors = []
+        budgets = self.data.get(name, {}).get('sizes', {})
+        for size, result in results.items():
+            budget = budgets.get(str(size))
+            if budget is None:
+                errors.append(
+                    f'{name}: нет базовой линии для {size} строк, '
+                    'запустите с PERF_UPDATE_BASELINE=1.'
+                )
+                continue
+            errors.extend(
+                f'{name} на {size} строках: {message}'
+                for message in compare(result, budget)
+            )
+        exponent = growth(results)
+        if exponent > max_growth + GROWTH_TOLERANCE:
+            errors.append(
+                f'{name}: время растёт как n^{exponent:.2f}, '
+                f'допустимо n^{max_growth}.'
+            )
+        return errors
+
+    def save(self):
+        if UPDATE_BASELINE:
+            self.path.write_text(
+                json.dumps(
+                    self.data, ensure_ascii=False, indent=2, sort_keys=True
+                ) + '\n',
+                encoding='utf-8',
+            )
+
+
+def compare(result, budget):
+    if result['queries'] > budget['queries']:
+        yield (
+            f'{result["queries"]} SQL-запросов вместо {budget["queries"]}.'
+        )
+    time_limit = max(
+        budget['time_ms'] * TOLERANCE, budget['time_ms'] + MIN_TIME_SLACK_MS
+    )
+    if result['time_ms'] > time_limit:
+        yield f'{result["time_ms"]} мс при бюджете {time_limit:.1f} мс.'
+    memory_limit = max(
+        budget['memory_kb'] * TOLERANCE,
+        budget['memory_kb'] + MIN_MEMORY_SLACK_KB,
+    )
+    if result['memory_kb'] > memory_limit:
+        yield f'{result["memory_kb"]} КБ при бюджете {memory_limit:.0f} КБ.'
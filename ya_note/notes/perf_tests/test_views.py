@@ -0,0 +1,140 @@
+import json
+from http import HTTPStatus
+from itertools import islice
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from notes import search
+from notes.models import Note
+from notes.perf_tests.perf import SIZES, Baseline, measure
+
+User = get_user_model()
+
+INSERT_BATCH_SIZE = 10_000
+# Сколько заметок в одном загружаемом файле.
+IMPORT_ROWS = 100
+
+# Страница: адрес по заметке и допустимый показатель роста времени.
+# Страницы, включая список заметок, выводят ограниченный объём
+# данных, поэтому время ответа не должно зависеть от числа заметок.
+# Исключения растут линейно: выгрузка отдаёт все заметки автора,
+# а поиск ранжирует все совпадения, и запрос совпадает с каждой.
+VIEWS = {
+    'notes:home': (lambda note: reverse('notes:home'), 0.5),
+    'notes:list': (lambda note: reverse('notes:list'), 0.5),
+    'notes:detail': (
+        lambda note: reverse('notes:detail', args=(note.slug,)), 0.5
+    ),
+    'notes:add': (lambda note: reverse('notes:add'), 0.5),
+    'notes:edit': (
+        lambda note: reverse('notes:edit', args=(note.slug,)), 0.5
+    ),
+    'notes:search': (
+        lambda note: (
+            f'{reverse("notes:search")}?{urlencode({"q": "заметка"})}'
+        ),
+        1,
+    ),
+    'notes:export': (lambda note: reverse('notes:export'), 1),
+}
+
+
+class TestViewsPerformance(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.baseline = Baseline()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.baseline.save()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.note = Note.objects.create(
+            title='Заметка', text='Текст заметки.', author=cls.author
+        )
+
+    def grow(self, size):
+        """Доводит число заметок автора до size."""
+        notes = (
+            Note(
+                title=f'Заметка {i}', text='Текст заметки.',
+                slug=f'note-{i}', author=self.author,
+            )
+            for i in range(Note.objects.count(), size)
+        )
+        while batch := list(islice(notes, INSERT_BATCH_SIZE)):
+            Note.objects.bulk_create(batch)
+        # bulk_create не вызывает сигналы, которые обновляют индекс поиска.
+        search.rebuild()
+
+    def check_view(self, name):
+        """Замеряет страницу name на каждом размере и сверяет с бюджетом."""
+        url, max_growth = VIEWS[name]
+
+        def get():
+            response = self.author_client.get(url(self.note))
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            if response.streaming:
+                b''.join(response.streaming_content)
+
+        self.check_request(name, get, max_growth)
+
+    def check_request(self, name, request, max_growth):
+        """Замеряет request() на каждом размере и сверяет с бюджетом."""
+        results = {}
+        for size in SIZES:
+            self.grow(size)
+            results[size] = measure(request)
+        errors = self.baseline.check(name, results, max_growth)
+        self.assertFalse(errors, '\n'.join(errors))
+
+    def test_home(self):
+        self.check_view('notes:home')
+
+    def test_list(self):
+        self.check_view('notes:list')
+
+    def test_detail(self):
+        self.check_view('notes:detail')
+
+    def test_add(self):
+        self.check_view('notes:add')
+
+    def test_edit(self):
+        self.check_view('notes:edit')
+
+    def test_search(self):
+        self.check_view('notes:search')
+
+    def test_export(self):
+        self.check_view('notes:export')
+
+    def test_import(self):
+        """Тест, что загрузка файла заметок не дорожает с ростом базы."""
+        content = '\n'.join(
+            json.dumps({
+                'title': f'Загруженная заметка {i}', 'text': 'Текст заметки.'
+            }, ensure_ascii=False)
+            for i in range(IMPORT_ROWS)
+        ).encode()
+
+        def post():
+            response = self.author_client.post(reverse('notes:import'), {
+                'file': SimpleUploadedFile('notes.ndjson', content),
+            })
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertEqual(
+                response.context['report']['created'], IMPORT_ROWS
+            )
+
+        self.check_request('notes:import', post, 0.5)
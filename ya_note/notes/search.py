@@ -0,0 +1,324 @@
+"""
+Полнотекстовый поиск по заметкам пользователя.
+
+Слова заголовка и текста приводятся к терминам: русские слова —
+к основе лёгким стеммером, остальные — к нижнему регистру. Термины
+хранятся в таблице FTS5 (SQLite) или, на других базах, в обратном
+индексе NoteTerm. Сигналы обновляют индекс при сохранении и удалении
+заметки; после bulk_create и загрузки данных индекс перестраивает
+команда rebuild_search_index.
+
+Слово запроса ищется по префиксу и в транслитерации, как её строит
+pytils для slug: «заметки» найдёт и «zametka», а «zametki» —
+«заметку».
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import OuterRef, Q, Subquery, Sum
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+from pytils.translit import detranslify, translify
+
+from .models import Note, NoteTerm
+
+FTS_TABLE = 'notes_note_search'
+FTS_SCHEMA = (
+    f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+    "author, title, text, tokenize='unicode61 remove_diacritics 0', "
+    "prefix='2 3 4')"
+)
+
+TITLE_WEIGHT = 10
+TEXT_WEIGHT = 1
+MAX_QUERY_WORDS = 8
+SNIPPET_WORDS = 30
+
+_WORD = re.compile(r'\w+')
+_CYRILLIC = re.compile(r'[а-яё]')
+_LATIN = re.compile(r'^[a-z]+$')
+_MIN_STEM = 3
+# Окончания от длинных к коротким: отрезается самое длинное
+# подходящее, если основа остаётся не короче _MIN_STEM букв.
+_ENDINGS = sorted((
+    'ыми', 'ими', 'ого', 'его', 'ому', 'ему', 'ая', 'яя', 'ое', 'ее', 'ие',
+    'ые', 'ой', 'ей', 'ий', 'ый', 'ых', 'их', 'ую', 'юю', 'ом', 'ем', 'ам',
+    'ям', 'ах', 'ях', 'ами', 'ями', 'ов', 'ев', 'ью', 'ия', 'ии', 'ию',
+    'ешь', 'ете', 'ет', 'ют', 'ут', 'ят', 'ат', 'ит', 'ишь', 'ить', 'ать',
+    'ять', 'еть', 'уть', 'ла', 'ло', 'ли', 'ть', 'а', 'я', 'о', 'е', 'и',
+    'ы', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True)
+_REFLEXIVE = ('ся', 'сь')
+
+
+def stem(word):
+    """Лёгкий стеммер для русских слов: срезает окончание."""
+    word = word.lower().replace('ё', 'е')
+    for suffix in _REFLEXIVE:
+        if word.endswith(suffix) and len(word) - 2 >= _MIN_STEM:
+            word = word[:-2]
+            break
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+@lru_cache(maxsize=100_000)
+def term(word):
+    """Термин индекса для слова; словарь текстов невелик, кэшируем."""
+    word = word.lower()
+    return stem(word) if _CYRILLIC.search(word) else word
+
+
+def terms(text):
+    return [term(word) for word in _WORD.findall(text or '')]
+
+
+def term_weights(title, text):
+    """Термины заметки с весами: вхождение в заголовок весит больше."""
+    weights = {}
+    for words, weight in (
+        (terms(title), TITLE_WEIGHT),
+        (terms(text), TEXT_WEIGHT),
+    ):
+        for word in words:
+            weights[word] = weights.get(word, 0) + weight
+    return weights
+
+
+def fts_row(note):
+    """Строка таблицы FTS5 для заметки: rowid, автор и термины."""
+    return (
+        note.pk, str(note.author_id),
+        ' '.join(terms(note.title)), ' '.join(terms(note.text)),
+    )
+
+
+def query_forms(word):
+    """
+    Варианты термина для слова запроса.
+
+    Кириллическое слово ищется ещё и в транслитерации, латинское —
+    ещё и как русское слово, записанное латиницей.
+    """
+    base = term(word)
+    forms = {base}
+    try:
+        if _CYRILLIC.search(base):
+            forms.add(translify(base).lower())
+        elif _LATIN.match(base):
+            cyrillic = detranslify(base)
+            if not re.search(r'[a-z]', cyrillic):
+                forms.add(term(cyrillic))
+    except ValueError:
+        pass
+    return sorted(form for form in forms if _WORD.fullmatch(form))
+
+
+def parse_query(query):
+    """Слова запроса: список наборов вариантов, по набору на слово."""
+    words = _WORD.findall(query or '')[:MAX_QUERY_WORDS]
+    return [forms for forms in map(query_forms, words) if forms]
+
+
+def _matches(word, forms):
+    word_term = term(word)
+    return any(word_term.startswith(form) for form in forms)
+
+
+def highlight(text, parsed, words=None):
+    """
+    Текст с найденными словами в <mark>.
+
+    С words возвращается отрывок из words слов вокруг первого
+    совпадения — сниппет для списка результатов.
+    """
+    text = text or ''
+    forms = [form for word_forms in parsed for form in word_forms]
+    spans = list(_WORD.finditer(text))
+    found = [
+        index for index, match in enumerate(spans)
+        if _matches(match.group(), forms)
+    ]
+    first, last = 0, len(spans)
+    if words is not None:
+        first = max(0, (found[0] if found else 0) - words // 3)
+        last = min(last, first + words)
+    start = spans[first].start() if 0 < first < len(spans) else 0
+    end = spans[last - 1].end() if last < len(spans) else len(text)
+    parts = ['…' if start else '']
+    position = start
+    for index in found:
+        if first <= index < last:
+            match = spans[index]
+            parts.append(escape(text[position:match.start()]))
+            parts.append(f'<mark>{escape(match.group())}</mark>')
+            position = match.end()
+    parts.append(escape(text[position:end]))
+    parts.append('…' if end < len(text) else '')
+    return mark_safe(''.join(parts))
+
+
+class FTS5Backend:
+    """Индекс в виртуальной таблице FTS5; rowid строки — pk заметки."""
+
+    def index(self, notes):
+        rows = [fts_row(note) for note in notes]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, author, title, text) '
+                'VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk in pks],
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, author_id, parsed, limit):
+        # Термины — только буквы и цифры, поэтому кавычки
+        # безопасно отделяют их от синтаксиса FTS5.
+        words = ' AND '.join(
+            '(' + ' OR '.join(f'"{form}"*' for form in forms) + ')'
+            for forms in parsed
+        )
+        match = f'author : "{author_id}" AND {{title text}} : ({words})'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, 0, %s, %s) LIMIT %s',
+                [match, TITLE_WEIGHT, TEXT_WEIGHT, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class TermsBackend:
+    """Обратный индекс в модели NoteTerm для баз без FTS5."""
+
+    def index(self, notes):
+        notes = list(notes)
+        NoteTerm.objects.filter(note__in=notes).delete()
+        NoteTerm.objects.bulk_create(
+            (
+                NoteTerm(
+                    note=note, author_id=note.author_id,
+                    term=word[:NoteTerm.TERM_LENGTH], weight=weight,
+                )
+                for note in notes
+                for word, weight in term_weights(note.title, note.text).items()
+            ),
+            batch_size=1000,
+        )
+
+    def remove(self, pks):
+        NoteTerm.objects.filter(note_id__in=pks).delete()
+
+    def clear(self):
+        NoteTerm.objects.all().delete()
+
+    def search(self, author_id, parsed, limit):
+        author_terms = NoteTerm.objects.filter(author_id=author_id)
+        notes = Note.objects.filter(author_id=author_id)
+        any_word = Q()
+        for forms in parsed:
+            word = Q()
+            for form in forms:
+                word |= Q(term__startswith=form)
+            notes = notes.filter(
+                pk__in=author_terms.filter(word).values('note_id')
+            )
+            any_word |= word
+        rank = author_terms.filter(any_word, note=OuterRef('pk')).values(
+            'note'
+        ).annotate(total=Sum('weight')).values('total')
+        return list(
+            notes.annotate(rank=Subquery(rank)).order_by(
+                '-rank', '-pk'
+            ).values_list('pk', flat=True)[:limit]
+        )
+
+
+@lru_cache(maxsize=None)
+def _backend(path):
+    return import_string(path)()
+
+
+@lru_cache(maxsize=None)
+def _has_fts_table(database):
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def get_backend():
+    """
+    Бэкенд из NOTES_SEARCH_BACKEND; по умолчанию FTS5, если таблицу
+    создала миграция, иначе обратный индекс.
+    """
+    path = settings.NOTES_SEARCH_BACKEND
+    if path is None:
+        path = (
+            'notes.search.FTS5Backend'
+            if _has_fts_table(connection.settings_dict['NAME'])
+            else 'notes.search.TermsBackend'
+        )
+    return _backend(path)
+
+
+def reindex(notes, batch_size=1000):
+    """Индексирует заметки пачками; возвращает их число."""
+    backend = get_backend()
+    count = 0
+    batch = []
+    for note in notes.order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(note)
+        if len(batch) == batch_size:
+            backend.index(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        backend.index(batch)
+    return count + len(batch)
+
+
+def rebuild(batch_size=1000):
+    """Перестраивает индекс всех заметок."""
+    get_backend().clear()
+    return reindex(Note.objects.all(), batch_size)
+
+
+def search(author_id, query, limit=None):
+    """
+    Заметки автора по запросу, от самых подходящих.
+
+    У каждой заметки есть title_html и snippet с подсветкой.
+    """
+    parsed = parse_query(query)
+    if not parsed:
+        return []
+    pks = get_backend().search(
+        author_id, parsed, limit or settings.NOTES_SEARCH_RESULTS
+    )
+    notes = Note.objects.in_bulk(pks)
+    results = []
+    for pk in pks:
+        note = notes.get(pk)
+        if note is None:
+            continue
+        note.title_html = highlight(note.title, parsed)
+        note.snippet = highlight(note.text, parsed, SNIPPET_WORDS)
+        results.append(note)
+    return results
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import authcache, search
+from .models import Note
+
+
+@receiver(post_save, sender=Note)
+def note_saved(sender, instance, **kwargs):
+    """Обновляет поисковый индекс заметки."""
+    search.get_backend().index([instance])
+
+
+@receiver(post_delete, sender=Note)
+def note_deleted(sender, instance, **kwargs):
+    """Убирает заметку из поискового индекса."""
+    search.get_backend().remove([instance.pk])
+
+
+@receiver((post_save, post_delete), sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    """Сбрасывает пользователя из кэша, в том числе после входа."""
+    authcache.forget_user(instance.pk)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Выполняет SQLITE_PRAGMAS на каждом новом соединении SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
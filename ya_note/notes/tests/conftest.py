@@ -0,0 +1,27 @@
+import pytest
+
+from notes import querycheck
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(
+    django_db_modify_db_settings_parallel_suffix, tmp_path_factory
+):
+    """
+    Тестовая база SQLite — файл, а не память.
+
+    Тесты гонок пишут в базу из нескольких потоков, и блокировки
+    должны быть такими же, как у файла базы проекта.
+    """
+    from django.db import connections
+
+    settings_dict = connections['default'].settings_dict
+    settings_dict['TEST']['NAME'] = str(
+        tmp_path_factory.mktemp('db') / 'test.sqlite3'
+    )
+
+
+@pytest.fixture(autouse=True)
+def fail_on_duplicate_queries(settings):
+    """Роняет тест, если страница повторяет одну форму запроса (N+1)."""
+    settings.QUERY_PATTERN_CHECK = querycheck.RAISE
@@ -1,7 +1,18 @@
+import json
+import tracemalloc
+from http import HTTPStatus
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.core.cache import cache, caches
+from django.db import connection
+from django.template import engines
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from notes import authcache, instrumentation, search, warmup
 from notes.forms import NoteForm
 from notes.models import Note
 
@@ -61,3 +72,279 @@ class TestNoteContent(TestCase):
                 response = self.user_client.get(url)
                 self.assertIn('form', response.context)
                 self.assertIsInstance(response.context['form'], NoteForm)
+
+
+@override_settings(TEMPLATES_WARM_UP=True)
+class TestWarmUp(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='pass')
+        cls.note = Note.objects.create(
+            title='Заметка', text='Текст', author=cls.user
+        )
+
+    def test_warm_up_precompiles_templates(self):
+        """
+        Тест, что после прогрева все шаблоны проекта лежат в кэше
+        загрузчика и страницы рендерятся без чтения файлов.
+        """
+        engine = engines['django'].engine
+        loader = engine.template_loaders[0]
+        loader.reset()
+        warmup.warm_up()
+        names = set(warmup.template_names(engine))
+        self.assertTrue({'base.html', 'notes/list.html'} <= names)
+        self.assertTrue(names <= set(loader.get_template_cache))
+        self.client.force_login(self.user)
+        urls = (
+            reverse('notes:home'),
+            reverse('notes:list'),
+            reverse('notes:detail', args=(self.note.slug,)),
+        )
+        with mock.patch.object(
+            FilesystemLoader, 'get_contents', side_effect=AssertionError
+        ):
+            for url in urls:
+                with self.subTest(url=url):
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class TestCachedAuthentication(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='pass')
+        cls.home_url = reverse('notes:home')
+        cls.notes_list_url = reverse('notes:list')
+
+    def test_anonymous_request_skips_session(self):
+        """Тест, что анонимный GET не загружает сессию."""
+        response = self.client.get(self.home_url)
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+        self.assertFalse(response.wsgi_request.session.accessed)
+
+    def test_user_and_session_read_from_cache(self):
+        """Тест, что повторный запрос не читает сессию и пользователя."""
+        self.client.force_login(self.user)
+        self.client.get(self.notes_list_url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.notes_list_url)
+        self.assertEqual(response.wsgi_request.user, self.user)
+        tables = ('django_session', 'auth_user')
+        for query in queries:
+            for table in tables:
+                self.assertNotIn(f'FROM "{table}"', query['sql'])
+
+    def test_password_change_ends_cached_sessions(self):
+        """Тест, что смена пароля сбрасывает пользователя из кэша."""
+        self.client.force_login(self.user)
+        self.client.get(self.notes_list_url)
+        self.user.set_password('new-password')
+        self.user.save()
+        response = self.client.get(self.notes_list_url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_password_hash_not_cached(self):
+        """Тест, что в кэше нет хеша пароля, а save() его сохраняет."""
+        self.client.force_login(self.user)
+        self.client.get(self.notes_list_url)
+        key = authcache.USER_KEY.format(pk=self.user.pk)
+        user, _ = cache.get(key)
+        self.assertIn('password', user.get_deferred_fields())
+        user.first_name = 'Имя'
+        user.save()
+        self.assertTrue(
+            User.objects.get(pk=self.user.pk).check_password('pass')
+        )
+
+
+@override_settings(NOTES_COUNT_ON_LIST_PAGE=4)
+class TestNotesListPagination(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='pass')
+        cls.user_client = Client()
+        cls.user_client.force_login(cls.user)
+        Note.objects.bulk_create(
+            Note(
+                title=f'Заметка {index}', text='Текст', slug=f'note-{index}',
+                author=cls.user,
+            )
+            for index in range(10)
+        )
+        cls.notes_list_url = reverse('notes:list')
+
+    def test_pages_cover_all_notes_without_text(self):
+        """
+        Тест, что страницы по курсору выводят все заметки по порядку
+        и не загружают их текст.
+        """
+        expected = list(
+            Note.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        seen = []
+        url = self.notes_list_url
+        while url:
+            page = self.user_client.get(url).context['page']
+            self.assertLessEqual(len(page), 4)
+            for note in page:
+                self.assertIn('text', note.get_deferred_fields())
+            seen.extend(note.pk for note in page)
+            self.assertLessEqual(len(seen), len(expected))
+            url = (
+                f'{self.notes_list_url}?cursor={page.next_cursor}'
+                if page.has_next else None
+            )
+        self.assertEqual(seen, expected)
+
+    def test_broken_cursor(self):
+        """Тест, что испорченный курсор даёт 404."""
+        response = self.user_client.get(f'{self.notes_list_url}?cursor=x')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+@override_settings(PERF_INSTRUMENTATION=True)
+class TestPerfInstrumentation(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='pass')
+        cls.admin = User.objects.create_superuser(
+            username='admin', password='pass'
+        )
+        cls.notes_list_url = reverse('notes:list')
+        cls.perf_stats_url = reverse('notes:perf_stats')
+
+    def setUp(self):
+        instrumentation.clear_history()
+        self.addCleanup(instrumentation.clear_history)
+
+    def test_request_timings_in_header_and_history(self):
+        """Тест, что замеры запроса попадают в Server-Timing и историю."""
+        client = Client()
+        client.force_login(self.user)
+        with self.assertLogs(instrumentation.__name__, 'INFO'):
+            response = client.get(self.notes_list_url)
+        for metric in ('total;dur=', 'sql;dur=', 'tpl;dur='):
+            self.assertIn(metric, response['Server-Timing'])
+        report = {row['url_name']: row for row in instrumentation.get_report()}
+        self.assertEqual(report['notes:list']['requests'], 1)
+
+    def test_cache_backends_not_patched(self):
+        """Тест, что счётчик кэша не подменяет методы классов кэша."""
+        backend = type(caches['default'])
+        get = backend.get
+        client = Client()
+        client.force_login(self.user)
+        client.get(self.notes_list_url)
+        self.assertIs(backend.get, get)
+        self.assertIs(type(caches['default']), backend)
+
+    @override_settings(PERF_TRACE_MEMORY=True)
+    def test_memory_peak_traced(self):
+        """Тест, что с PERF_TRACE_MEMORY в лог идёт пик памяти."""
+        self.addCleanup(tracemalloc.stop)
+        client = Client()
+        client.force_login(self.user)
+        with self.assertLogs(instrumentation.__name__, 'INFO') as logs:
+            client.get(self.notes_list_url)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertGreater(record['memory_peak_kb'], 0)
+
+    def test_perf_stats_available_only_to_staff(self):
+        """Тест, что историю замеров видит только персонал."""
+        client = Client()
+        client.force_login(self.user)
+        self.assertEqual(
+            client.get(self.perf_stats_url).status_code, HTTPStatus.FOUND
+        )
+        client.force_login(self.admin)
+        client.get(self.notes_list_url)
+        response = client.get(self.perf_stats_url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'notes:list')
+
+
+class TestNoteSearch(TestCase):
+    """Поиск по заметкам; бэкенд по умолчанию — FTS5."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='pass')
+        cls.another_user = User.objects.create_user(
+            username='another_user', password='pass'
+        )
+        cls.recipe = Note.objects.create(
+            title='Рецепт пирога', text='Мука, яблоки и корица.',
+            author=cls.user,
+        )
+        cls.shopping = Note.objects.create(
+            title='Покупки', text='Купить муку для пирогов и молоко.',
+            author=cls.user,
+        )
+        cls.latin = Note.objects.create(
+            title='Zametka', text='Latin text', author=cls.user,
+        )
+        Note.objects.create(
+            title='Пирог соседа', text='Чужой пирог.',
+            author=cls.another_user,
+        )
+        cls.search_url = reverse('notes:search')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def found(self, query):
+        response = self.client.get(self.search_url, {'q': query})
+        return list(response.context['object_list'])
+
+    def test_word_forms_and_ranking(self):
+        """Тест, что находятся формы слова, а заголовок весит больше."""
+        self.assertEqual(self.found('пироги'), [self.recipe, self.shopping])
+
+    def test_all_words_required(self):
+        """Тест, что заметка должна содержать все слова запроса."""
+        self.assertEqual(self.found('мука молоко'), [self.shopping])
+
+    def test_prefix_and_transliteration(self):
+        """Тест поиска по началу слова и в транслитерации."""
+        self.assertEqual(self.found('пок'), [self.shopping])
+        self.assertEqual(self.found('заметки'), [self.latin])
+
+    def test_results_only_for_author(self):
+        """Тест, что чужие заметки не попадают в результаты."""
+        self.client.force_login(self.another_user)
+        self.assertEqual(len(self.found('пирог')), 1)
+        self.assertEqual(self.found('корица'), [])
+
+    def test_highlighted_snippet(self):
+        """Тест подсветки найденных слов в заголовке и сниппете."""
+        response = self.client.get(self.search_url, {'q': 'яблоко'})
+        self.assertContains(response, 'Мука, <mark>яблоки</mark> и корица.')
+        self.assertEqual(
+            search.highlight('<b>яблоки</b>', search.parse_query('яблоко')),
+            '&lt;b&gt;<mark>яблоки</mark>&lt;/b&gt;',
+        )
+
+    def test_index_follows_edit_and_delete(self):
+        """Тест, что индекс обновляется при правке и удалении заметки."""
+        self.recipe.title = 'Рецепт торта'
+        self.recipe.save()
+        self.assertEqual(self.found('торт'), [self.recipe])
+        self.recipe.delete()
+        self.assertEqual(self.found('торт'), [])
+
+    def test_empty_query(self):
+        """Тест, что пустой запрос ничего не ищет."""
+        self.assertEqual(self.found(' '), [])
+
+
+@override_settings(NOTES_SEARCH_BACKEND='notes.search.TermsBackend')
+class TestNoteSearchTermsBackend(TestNoteSearch):
+    """Те же проверки для обратного индекса без FTS5."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with override_settings(
+            NOTES_SEARCH_BACKEND='notes.search.TermsBackend'
+        ):
+            super().setUpTestData()
@@ -1,15 +1,44 @@
+import io
+import json
+import os
+import random
+import subprocess
+import sqlite3
+import sys
+import tempfile
+import threading
+import zipfile
+from collections import Counter
+from contextlib import ExitStack, closing
 from http import HTTPStatus
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections
+from django.db.models import QuerySet
+from django.template import Context, Template
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from pytils.translit import slugify
 
+from notes import querycheck, replicas, search, transfer, translit
+from notes.management.commands.generate_notes import WORDS
 from notes.models import Note
-from notes.forms import WARNING
+from notes.forms import WARNING, NoteForm
 
 User = get_user_model()
 
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+
 
 class TestNoteLogic(TestCase):
     @classmethod
@@ -137,3 +166,504 @@ class TestNoteLogic(TestCase):
         response = self.another_client.post(self.url_delete)
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTrue(Note.objects.filter(pk=self.note.pk).exists())
+
+
+class TestSlugify(TestCase):
+    # Кириллица в обоих регистрах, латиница, цифры, кавычки, тире,
+    # пробельные символы и прочие знаки из начала Юникода.
+    ALPHABET = [chr(code) for code in range(0x500)] + list(
+        '–—‒−…№«»“”‘’ \t\n\u00a0\u2003'
+    ) + ['&amp;', '&', ' & ']
+
+    def assert_same_as_pytils(self, corpus):
+        for value in corpus:
+            self.assertEqual(
+                translit.slugify(value), slugify(value), repr(value)
+            )
+
+    def test_matches_pytils_on_random_strings(self):
+        """Тест, что slug совпадает с pytils на случайных строках."""
+        rng = random.Random(0)
+        self.assert_same_as_pytils(
+            ''.join(rng.choices(self.ALPHABET, k=rng.randint(0, 40)))
+            for _ in range(20000)
+        )
+
+    def test_matches_pytils_on_titles(self):
+        """Тест, что slug совпадает с pytils на похожих на заголовки фразах."""
+        rng = random.Random(0)
+        words = [*WORDS, *(word.upper() for word in WORDS), 'Ёлка', 'ЩИ']
+        separators = [' ', ' - ', ' — ', ', ', ' & ', '... ', ' №']
+        self.assert_same_as_pytils(
+            ''.join(
+                rng.choice(words) + rng.choice(separators)
+                for _ in range(rng.randint(1, 8))
+            )
+            for _ in range(5000)
+        )
+
+    def test_cache_is_bounded(self):
+        """Тест, что кэш ограничен и повторный вызов берётся из него."""
+        translit.cache_clear()
+        translit.slugify('Заметка')
+        translit.slugify('Заметка')
+        info = translit.cache_info()
+        self.assertEqual(info.maxsize, translit.SLUGIFY_CACHE_SIZE)
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+
+class TestSlugAllocation(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='pass')
+
+    def test_form_validation_does_not_query_slug(self):
+        """Тест, что форма не проверяет slug отдельным запросом."""
+        form = NoteForm(data={'title': 'Заметка', 'text': 'Текст'})
+        with self.assertNumQueries(0):
+            self.assertTrue(form.is_valid())
+
+    def test_same_titles_get_numbered_slugs(self):
+        """Тест, что совпадающие заголовки получают суффиксы по порядку."""
+        notes = [
+            Note.objects.create(title='Список дел', author=self.user)
+            for _ in range(3)
+        ]
+        self.assertEqual(
+            [note.slug for note in notes],
+            ['spisok-del', 'spisok-del-2', 'spisok-del-3'],
+        )
+
+    def test_suffix_fits_long_slug(self):
+        """Тест, что суффикс помещается в поле вместе с длинным slug."""
+        title = 'a' * 100
+        Note.objects.create(title=title, author=self.user)
+        note = Note.objects.create(title=title, author=self.user)
+        self.assertEqual(note.slug, 'a' * 98 + '-2')
+
+    def test_title_without_slug_characters(self):
+        """Тест, что заголовок без букв и цифр получает slug note-N."""
+        Note.objects.create(title='Other', slug='other', author=self.user)
+        with CaptureQueriesContext(connection) as context:
+            notes = [
+                Note.objects.create(title='!!!', author=self.user)
+                for _ in range(3)
+            ]
+        self.assertEqual(
+            [note.slug for note in notes], ['note', 'note-2', 'note-3']
+        )
+        self.assertFalse(any(
+            "LIKE '%'" in query['sql'] for query in context.captured_queries
+        ))
+        report = transfer.import_notes(
+            self.user, [(1, {'title': '???', 'text': 'Текст'})]
+        )
+        self.assertEqual(report['created'], 1)
+        self.assertTrue(Note.objects.filter(slug='note-4').exists())
+
+
+class TestConcurrentSlugs(TransactionTestCase):
+    """Одновременное создание заметок из потоков на файловой базе SQLite."""
+    THREADS = 8
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+
+    def run_threads(self, target):
+        barrier = threading.Barrier(self.THREADS)
+        results = [None] * self.THREADS
+
+        def run(index):
+            try:
+                barrier.wait()
+                results[index] = target()
+            except Exception as error:
+                results[index] = error
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=run, args=(index,))
+            for index in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_database_is_file(self):
+        """Тест, что гонки проверяются не на базе в памяти."""
+        self.assertFalse(connection.is_in_memory_db())
+
+    def test_same_title_from_many_threads(self):
+        """Тест, что параллельные заметки с одним заголовком сохраняются."""
+        results = self.run_threads(
+            lambda: Note.objects.create(
+                title='Одна тема', text='Текст', author_id=self.user.pk
+            ).slug
+        )
+        self.assertEqual(
+            sorted(results),
+            sorted(['odna-tema'] + [
+                f'odna-tema-{number}'
+                for number in range(2, self.THREADS + 1)
+            ]),
+        )
+
+    def test_same_explicit_slug_from_many_threads(self):
+        """Тест, что один slug достаётся одному, остальные видят ошибку."""
+        url = reverse('notes:add')
+
+        def post():
+            client = Client()
+            client.force_login(self.user)
+            response = client.post(url, {
+                'title': 'Заметка', 'text': 'Текст', 'slug': 'shared',
+            })
+            return response.status_code
+
+        results = self.run_threads(post)
+        self.assertEqual(results.count(HTTPStatus.FOUND), 1)
+        self.assertEqual(results.count(HTTPStatus.OK), self.THREADS - 1)
+        self.assertEqual(Note.objects.filter(slug='shared').count(), 1)
+
+
+REPLICAS = ['replica1', 'replica2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class TestReplicaRouting(TransactionTestCase):
+    """Чтение с реплик — зеркал тестовой базы — и возврат в default."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.force_login(self.user)
+        Note.objects.create(title='Заметка', text='Текст', author=self.user)
+        self.queries = Counter()
+        wrappers = ExitStack()
+        for alias in connections:
+            wrappers.enter_context(
+                connections[alias].execute_wrapper(self.counter(alias))
+            )
+        self.addCleanup(wrappers.close)
+
+    def counter(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            self.queries[alias] += 1
+            return execute(sql, params, many, context)
+        return wrapper
+
+    def get_list(self):
+        self.queries.clear()
+        response = self.client.get(reverse('notes:list'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response
+
+    def test_list_read_from_one_replica(self):
+        """Тест, что список заметок читается с одной из реплик."""
+        self.get_list()
+        (alias,) = self.queries
+        self.assertIn(alias, REPLICAS)
+
+    def test_list_pinned_to_primary_after_create(self):
+        """Тест, что после новой заметки список читается из default."""
+        response = self.client.post(reverse('notes:add'), {
+            'title': 'Новая', 'text': 'Текст', 'slug': 'new',
+        })
+        cookie = response.cookies[replicas.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+        response = self.get_list()
+        self.assertIn('new', [note.slug for note in response.context['page']])
+        self.assertEqual(set(self.queries), {'default'})
+        del self.client.cookies[replicas.PIN_COOKIE]
+        self.get_list()
+        self.assertNotIn('default', self.queries)
+
+    def test_reads_return_to_primary_after_write(self):
+        """Тест, что после записи в запросе чтения идут в default."""
+        aliases = []
+
+        def view(request):
+            replicas.read_from_replica()
+            aliases.append(Note.objects.all().db)
+            Note.objects.create(title='Ещё', text='Текст', author=self.user)
+            aliases.append(Note.objects.all().db)
+            return HttpResponse()
+
+        response = replicas.ReplicaMiddleware(view)(
+            RequestFactory().get('/')
+        )
+        self.assertIn(aliases[0], REPLICAS)
+        self.assertEqual(aliases[1], 'default')
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+        self.assertEqual(Note.objects.all().db, 'default')
+
+    def test_sync_replicas_command(self):
+        """Тест, что команда копирует основную базу в файл реплики."""
+        with override_settings(DATABASE_REPLICAS=[]):
+            with self.assertRaises(CommandError):
+                call_command('sync_replicas', stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            path = str(Path(directory) / 'replica.sqlite3')
+            settings_dict = connections['replica1'].settings_dict
+            with mock.patch.dict(settings_dict, NAME=path), override_settings(
+                DATABASE_REPLICAS=['replica1']
+            ):
+                call_command('sync_replicas', stdout=StringIO())
+            with closing(sqlite3.connect(path)) as replica:
+                self.assertEqual(
+                    replica.execute('SELECT title FROM notes_note').fetchall(),
+                    [('Заметка',)],
+                )
+
+
+class TestNoteTransfer(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='pass')
+        cls.another_user = User.objects.create_user(
+            username='another_user', password='pass'
+        )
+        cls.notes = [
+            Note.objects.create(
+                title=f'Заметка {index}', text=f'Текст\nстрока {index}',
+                author=cls.user,
+            )
+            for index in range(3)
+        ]
+        Note.objects.create(
+            title='Чужая', text='Текст', author=cls.another_user
+        )
+        cls.export_url = reverse('notes:export')
+        cls.import_url = reverse('notes:import')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def exported(self, export_format):
+        response = self.client.get(self.export_url, {'format': export_format})
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def import_file(self, name, content):
+        response = self.client.post(
+            self.import_url, {'file': SimpleUploadedFile(name, content)}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.context['report']
+
+    def assert_round_trip(self, export_format, name):
+        before = list(Note.objects.filter(author=self.user).values_list(
+            'title', 'text', 'slug'
+        ))
+        content = self.exported(export_format)
+        Note.objects.filter(author=self.user).delete()
+        report = self.import_file(name, content)
+        self.assertEqual(report, {'created': 3, 'errors': []})
+        self.assertEqual(
+            list(Note.objects.filter(author=self.user).values_list(
+                'title', 'text', 'slug'
+            )),
+            before,
+        )
+
+    def test_ndjson_round_trip(self):
+        """Тест, что выгрузка NDJSON загружается обратно без потерь."""
+        self.assert_round_trip(transfer.NDJSON, 'notes.ndjson')
+
+    def test_markdown_zip_round_trip(self):
+        """Тест, что zip с Markdown загружается обратно без потерь."""
+        content = self.exported(transfer.MARKDOWN)
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(
+                archive.read(f'{self.notes[0].slug}.md').decode(),
+                '# Заметка 0\n\nТекст\nстрока 0\n',
+            )
+        self.assert_round_trip(transfer.MARKDOWN, 'notes.zip')
+
+    def test_export_contains_only_own_notes(self):
+        """Тест, что в выгрузку попадают только заметки пользователя."""
+        lines = self.exported(transfer.NDJSON).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)['title'] for line in lines],
+            [note.title for note in self.notes],
+        )
+
+    def test_import_reports_bad_records(self):
+        """Тест, что ошибочные записи попадают в отчёт с номером строки."""
+        lines = [
+            '{"title": "Новая", "text": "Текст"}',
+            '',
+            'не JSON',
+            '{"title": "", "text": "Текст"}',
+            json.dumps({'title': 'Дубль', 'text': 'Т', 'slug': 'zametka-0'}),
+        ]
+        report = self.import_file(
+            'notes.ndjson', '\n'.join(lines).encode()
+        )
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(
+            [error['record'] for error in report['errors']], [3, 4, 5]
+        )
+        self.assertEqual(
+            report['errors'][2]['errors'],
+            [f'zametka-0: {transfer.SLUG_TAKEN}'],
+        )
+
+    def test_import_reports_files_not_in_utf8(self):
+        """Тест, что файл архива не в UTF-8 — ошибка только этой записи."""
+        content = io.BytesIO()
+        with zipfile.ZipFile(content, 'w') as archive:
+            archive.writestr(
+                'cp1251.md', '# Заметка\n\nТекст'.encode('cp1251')
+            )
+            archive.writestr('utf8.md', '# Новая\n\nТекст')
+        report = self.import_file('notes.zip', content.getvalue())
+        self.assertEqual(report, {
+            'created': 1,
+            'errors': [
+                {'record': 'cp1251.md', 'errors': [transfer.INVALID_ENCODING]},
+            ],
+        })
+
+    def test_import_reports_unresolved_slug_conflict(self):
+        """Тест, что неустранимый конфликт slug — ошибка записей пачки."""
+        records = [(1, {'title': 'Новая', 'text': 'Текст'})]
+        with mock.patch.object(
+            QuerySet, 'bulk_create', side_effect=IntegrityError
+        ):
+            report = transfer.import_notes(self.user, records)
+        self.assertEqual(report, {
+            'created': 0,
+            'errors': [{'record': 1, 'errors': [transfer.SLUG_CONFLICT]}],
+        })
+
+    def test_import_allocates_suffixes(self):
+        """Тест суффиксов для совпадающих заголовков в базе и в пачке."""
+        records = [
+            (index, {'title': 'Заметка 0', 'text': 'Текст'})
+            for index in range(3)
+        ]
+        report = transfer.import_notes(self.user, records)
+        self.assertEqual(report['created'], 3)
+        self.assertEqual(
+            set(Note.objects.filter(title='Заметка 0').values_list(
+                'slug', flat=True
+            )),
+            {'zametka-0', 'zametka-0-2', 'zametka-0-3', 'zametka-0-4'},
+        )
+        self.assertEqual(
+            len(search.search(self.user.pk, 'заметка 0')), 4
+        )
+
+    def test_import_queries_do_not_grow_with_batch(self):
+        """Тест, что число запросов на пачку не зависит от её размера."""
+        def queries(count, prefix):
+            records = [
+                (index, {'title': f'{prefix} {index}', 'text': 'Текст'})
+                for index in range(count)
+            ]
+            with CaptureQueriesContext(connection) as context:
+                transfer.import_notes(self.user, records, batch_size=count)
+            return len(context)
+
+        self.assertEqual(queries(5, 'Маленькая'), queries(50, 'Большая'))
+
+
+class TestSettingsProfiles(TestCase):
+    def profile_settings(self, profile, argv=('-c',), **environ):
+        """
+        Настройки проекта в отдельном процессе с профилем profile;
+        с profile=None переменная DJANGO_PROFILE не задаётся.
+        """
+        environ = {**os.environ, **environ}
+        environ.pop('DJANGO_PROFILE', None)
+        if profile is not None:
+            environ['DJANGO_PROFILE'] = profile
+        script = (
+            f'import json, sys; sys.argv = {list(argv)!r}; '
+            'from yanote import settings as s; '
+            'print(json.dumps([s.DEBUG, '
+            's.DATABASES["default"]["CONN_MAX_AGE"]]))'
+        )
+        return subprocess.run(
+            [sys.executable, '-c', script],
+            cwd=PROJECT_DIR,
+            env=environ,
+            capture_output=True,
+            text=True,
+        )
+
+    def test_tests_run_with_test_profile(self):
+        """Тест, что под pytest выбирается профиль test."""
+        self.assertEqual(settings.PROFILE, 'test')
+        self.assertFalse(settings.DEBUG)
+
+    def test_prod_profile(self):
+        """Тест постоянных соединений и обязательного ключа в prod."""
+        self.assertIn(
+            'DJANGO_SECRET_KEY', self.profile_settings('prod').stderr
+        )
+        result = self.profile_settings('prod', DJANGO_SECRET_KEY='secret')
+        self.assertEqual(json.loads(result.stdout), [False, 60])
+
+    def test_default_profile_fails_closed(self):
+        """Тест, что без DJANGO_PROFILE dev только под runserver."""
+        for argv in (('-c',), ('manage.py', 'migrate')):
+            with self.subTest(argv=argv):
+                result = self.profile_settings(None, argv=argv)
+                self.assertIn('DJANGO_SECRET_KEY', result.stderr)
+        result = self.profile_settings(None, argv=('manage.py', 'runserver'))
+        self.assertTrue(json.loads(result.stdout)[0])
+
+    def test_sqlite_pragmas_applied(self):
+        """Тест, что сигнал выполняет SQLITE_PRAGMAS на соединении."""
+        expected = {
+            'journal_mode': 'wal',
+            # 1 — NORMAL.
+            'synchronous': 1,
+            'mmap_size': settings.SQLITE_PRAGMAS['mmap_size'],
+        }
+        with connection.cursor() as cursor:
+            for name, value in expected.items():
+                with self.subTest(name=name):
+                    cursor.execute(f'PRAGMA {name}')
+                    self.assertEqual(cursor.fetchone()[0], value)
+
+
+class TestGenerateNotes(TestCase):
+    def test_generated_notes_have_unique_slugs(self):
+        """Тест генератора: заметки созданы, slug уникальны и в латинице."""
+        call_command(
+            'generate_notes', users=2, notes=30, batch_size=7,
+            stdout=StringIO(),
+        )
+        slugs = list(Note.objects.values_list('slug', flat=True))
+        self.assertEqual(len(slugs), 30)
+        self.assertEqual(len(set(slugs)), 30)
+        self.assertTrue(all(slug.isascii() for slug in slugs))
+
+
+class TestQueryPatterns(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(5):
+            author = User.objects.create(username=f'author{index}')
+            Note.objects.create(
+                title=f'Заметка {index}', text='Текст', author=author
+            )
+
+    def test_n_plus_one_traced_to_template_line(self):
+        """Тест, что N+1 в шаблоне находится и указывает на строку."""
+        template = Template(
+            '{% for note in notes %}\n{{ note.author.username }}\n'
+            '{% endfor %}'
+        )
+        with querycheck.QueryPatterns() as patterns:
+            template.render(Context({'notes': Note.objects.all()}))
+        duplicates = patterns.duplicates(3)
+        self.assertEqual(len(duplicates), 1)
+        (origins,) = duplicates.values()
+        self.assertEqual(dict(origins), {'<unknown source>, строка 2': 5})
@@ -40,6 +40,9 @@ class TestRoutes(TestCase):
             'notes:list',
             'notes:add',
             'notes:success',
+            'notes:search',
+            'notes:export',
+            'notes:import',
         )
         for name in urls:
             with self.subTest(name=name):
@@ -74,6 +77,8 @@ class TestRoutes(TestCase):
             ('notes:list', None),
             ('notes:add', None),
             ('notes:success', None),
+            ('notes:export', None),
+            ('notes:import', None),
             ('notes:detail', (note_slug,)),
             ('notes:edit', (note_slug,)),
             ('notes:delete', (note_slug,)),
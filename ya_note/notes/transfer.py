@@ -0,0 +1,295 @@
+"""
+Выгрузка и загрузка заметок пользователя.
+
+Выгрузка — генераторы для StreamingHttpResponse: заметки читаются
+через iterator(chunk_size=...) и сразу уходят клиенту строками NDJSON
+или файлами Markdown внутри zip, так что память не зависит от числа
+заметок.
+
+Загрузка принимает записи {"title": ..., "text": ..., "slug": ...}
+(slug необязателен) и обрабатывает их пачками: slug всей пачки
+проверяются одним запросом slug__in, заметки вставляются через
+bulk_create в своей транзакции, а затем попадают в поисковый индекс.
+Ошибочные записи попадают в отчёт и не прерывают загрузку.
+"""
+import io
+import json
+import time
+import zipfile
+from collections import Counter
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+
+from . import search
+from .models import SLUG_ATTEMPTS, Note
+
+EXPORT_CHUNK_SIZE = 2000
+DEFAULT_BATCH_SIZE = 2000
+# Сколько условий на начало slug объединять в одном запросе: у SQLite
+# ограничена глубина выражения.
+PREFIXES_PER_QUERY = 200
+# Больше любого символа slug: slug из ASCII, поэтому все slug,
+# начинающиеся с prefix, лежат в диапазоне [prefix, prefix + _SLUG_END).
+_SLUG_END = '\x7f'
+
+NDJSON = 'ndjson'
+MARKDOWN = 'zip'
+FORMATS = (NDJSON, MARKDOWN)
+CONTENT_TYPES = {NDJSON: 'application/x-ndjson', MARKDOWN: 'application/zip'}
+
+INVALID_RECORD = 'Запись не является объектом JSON.'
+INVALID_ENCODING = 'Файл не в кодировке UTF-8.'
+SLUG_TAKEN = 'Такой slug уже существует.'
+SLUG_CONFLICT = 'Не удалось подобрать свободный slug, повторите загрузку.'
+
+EXPORT_FIELDS = ('title', 'text', 'slug')
+
+
+def _exported(notes):
+    return notes.order_by('pk').only(*EXPORT_FIELDS).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+
+
+def export_ndjson(notes):
+    """Строки NDJSON с заметками, по одной на заметку."""
+    for note in _exported(notes):
+        yield json.dumps(
+            {field: getattr(note, field) for field in EXPORT_FIELDS},
+            ensure_ascii=False,
+        ) + '\n'
+
+
+def markdown(note):
+    return f'# {note.title}\n\n{note.text}\n'
+
+
+class _ZipStream(io.RawIOBase):
+    """
+    Поток, в который пишет zipfile, а генератор забирает байты.
+
+    Поток не умеет seek, поэтому zipfile пишет размеры файлов
+    после их данных, и архив можно отдавать по частям.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def export_markdown_zip(notes):
+    """Части zip-архива: по файлу <slug>.md на заметку."""
+    stream = _ZipStream()
+    timestamp = time.localtime()[:6]
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for note in _exported(notes):
+            info = zipfile.ZipInfo(f'{note.slug}.md', timestamp)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, markdown(note))
+            yield stream.pop()
+    yield stream.pop()
+
+
+EXPORTERS = {NDJSON: export_ndjson, MARKDOWN: export_markdown_zip}
+
+
+def iter_ndjson(lines):
+    """
+    Пары (номер строки, запись) из NDJSON; пустые строки пропускаются,
+    а вместо записи из ошибочной строки возвращается None.
+    """
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if isinstance(record, dict) else None
+
+
+def iter_markdown_zip(file):
+    """
+    Пары (имя файла, запись) из zip-архива, как его выгружает export;
+    вместо записи из файла не в UTF-8 возвращается ValidationError.
+    """
+    with zipfile.ZipFile(file) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.endswith('.md'):
+                continue
+            try:
+                content = archive.read(info).decode('utf-8')
+            except UnicodeDecodeError:
+                yield info.filename, ValidationError(INVALID_ENCODING)
+                continue
+            title, _, text = content.partition('\n')
+            yield info.filename, {
+                'title': title.removeprefix('# ').strip(),
+                'text': text.strip('\n'),
+                'slug': info.filename.rsplit('/', 1)[-1][:-len('.md')],
+            }
+
+
+def _clean(record):
+    """Возвращает поля заметки из записи и список ошибок в ней."""
+    if record is None:
+        return None, [INVALID_RECORD]
+    if isinstance(record, ValidationError):
+        return None, record.messages
+    errors = []
+    values = {}
+    for name in EXPORT_FIELDS:
+        field = Note._meta.get_field(name)
+        value = record.get(name)
+        if name == 'slug' and not value:
+            values[name] = ''
+            continue
+        try:
+            values[name] = field.clean(
+                value if isinstance(value, str) else None, None
+            )
+        except ValidationError as error:
+            errors.extend(f'{name}: {message}' for message in error.messages)
+    return values, errors
+
+
+def _slugs_with_prefixes(prefixes):
+    """
+    Все slug, начинающиеся с одного из prefixes.
+
+    Начало проверяется диапазоном, а не LIKE: LIKE в SQLite
+    не регистрозависим и не использует индекс slug, а на пачке
+    из тысяч начал полный просмотр таблицы занимал большую часть
+    загрузки. Запрос собирается вручную: ORM строит дерево из сотен
+    условий OR за квадратичное время.
+    """
+    prefixes = sorted(prefixes)
+    slugs = set()
+    for start in range(0, len(prefixes), PREFIXES_PER_QUERY):
+        chunk = prefixes[start:start + PREFIXES_PER_QUERY]
+        ranges = ' OR '.join(['(slug >= %s AND slug < %s)'] * len(chunk))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT slug FROM {Note._meta.db_table} WHERE {ranges}',
+                [value for prefix in chunk
+                 for value in (prefix, prefix + _SLUG_END)],
+            )
+            slugs.update(row[0] for row in cursor.fetchall())
+    return slugs
+
+
+def allocate_slugs(notes):
+    """
+    Раздаёт slug заметкам пачки; возвращает заметки с занятым slug.
+
+    Явно заданный slug должен быть свободен, как в форме. Slug из
+    заголовка при совпадении получает суффикс -N, как в Note.save.
+    Занятость всех slug пачки проверяется одним запросом slug__in;
+    занятые суффиксы читаются, только если совпадения есть.
+    """
+    explicit = [bool(note.slug) for note in notes]
+    for note in notes:
+        note.slug = note.slug or Note.slug_base(note.title)
+    bases = [note.slug for note in notes]
+    taken = set(
+        Note.objects.filter(slug__in=bases).values_list('slug', flat=True)
+    )
+    repeated = {base for base, count in Counter(bases).items() if count > 1}
+    queried = {
+        Note.slug_prefix(base)
+        for base, is_explicit in zip(bases, explicit)
+        if not is_explicit and (base in taken or base in repeated)
+    }
+    taken |= _slugs_with_prefixes(queried)
+    rejected = []
+    for note, is_explicit in zip(notes, explicit):
+        if note.slug not in taken:
+            taken.add(note.slug)
+            continue
+        if is_explicit:
+            rejected.append(note)
+            continue
+        prefix = Note.slug_prefix(note.slug)
+        if prefix not in queried:
+            # slug занят заметкой этой же пачки, а суффиксы этого
+            # начала в базе ещё не смотрели.
+            taken |= _slugs_with_prefixes({prefix})
+            queried.add(prefix)
+        note.slug = Note.numbered_slug(note.slug, taken)
+        taken.add(note.slug)
+    return rejected
+
+
+def _import_batch(author, records, report):
+    labels = []
+    notes = []
+    for label, record in records:
+        values, errors = _clean(record)
+        if errors:
+            report['errors'].append({'record': label, 'errors': errors})
+        else:
+            labels.append(label)
+            notes.append(Note(author=author, **values))
+    if not notes:
+        return
+    slugs = [note.slug for note in notes]
+    # Параллельная запись могла занять выбранный slug между проверкой
+    # и вставкой: тогда раздаём slug пачки заново.
+    for _ in range(SLUG_ATTEMPTS):
+        for note, slug in zip(notes, slugs):
+            note.slug = slug
+        rejected = {id(note) for note in allocate_slugs(notes)}
+        accepted = [note for note in notes if id(note) not in rejected]
+        try:
+            with transaction.atomic():
+                Note.objects.bulk_create(accepted)
+                # bulk_create не отправляет сигналы, а на SQLite и pk
+                # не возвращает: читаем заметки обратно для индекса.
+                search.get_backend().index(Note.objects.filter(
+                    slug__in=[note.slug for note in accepted]
+                ))
+        except IntegrityError:
+            continue
+        break
+    else:
+        report['errors'].extend(
+            {'record': label, 'errors': [SLUG_CONFLICT]} for label in labels
+        )
+        return
+    for label, note in zip(labels, notes):
+        if id(note) in rejected:
+            report['errors'].append(
+                {'record': label, 'errors': [f'{note.slug}: {SLUG_TAKEN}']}
+            )
+    report['created'] += len(accepted)
+
+
+def import_notes(author, records, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Загружает заметки автора из пар (метка, запись) от iter_ndjson
+    или iter_markdown_zip.
+
+    Возвращает отчёт: число созданных заметок и ошибки с метками
+    записей — номерами строк или именами файлов.
+    """
+    report = {'created': 0, 'errors': []}
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        _import_batch(author, batch, report)
+    return report
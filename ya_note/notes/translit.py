@@ -0,0 +1,61 @@
+"""
+Быстрый slugify с тем же результатом, что у pytils.translit.slugify.
+
+pytils транслитерирует строку десятками вызовов str.replace и ещё
+раз проходит её регулярным выражением. Здесь таблица для
+str.translate собирается один раз из таблиц pytils: каждый допустимый
+символ сразу заменяется итоговыми латинскими буквами, остальные
+удаляются. Результаты запоминаются в LRU-кэше: одни и те же заголовки
+slugify видит и при сохранении заметки, и при массовой загрузке.
+"""
+import re
+from functools import lru_cache
+
+from pytils.translit import ALPHABET, TRANSTABLE
+
+SLUGIFY_CACHE_SIZE = 10_000
+
+_AMPERSAND = re.compile(r'&amp;|&')
+_DASHES = re.compile(r'[-\s]+')
+_NOT_SLUG = re.compile(r'[^\w\s-]')
+
+
+class _SlugTable(dict):
+    """Таблица для str.translate: символов не из таблицы в slug нет."""
+
+    def __missing__(self, key):
+        return None
+
+
+def _build_table():
+    # Замены pytils выполняет по порядку, но результат каждой —
+    # ASCII, который следующие замены не трогают, поэтому их можно
+    # применить к каждому символу отдельно и сразу убрать знаки
+    # и заглавные буквы, от которых pytils избавляется в конце.
+    # Для символа с несколькими заменами действует первая.
+    replacements = dict(reversed(TRANSTABLE))
+    table = _SlugTable()
+    for symbol in ALPHABET:
+        if len(symbol) == 1:
+            table[ord(symbol)] = _NOT_SLUG.sub(
+                '', replacements.get(symbol, symbol)
+            ).lower() or None
+    return table
+
+
+_TABLE = _build_table()
+
+
+@lru_cache(maxsize=SLUGIFY_CACHE_SIZE)
+def _slugify(value):
+    value = _AMPERSAND.sub(' and ', value.lower())
+    return _DASHES.sub('-', value).translate(_TABLE)
+
+
+def slugify(value):
+    """Slug для строки, как pytils.translit.slugify."""
+    return _slugify(str(value))
+
+
+cache_info = _slugify.cache_info
+cache_clear = _slugify.cache_clear
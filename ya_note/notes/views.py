@@ -1,9 +1,21 @@
+import io
+import zipfile
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError, transaction
+from django.http import Http404, StreamingHttpResponse
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views import generic
 
-from .forms import NoteForm
+from . import instrumentation, search, transfer
+from .forms import NoteForm, NoteImportForm
 from .models import Note
+from .pagination import KeysetPaginator
+from .replicas import ReplicaReadMixin
 
 
 class Home(generic.TemplateView):
@@ -26,22 +38,37 @@ class NoteBase(LoginRequiredMixin):
         return self.model.objects.filter(author=self.request.user)
 
 
-class NoteCreate(NoteBase, generic.CreateView):
-    """Добавление заметки."""
+class NoteFormBase(NoteBase):
+    """
+    Общее для добавления и редактирования заметки.
+
+    Занятый slug обнаруживается при записи: ошибка уникальности
+    превращается в ошибку поля формы.
+    """
     template_name = 'notes/form.html'
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        try:
+            with transaction.atomic():
+                return super().form_valid(form)
+        except IntegrityError:
+            if not form.instance.slug_taken():
+                raise
+        form.add_slug_error()
+        return self.form_invalid(form)
+
+
+class NoteCreate(NoteFormBase, generic.CreateView):
+    """Добавление заметки."""
+
+    def form_valid(self, form):
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteFormBase, generic.UpdateView):
     """Редактирование заметки."""
-    template_name = 'notes/form.html'
-    form_class = NoteForm
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
@@ -49,11 +76,101 @@ class NoteDelete(NoteBase, generic.DeleteView):
     template_name = 'notes/delete.html'
 
 
-class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+class NotesList(ReplicaReadMixin, NoteBase, generic.ListView):
+    """
+    Список заметок пользователя с постраничным выводом по курсору.
+
+    Страница выбирается по индексу (author, id), а текст заметок,
+    которого в списке нет, не загружается.
+    """
     template_name = 'notes/list.html'
+    ordering = ('pk',)
+
+    def get_queryset(self):
+        paginator = KeysetPaginator(
+            super().get_queryset().defer('text'),
+            self.ordering,
+            settings.NOTES_COUNT_ON_LIST_PAGE,
+        )
+        self.page = paginator.get_page(self.request.GET.get('cursor'))
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page'] = self.page
+        return context
+
+
+class NoteSearch(NoteBase, generic.ListView):
+    """Полнотекстовый поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        return search.search(self.request.user.pk, self.query)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        return context
+
+
+class NoteExport(NoteBase, generic.View):
+    """Выгрузка заметок пользователя потоком: NDJSON или zip с Markdown."""
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', transfer.NDJSON)
+        if export_format not in transfer.FORMATS:
+            raise Http404
+        response = StreamingHttpResponse(
+            transfer.EXPORTERS[export_format](self.get_queryset()),
+            content_type=transfer.CONTENT_TYPES[export_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="notes.{export_format}"'
+        )
+        return response
+
+
+class NoteImport(NoteBase, generic.FormView):
+    """Загрузка заметок из файла выгрузки пачками."""
+    template_name = 'notes/import.html'
+    form_class = NoteImportForm
+
+    def form_valid(self, form):
+        upload = form.cleaned_data['file']
+        if upload.name.endswith('.zip'):
+            records = transfer.iter_markdown_zip(upload)
+        else:
+            records = transfer.iter_ndjson(io.TextIOWrapper(
+                upload.file, encoding='utf-8', errors='replace'
+            ))
+        try:
+            report = transfer.import_notes(self.request.user, records)
+        except zipfile.BadZipFile:
+            form.add_error('file', 'Файл не является zip-архивом.')
+            return self.form_invalid(form)
+        return self.render_to_response(
+            self.get_context_data(form=form, report=report)
+        )
 
 
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class PerfStats(generic.TemplateView):
+    """Время ответа по страницам, собранное PerfMiddleware."""
+    template_name = 'admin/perf_stats.html'
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(
+            **admin.site.each_context(self.request),
+            title='Производительность страниц',
+            enabled=settings.PERF_INSTRUMENTATION,
+            buckets=instrumentation.BUCKET_LABELS,
+            report=instrumentation.get_report(),
+            **kwargs,
+        )
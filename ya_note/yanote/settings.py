@@ -1,14 +1,45 @@
+import os
+import sys
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from django.urls import reverse_lazy
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-SECRET_KEY = 'django-insecure-yipnj$#j!ajarq%k55z4kuf3x79)91h0h42o9!1ho(z=!%mt=#'
-
-DEBUG = False
-
-ALLOWED_HOSTS = ['*']
+# Профиль настроек из переменной окружения DJANGO_PROFILE:
+# dev — разработка, test — тесты, prod — работа под нагрузкой.
+# Без переменной выбирается prod, чтобы отладка не включилась на
+# сервере по забывчивости; сами выбираются только test под pytest
+# и dev под manage.py runserver.
+PROFILES = ('dev', 'test', 'prod')
+if 'pytest' in sys.modules:
+    DEFAULT_PROFILE = 'test'
+elif Path(sys.argv[0]).name == 'manage.py' and sys.argv[1:2] == ['runserver']:
+    DEFAULT_PROFILE = 'dev'
+else:
+    DEFAULT_PROFILE = 'prod'
+PROFILE = os.environ.get('DJANGO_PROFILE', DEFAULT_PROFILE)
+if PROFILE not in PROFILES:
+    raise ImproperlyConfigured(f'Неизвестный профиль настроек: {PROFILE}.')
+
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    'django-insecure-yipnj$#j!ajarq%k55z4kuf3x79)91h0h42o9!1ho(z=!%mt=#',
+)
+if PROFILE == 'prod' and 'DJANGO_SECRET_KEY' not in os.environ:
+    raise ImproperlyConfigured(
+        'В профиле prod задайте DJANGO_SECRET_KEY; для разработки '
+        'выберите профиль DJANGO_PROFILE=dev.'
+    )
+
+# Отладка, а с ней и журнал SQL-запросов в connection.queries, —
+# только в dev.
+DEBUG = PROFILE == 'dev'
+
+ALLOWED_HOSTS = os.environ.get(
+    'DJANGO_ALLOWED_HOSTS', '*'
+).split(',')
 
 
 INSTALLED_APPS = [
@@ -22,11 +53,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'notes.instrumentation.PerfMiddleware',
+    'notes.querycheck.QueryPatternMiddleware',
+    'notes.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'notes.authcache.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -37,7 +71,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -45,10 +78,22 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Шаблон разбирается один раз на процесс. При runserver
+            # Django сбрасывает кэш загрузчика, когда шаблон меняется.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
+# Разбирать все шаблоны из templates/ и строить таблицы reverse
+# при старте процесса (wsgi.py, asgi.py), а не на первых запросах.
+TEMPLATES_WARM_UP = not DEBUG
+
 WSGI_APPLICATION = 'yanote.wsgi.application'
 
 
@@ -56,9 +101,77 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Сколько секунд соединение живёт между запросами. В dev
+        # runserver открывает поток на каждый запрос, и постоянные
+        # соединения только копились бы.
+        'CONN_MAX_AGE': int(os.environ.get(
+            'DJANGO_CONN_MAX_AGE', 60 if PROFILE == 'prod' else 0
+        )),
+        'OPTIONS': {
+            # Сколько секунд ждать, пока другое соединение пишет.
+            'timeout': 20,
+        },
     }
 }
 
+# Реплики только для чтения: пути к файлам SQLite через запятую
+# в DJANGO_DB_REPLICAS, локально их заполняет команда sync_replicas.
+# В тестах реплики — зеркала тестовой базы, а читать с них
+# начинают только тесты, которые сами задают DATABASE_REPLICAS.
+if PROFILE == 'test':
+    REPLICA_NAMES = [DATABASES['default']['NAME']] * 2
+else:
+    REPLICA_NAMES = [
+        name for name in os.environ.get('DJANGO_DB_REPLICAS', '').split(',')
+        if name
+    ]
+DATABASE_REPLICAS = []
+for number, name in enumerate(REPLICA_NAMES, start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    if PROFILE != 'test':
+        DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['notes.replicas.ReplicaRouter']
+# Сколько секунд после записи посетитель читает только из default:
+# за это время реплики должны догнать основную базу.
+REPLICA_PIN_SECONDS = 5
+
+# Прагмы каждого нового соединения SQLite, их выполняет сигнал
+# connection_created. В режиме WAL чтение не ждёт записи, а
+# synchronous=NORMAL в нём не теряет целостность базы при падении
+# процесса и не ждёт fsync на каждом коммите. mmap_size — сколько
+# байт файла базы читать через отображение в память.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 2 ** 20,
+}
+
+# Бэкенд кэша. locmem у каждого процесса свой; если процессов
+# несколько, задайте общий, например
+# DJANGO_CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache
+# и DJANGO_CACHE_LOCATION=127.0.0.1:11211.
+CACHE_BACKEND = os.environ.get(
+    'DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+)
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+if CACHE_BACKEND.endswith('.LocMemCache'):
+    # По умолчанию locmem хранит всего 300 записей и вытесняет
+    # сессии и фрагменты раньше их срока.
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 10_000}
+
+
+# Сессии читаются из кэша, а в базу идут только записи.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,3 +200,35 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_COUNT_ON_LIST_PAGE = 50
+# Сколько объект вошедшего пользователя живёт в кэше. locmem
+# у каждого процесса свой, и сброс записи при смене пароля до других
+# процессов не доходит: там срок и есть задержка, поэтому короткий.
+USER_CACHE_TIMEOUT = (
+    5 if CACHE_BACKEND.endswith('.LocMemCache') else 60 * 5
+)
+# Путь к бэкенду поиска; None — FTS5, если SQLite её поддерживает,
+# иначе обратный индекс в таблице NoteTerm.
+NOTES_SEARCH_BACKEND = None
+NOTES_SEARCH_RESULTS = 50
+
+# Замеры каждого запроса: заголовок Server-Timing, строка лога
+# и страница admin/perf/. Включайте только для профилирования.
+PERF_INSTRUMENTATION = False
+PERF_HISTORY_SIZE = 1000
+# Пик памяти за запрос по tracemalloc. Замедляет каждое выделение
+# памяти, а под несколькими потоками пики запросов смешиваются.
+PERF_TRACE_MEMORY = False
+
+# Поиск N+1: 'warn' пишет в лог, 'raise' выбрасывает исключение,
+# если одна форма запроса выполнилась больше порога раз за запрос.
+QUERY_PATTERN_CHECK = 'warn' if DEBUG else None
+QUERY_PATTERN_THRESHOLD = 3
+# Админка проверяет внешние ключи каждой строки инлайнов отдельным
+# запросом, и исправить это можно только в самой Django.
+QUERY_PATTERN_IGNORED_NAMESPACES = ['admin']
+
+if PROFILE == 'test':
+    # Тесты создают много пользователей, а стойкий хешер медленный.
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']